@@ -0,0 +1,648 @@
+# Taco Python asyncio module.
+# Copyright (C) 2014 Graham Bell
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+from collections import deque
+from functools import partial
+from inspect import isawaitable
+import os
+import socket
+
+try:
+    from time import perf_counter
+except ImportError:
+    from time import time as perf_counter
+
+from taco import metrics
+from taco.client import Taco
+from taco.codec import get_codec
+from taco.error import TacoError, TacoReceivedError
+from taco.server import TacoServer, _concurrent_actions
+from taco.transport import TacoTransport, _file_prefix, parse_address
+
+
+class AsyncTacoTransport(TacoTransport):
+    """Taco transport class for asyncio streams.
+
+    Uses the same message framing as :class:`~taco.transport.TacoTransport`
+    but reads from an asyncio StreamReader and writes to an
+    asyncio StreamWriter.  The read and write methods are coroutines.
+    """
+
+    async def read(self):
+        """Read a message from the input stream.
+
+        The decoded message is returned as a data structure, or
+        None is returned if nothing was read.
+        """
+
+        if self._corked:
+            self._flush_corked()
+
+        line = await self.in_.readline()
+        header = self._frame_header(line)
+
+        if header is not None:
+            (length, codec) = header
+            data = await self.in_.readexactly(length)
+
+            if line.startswith(_file_prefix):
+                return self._read_file(data, codec)
+
+        else:
+            codec = None
+            lines = []
+            while not self._frame_end(line):
+                lines.append(line)
+                line = await self.in_.readline()
+
+            data = b''.join(lines)
+
+        return self._decode(data, codec)
+
+    async def write(self, message):
+        """Write a message to the output stream.
+
+        The message is written to the stream's buffer immediately, so
+        messages written by concurrent tasks are not interleaved.
+        """
+
+        self.write_nowait(message)
+
+        await self.out.drain()
+
+    def write_nowait(self, message):
+        """Write a message to the output stream's buffer.
+
+        The caller should then await the stream's "drain" method.
+        """
+
+        TacoTransport.write(self, message)
+
+    def _write_chunks(self, chunks):
+        """Write a list of byte strings to the output stream's buffer."""
+
+        self.out.writelines(chunks)
+
+
+class AsyncTaco(Taco):
+    """Taco client class for asyncio.
+
+    The server is started by the "start" coroutine, after which the
+    methods which perform actions return coroutines.  Concurrent tasks
+    may share the client: their messages are sent to the server as soon
+    as they are made and each response is passed to the task which is
+    waiting for it.
+
+    Example::
+
+        from taco.aio import AsyncTaco
+
+        async def main():
+            async with AsyncTaco(lang='python') as taco:
+                await taco.import_module('time', 'sleep')
+                await taco.call_function('sleep', 5)
+
+    Objects returned by the server are :class:`~taco.object.TacoObject`
+    instances whose methods also return coroutines.  Since they cannot
+    perform actions when they are destroyed, their object numbers are
+    always queued until the next message.
+
+    The functions given by the "function" and "method" convenience
+    methods are coroutine functions.  With the "resolve" option,
+    the handle is looked up on the first call rather than immediately.
+    Similarly objects must be iterated over using ``async for``.
+    """
+
+    _transport_class = AsyncTacoTransport
+
+    stream_limit = 2 ** 30
+
+    def __init__(self, lang=None, script=None, disable_context=False,
+                 framing=None, codec=None, shm_threshold=None, address=None):
+        """Construct new asyncio Taco client.
+
+        The arguments are as for :class:`~taco.client.Taco`, but the
+        server is not launched until the "start" coroutine is called.
+        """
+
+        self.address = address
+
+        if address is not None:
+            self.script = None
+        elif script is not None:
+            self.script = script
+        elif lang is not None:
+            self.script = 'taco-' + lang
+        else:
+            raise ValueError('language or script not specified')
+
+        self.disable_context = disable_context
+        self.framing = framing
+        self.codec = codec
+        self.shm_threshold = shm_threshold
+
+        self.process = None
+        self.xp = None
+        self._pending = deque()
+        self._destroyed = []
+        self._reader = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def start(self):
+        """Launch the server and connect to it.
+
+        The server script is launched using asyncio.create_subprocess_exec
+        and an AsyncTacoTransport object is connected to it.
+        If an "address" was given, the client connects to that socket
+        instead.
+        """
+
+        family = None
+
+        if self.script is None:
+            (family, address) = parse_address(self.address)
+
+            if family != socket.AF_UNIX and self.shm_threshold is not None:
+                raise ValueError('shm_threshold requires a local connection')
+
+            if family == socket.AF_UNIX:
+                (in_, out) = await asyncio.open_unix_connection(
+                    address, limit=self.stream_limit)
+
+            else:
+                (in_, out) = await asyncio.open_connection(
+                    address[0], address[1], limit=self.stream_limit)
+
+        else:
+            self.process = await asyncio.create_subprocess_exec(
+                self.script,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                limit=self.stream_limit)
+
+            (in_, out) = (self.process.stdout, self.process.stdin)
+
+        binary = self.codec is not None and get_codec(self.codec).binary
+
+        self.xp = self._construct_transport(
+            in_, out, None if binary else self.codec)
+
+        if family is not None and family != socket.AF_UNIX:
+            self.xp.local = False
+
+        self._reader = asyncio.ensure_future(self._read_responses())
+
+        if (self.framing is not None or binary or
+                self.shm_threshold is not None):
+            await self._configure_transport(
+                self.framing, self.codec if binary else None,
+                self.shm_threshold)
+
+    async def close(self):
+        """Close the connection to the server and wait for it to exit."""
+
+        self.xp.out.close()
+
+        if self.process is not None:
+            await self.process.wait()
+
+        await self._reader
+
+        self.xp.remove_files()
+
+    async def _configure_transport(self, framing=None, codec=None,
+                                   shm_threshold=None):
+        """Private method to negotiate transport options with the server.
+
+        Returns True if the server accepted the options.
+        """
+
+        message = self._configure_transport_message(
+            framing, codec, shm_threshold)
+
+        if message is None:
+            return True
+
+        try:
+            await self._interact(message)
+        except TacoReceivedError:
+            return False
+
+        self._apply_transport_options(message)
+        return True
+
+    def corked(self):
+        """Not supported by this class.
+
+        Responses are read by a separate task, which could not cause
+        messages held back by corking to be written.
+        """
+
+        raise TacoError('corking is not supported by AsyncTaco')
+
+    async def _read_responses(self):
+        """Private coroutine which reads responses from the server.
+
+        Each response is passed to the future of the oldest pending
+        action.  When the input stream ends, any remaining actions
+        receive an empty response.
+        """
+
+        while True:
+            try:
+                response = await self.xp.read()
+            except Exception as e:
+                while self._pending:
+                    future = self._pending.popleft()
+                    if not future.cancelled():
+                        future.set_exception(e)
+                raise
+
+            if response is None:
+                while self._pending:
+                    future = self._pending.popleft()
+                    if not future.cancelled():
+                        future.set_result(None)
+                break
+
+            if not self._pending:
+                raise TacoError('received unexpected response')
+
+            future = self._pending.popleft()
+            if not future.cancelled():
+                future.set_result(response)
+
+    async def _interact(self, message):
+        """Private general interaction method used to implement other methods.
+
+        Writes the given message to the server and waits for the response.
+        If this is a result, then its value is returned.  If it is an
+        exception, then a TacoError exception is raised.
+
+        The message is encoded before its future is queued, so that
+        a message which cannot be encoded does not leave a future
+        with no response.
+        """
+
+        if self._reader.done():
+            # No further responses can be read.
+            return self._handle_response(None)
+
+        if self._destroyed:
+            await self._flush_destroyed()
+
+        chunks = self.xp.encode(message)
+
+        future = asyncio.get_event_loop().create_future()
+        self._pending.append(future)
+        self.xp.write_encoded(chunks)
+        await self.xp.out.drain()
+
+        return self._handle_response(await future)
+
+    def _submit(self, message):
+        """Private method to send a message as a separate task.
+
+        Returns an asyncio Task which will give the result of the action.
+        """
+
+        return asyncio.ensure_future(self._interact(message))
+
+    def _destroy_object(self, number):
+        """Private method for TacoObjects to queue the object for destruction.
+
+        The queued object numbers are sent before the next message.
+        """
+
+        self._destroyed.append(number)
+
+    async def _flush_destroyed(self):
+        """Private coroutine to send the queued object numbers to the server.
+
+        See :meth:`taco.client.Taco._flush_destroyed`.
+        """
+
+        numbers = self._take_destroyed()
+
+        if self._bulk_destroy is None:
+            try:
+                await self._interact(self._destroy_objects_message(numbers))
+                self._bulk_destroy = True
+                return
+            except TacoReceivedError:
+                self._bulk_destroy = False
+
+        if self._bulk_destroy:
+            messages = [self._destroy_objects_message(numbers)]
+        else:
+            messages = [{'action': 'destroy_object', 'number': number}
+                        for number in numbers]
+
+        for message in messages:
+            self._pending.append(asyncio.get_event_loop().create_future())
+            await self.xp.write(message)
+
+    def _object_iterator(self, obj, size):
+        """Private method giving an asynchronous iterator over a TacoObject.
+        """
+
+        return _AsyncObjectIterator(self, obj.number, size)
+
+    def _handle_function(self, resolve):
+        """Private method giving a coroutine function which calls a handle.
+
+        Since looking up the handle requires awaiting the "resolve"
+        coroutine, this is done on the first call.
+        """
+
+        handle = []
+
+        async def func(*args, **kwargs):
+            if not handle:
+                handle.append(await resolve())
+
+            return await handle[0].call(*args, **kwargs)
+
+        return func
+
+    async def batch(self, actions):
+        """Perform a list of actions in a single interaction.
+
+        See :meth:`taco.client.Taco.batch`.
+        """
+
+        return self._batch_results(
+            await self._interact(self._batch_message(actions)))
+
+    async def stream_function(self, name, *args, **kwargs):
+        """Invoke a function call and iterate over the list it returns.
+
+        With this class, the whole response is read before
+        an iterator is returned.
+        """
+
+        return iter(await self.call_function(name, *args, **kwargs))
+
+    async def map_function(self, name, items, **kwargs):
+        """Call a function for each of a list of sets of arguments.
+
+        See :meth:`taco.client.Taco.map_function`.
+        """
+
+        return self._batch_results(
+            await self._interact(self._map_message(name, items, kwargs)))
+
+
+class _AsyncObjectIterator():
+    """Asynchronous iterator over a TacoObject.
+
+    Items are fetched using the iterate_object action in lists of
+    "size" items.  Attempting to iterate synchronously raises a TacoError.
+    """
+
+    def __init__(self, client, number, size):
+        self._client = client
+        self._number = number
+        self._size = size
+        self._items = deque()
+        self._start = True
+        self._done = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._items:
+            if self._done:
+                raise StopAsyncIteration
+
+            items = await self._client._iterate_object(
+                self._number, self._size, self._start)
+            self._start = False
+            self._done = len(items) < self._size
+            self._items.extend(items)
+
+        return self._items.popleft()
+
+    def __iter__(self):
+        raise TacoError('AsyncTaco objects must be iterated with "async for"')
+
+    __next__ = __iter__
+
+
+class AsyncTacoServer(TacoServer):
+    """Taco server class for asyncio.
+
+    Works like :class:`~taco.server.TacoServer` but runs an event loop.
+    If a function or method returns a coroutine, or other awaitable
+    object, the server awaits it and the response gives its result.
+
+    Messages which include an "id" value, as sent by
+    :class:`~taco.multiplex.MultiplexTaco`, are handled as separate tasks,
+    so that the server continues to read messages while awaiting
+    results, and responses are written as they become available.
+    The same ordering rules apply as for the
+    :class:`~taco.server.TacoServer` concurrent mode: actions involving
+    the same object are performed in order, and messages which change the
+    server's state, or have no "id", wait for all outstanding tasks
+    to complete.
+
+    This is used by the ``taco-python`` script's ``--asyncio`` option.
+    """
+
+    _transport_class = AsyncTacoTransport
+
+    stream_limit = 2 ** 30
+
+    def __init__(self, in_=None, out=None):
+        """Construct AsyncTacoServer object.
+
+        The input and output streams may be asyncio StreamReader and
+        StreamWriter objects.  Otherwise they, or standard input and
+        standard output, are connected to the event loop by the
+        "serve" coroutine.
+        """
+
+        TacoServer.__init__(self, in_, out)
+
+        self._object_tasks = {}
+
+    def run(self):
+        """Main server function.
+
+        Runs the "serve" coroutine in a new event loop.
+        """
+
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        """Coroutine which handles messages.
+
+        The loop exits on failure to read another message, after
+        waiting for outstanding tasks to complete.
+        """
+
+        if not isinstance(self.xp.in_, asyncio.StreamReader):
+            await self._connect_pipes()
+
+        tasks = set()
+
+        while True:
+            self._referenced = set()
+            message = await self.xp.read()
+
+            if message is None:
+                break
+
+            last_decode = self.xp.last_decode
+
+            if 'id' in message and message['action'] in _concurrent_actions:
+                keys = self._object_keys(message)
+
+                previous = [self._object_tasks[key] for key in keys
+                            if key in self._object_tasks]
+
+                task = asyncio.ensure_future(
+                    self._perform_async(message, last_decode, previous))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+                for key in keys:
+                    self._object_tasks[key] = task
+                    task.add_done_callback(
+                        partial(self._object_task_done, key))
+
+            else:
+                if tasks:
+                    await asyncio.wait(list(tasks))
+
+                await self._respond_async(message, last_decode)
+
+        if tasks:
+            await asyncio.wait(list(tasks))
+
+        self.xp.remove_files()
+        self.xp.out.close()
+        await self.xp.out.wait_closed()
+
+    async def _connect_pipes(self):
+        """Connect the transport's streams to the event loop.
+
+        The streams are replaced by a StreamReader and StreamWriter.
+        If both streams refer to the same socket, as for connections
+        accepted by :class:`~taco.listener.TacoListener`, the socket
+        is duplicated and connected as a single stream.
+        """
+
+        loop = asyncio.get_event_loop()
+
+        fileno = self.xp.in_.fileno()
+
+        if fileno == self.xp.out.fileno():
+            (reader, writer) = await asyncio.open_connection(
+                sock=socket.socket(fileno=os.dup(fileno)),
+                limit=self.stream_limit)
+
+        else:
+            reader = asyncio.StreamReader(limit=self.stream_limit)
+            await loop.connect_read_pipe(
+                lambda: asyncio.StreamReaderProtocol(reader), self.xp.in_)
+
+            (transport, protocol) = await loop.connect_write_pipe(
+                lambda: asyncio.StreamReaderProtocol(asyncio.StreamReader()),
+                self.xp.out)
+
+            writer = asyncio.StreamWriter(transport, protocol, None, loop)
+
+        self.xp.in_ = reader
+        self.xp.out = writer
+
+    def _object_task_done(self, key, task):
+        """Forget the task for an object once it is complete,
+        unless another task has been started for the object since."""
+
+        if self._object_tasks.get(key) is task:
+            del self._object_tasks[key]
+
+    async def _perform_async(self, message, last_decode, previous):
+        """Respond to a message, after the previous tasks for the
+        same objects, if any, have completed."""
+
+        if previous:
+            await asyncio.wait(previous)
+
+        await self._respond_async(message, last_decode)
+
+    async def _respond_async(self, message, last_decode):
+        """Perform the action specified by a message and write the response.
+
+        See :meth:`taco.server.TacoServer._respond`.
+        """
+
+        collector = metrics._collector
+
+        if collector is not None:
+            start = perf_counter()
+
+        response = self._dispatch(message)
+
+        if message['action'] in ('batch', 'map_function'):
+            if response['action'] == 'result':
+                response = self._make_result(list(await asyncio.gather(
+                    *[self._await_response(x) for x in response['result']])))
+
+        else:
+            response = await self._await_response(response)
+
+        if collector is not None:
+            execution_time = perf_counter() - start
+
+        if 'id' in message:
+            response = dict(response, id=message['id'])
+
+        self.xp.write_nowait(response)
+
+        if collector is not None:
+            self._record_action(
+                collector, message['action'], execution_time, last_decode)
+
+        await self.xp.out.drain()
+
+    async def _await_response(self, response):
+        """If a response's result is awaitable, await it.
+
+        Returns a new response containing the awaited result, or an
+        exception message if it raised an exception.
+        """
+
+        if response['action'] != 'result' or not isawaitable(
+                response['result']):
+            return response
+
+        try:
+            return self._make_result(await response['result'])
+        except Exception as e:
+            return {
+                'action': 'exception',
+                'message': 'exception caught: ' + str(e),
+            }
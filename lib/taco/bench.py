@@ -0,0 +1,286 @@
+# Taco Python benchmark module.
+# Copyright (C) 2014 Graham Bell
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Taco benchmark suite.
+
+This module can be run as ``python -m taco.bench`` to measure
+the performance of the Python client and server.  The results
+are written in JSON format, for example::
+
+    python -m taco.bench --script scripts/taco-python --output bench.json
+
+The following are measured:
+
+* ``round_trip``: the time taken by call_function for a trivial function.
+
+* ``objects``: the rates at which objects can be constructed and destroyed.
+
+* ``payload``: the time taken by call_function to send a string
+  to the server and receive it back, for a range of sizes.
+
+* ``in_process``: the same as ``payload``, but with a
+  :class:`~taco.server.TacoServer` running in the same process
+  and the messages passed via in-memory buffers, so that the
+  time is spent encoding and decoding rather than in the pipes.
+
+Times are given in seconds, as the mean and percentiles of the
+individual measurements.
+"""
+
+from __future__ import print_function
+
+from argparse import ArgumentParser
+from io import BytesIO
+import json
+import platform
+import sys
+
+try:
+    from time import perf_counter
+except ImportError:
+    from time import time as perf_counter
+
+from taco.client import Taco
+from taco.server import TacoServer
+from taco.transport import TacoTransport
+
+default_sizes = [10 ** n for n in range(1, 9)]
+
+percentiles = (50, 90, 99)
+
+# Total number of bytes to send per payload size, used to limit the
+# number of repeats for large payloads.
+_payload_volume = 10 ** 8
+
+
+def run(script=None, codec=None, framing=None, repeat=1000,
+        sizes=default_sizes, server=True):
+    """Run the benchmarks and return the results as a dictionary.
+
+    The server script is launched by a :class:`~taco.client.Taco` client
+    with the given script (by default ``taco-python``), codec and framing
+    mode.  If "server" is false, only the in-process benchmark is run.
+    """
+
+    results = {
+        'python': platform.python_version(),
+        'repeat': repeat,
+    }
+
+    if server:
+        taco = Taco(lang=None if script else 'python', script=script,
+                    codec=codec, framing=framing)
+
+        results['codec'] = taco.xp.codec.name
+        results['framing'] = taco.xp.framing
+        results['round_trip'] = bench_round_trip(taco, repeat)
+        results['objects'] = bench_objects(taco, repeat)
+        results['payload'] = bench_payload(taco, sizes, repeat)
+
+    results['in_process'] = bench_in_process(codec, framing, sizes, repeat)
+
+    return results
+
+
+def bench_round_trip(taco, repeat):
+    """Measure the round trip time of call_function."""
+
+    times = []
+
+    for i in range(repeat):
+        start = perf_counter()
+        taco.call_function('abs', -1)
+        times.append(perf_counter() - start)
+
+    return _summary(times)
+
+
+def bench_objects(taco, repeat):
+    """Measure the rates of object construction and destruction.
+
+    Destruction is timed up to the end of the interaction which
+    sends the destroy_objects action to the server.
+    """
+
+    start = perf_counter()
+    objects = [taco.construct_object('object') for i in range(repeat)]
+    construct = perf_counter() - start
+
+    start = perf_counter()
+    del objects
+    taco.call_function('abs', -1)
+    destroy = perf_counter() - start
+
+    return {
+        'count': repeat,
+        'construct_per_second': repeat / construct,
+        'destroy_per_second': repeat / destroy,
+    }
+
+
+def bench_payload(taco, sizes, repeat):
+    """Measure the time taken to send strings to the server and back."""
+
+    results = []
+
+    for size in sizes:
+        payload = 'x' * size
+        times = []
+
+        for i in range(_payload_repeat(size, repeat)):
+            start = perf_counter()
+            taco.call_function('str', payload)
+            times.append(perf_counter() - start)
+
+        results.append(_payload_summary(size, times))
+
+    return results
+
+
+def bench_in_process(codec, framing, sizes, repeat):
+    """Measure the time taken to pass strings through an in-process server.
+
+    Each message is encoded by a client transport, decoded and handled
+    by a :class:`~taco.server.TacoServer` and the response decoded by
+    the client transport.  The messages are passed via BytesIO objects.
+    """
+
+    server = _InProcessServer(codec)
+    client = TacoTransport(None, None, codec=codec)
+
+    if framing is not None:
+        server.xp.framing = client.framing = framing
+
+    results = []
+
+    for size in sizes:
+        message = {
+            'action': 'call_function',
+            'name': 'str',
+            'args': ['x' * size],
+            'kwargs': {},
+            'context': None,
+        }
+        times = []
+
+        for i in range(_payload_repeat(size, repeat)):
+            start = perf_counter()
+
+            client.out = BytesIO()
+            client.write(message)
+
+            server.xp.in_ = BytesIO(client.out.getvalue())
+            server.xp.out = BytesIO()
+            server.xp.write(server._dispatch(server.xp.read()))
+
+            client.in_ = BytesIO(server.xp.out.getvalue())
+            client.read()
+
+            times.append(perf_counter() - start)
+
+        results.append(_payload_summary(size, times))
+
+    return results
+
+
+class _InProcessServer(TacoServer):
+    """Taco server using in-memory buffers rather than standard streams."""
+
+    def __init__(self, codec=None):
+        self._codec = codec
+        TacoServer.__init__(self)
+
+    def _construct_transport(self):
+        return TacoServer._construct_transport(
+            self, BytesIO(), BytesIO(), self._codec)
+
+
+def _payload_repeat(size, repeat):
+    """Determine the number of times to send a payload of a given size."""
+
+    return max(1, min(repeat, _payload_volume // size))
+
+
+def _payload_summary(size, times):
+    """Summarize payload timings, adding the size and throughput."""
+
+    result = _summary(times)
+    result['size'] = size
+    result['bytes_per_second'] = 2 * size / result['mean']
+    return result
+
+
+def _summary(times):
+    """Summarize a list of times.
+
+    Returns a dictionary giving the count, mean, minimum, maximum
+    and percentiles of the times.
+    """
+
+    times = sorted(times)
+
+    result = {
+        'count': len(times),
+        'mean': sum(times) / len(times),
+        'min': times[0],
+        'max': times[-1],
+    }
+
+    for percentile in percentiles:
+        result['p{0}'.format(percentile)] = _percentile(times, percentile)
+
+    return result
+
+
+def _percentile(times, percentile):
+    """Find a percentile of a sorted list using the nearest rank."""
+
+    return times[int(round(percentile / 100.0 * (len(times) - 1)))]
+
+
+def main(args=None):
+    """Run the benchmarks from the command line."""
+
+    parser = ArgumentParser(prog='python -m taco.bench',
+                            description='Taco benchmark suite')
+    parser.add_argument('--script', help='server script to launch')
+    parser.add_argument('--codec', help='codec name')
+    parser.add_argument('--framing', help='framing mode')
+    parser.add_argument('--repeat', type=int, default=1000,
+                        help='number of repeats of each measurement')
+    parser.add_argument('--max-size', type=int, default=default_sizes[-1],
+                        help='largest payload size in bytes')
+    parser.add_argument('--in-process', action='store_true',
+                        help='only run the in-process benchmark')
+    parser.add_argument('--output', help='file to which to write results')
+
+    args = parser.parse_args(args)
+
+    results = run(script=args.script, codec=args.codec, framing=args.framing,
+                  repeat=args.repeat,
+                  sizes=[x for x in default_sizes if x <= args.max_size],
+                  server=not args.in_process)
+
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        print()
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
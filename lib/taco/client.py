@@ -14,11 +14,23 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from collections import deque
+import socket
 import subprocess
 
-from taco.error import TacoReceivedError, TacoUnknownActionError
+try:
+    from time import perf_counter
+except ImportError:
+    from time import time as perf_counter
+
+from taco import metrics
+
+from taco.codec import get_codec
+from taco.error import TacoError, TacoReceivedError, TacoUnknownActionError
+from taco.future import TacoFuture
 from taco.object import TacoObject
-from taco.transport import TacoTransport
+from taco.proxy import TacoProxy
+from taco.transport import TacoTransport, parse_address
 
 
 class Taco():
@@ -32,9 +44,41 @@ class Taco():
 
         taco.import_module('time', 'sleep')
         taco.call_function('sleep', 5)
+
+    The "max_pending" attribute limits the number of submitted actions
+    whose responses have not yet been read.  When it is reached, responses
+    are read before further actions are written.  Similarly, responses
+    are read before writing a message which would take the total size of
+    the unanswered messages over the "max_pending_bytes" attribute.
+    This should not exceed the capacity of the pipe to the server,
+    so that neither process can block on a full pipe.
+
+    When :class:`~taco.object.TacoObject` instances are destroyed,
+    their object numbers are queued and sent to the server in a single
+    destroy_objects action before the next message.  If the number of
+    queued objects reaches the "destroy_threshold" attribute, they are
+    sent immediately, unless the client is in the middle of an interaction.
+
+    The "iterate_size" attribute gives the default number of items
+    fetched by each iterate_object action when iterating over
+    a :class:`~taco.object.TacoObject`.
     """
 
-    def __init__(self, lang=None, script=None, disable_context=False):
+    max_pending = 100
+    max_pending_bytes = 2 ** 16
+    destroy_threshold = 1000
+    iterate_size = 100
+
+    _bulk_destroy = None
+    _busy = False
+    _pending_bytes = 0
+    _socket = None
+    _stream = None
+
+    _transport_class = TacoTransport
+
+    def __init__(self, lang=None, script=None, disable_context=False,
+                 framing=None, codec=None, shm_threshold=None, address=None):
         """Construct new Taco client by connecting to a server instance.
 
         The server script can either be specified explicitly with the
@@ -46,9 +90,36 @@ class Taco():
 
         The server script will be launched using subprocess.Popen
         and a TacoTransport object will be connected to it.
+
+        Alternatively an "address" can be given, in which case no script
+        is launched.  Instead the client connects to the socket
+        with that address, for example one on which ``taco-python``
+        has been started with the ``--listen`` or ``--forkserver`` option.
+        The address is either the path of a UNIX socket or, for TCP,
+        of the form ``HOST:PORT``.
+
+        If a "framing" mode other than the default "end" mode is
+        requested, the server is asked to switch to it with the
+        configure_transport action.  If the server does not support
+        this, the default framing mode is retained.
+
+        The "codec" argument can be used to select the JSON codec,
+        as described in :mod:`taco.codec`.  If a binary codec such as
+        "msgpack" is given, it is also requested using the
+        configure_transport action, and JSON is used if the server
+        does not support it.
+
+        If "shm_threshold" is given, messages of at least this many bytes
+        are passed via temporary files in shared memory rather than through
+        the pipes, in both directions.  This is also requested using the
+        configure_transport action.  Since the files must be readable
+        by both processes, a ValueError is raised if "shm_threshold"
+        is given with a TCP address.
         """
 
-        if script is not None:
+        if address is not None:
+            scr = None
+        elif script is not None:
             scr = script
         elif lang is not None:
             scr = 'taco-' + lang
@@ -56,14 +127,57 @@ class Taco():
             raise ValueError('language or script not specified')
 
         self.disable_context = disable_context
+        self._pending = deque()
+        self._destroyed = []
+
+        if scr is None:
+            (family, in_, out) = self._connect(address, shm_threshold)
+
+        else:
+            p = subprocess.Popen([scr],
+                                 stdin=subprocess.PIPE,
+                                 stdout=subprocess.PIPE)
+
+            (in_, out) = (p.stdout, p.stdin)
+
+        binary = codec is not None and get_codec(codec).binary
+
+        self.xp = self._construct_transport(
+            in_, out, None if binary else codec)
+
+        if scr is None and family != socket.AF_UNIX:
+            self.xp.local = False
+
+        if framing is not None or binary or shm_threshold is not None:
+            self._configure_transport(
+                framing, codec if binary else None, shm_threshold)
+
+    def _connect(self, address, shm_threshold=None):
+        """Private method to connect to a server's socket.
+
+        Returns the address family and input and output streams
+        for the connection.  Raises a ValueError for a TCP address if
+        "shm_threshold" is given.
+        """
+
+        (family, address) = parse_address(address)
+
+        if family != socket.AF_UNIX and shm_threshold is not None:
+            raise ValueError('shm_threshold requires a local connection')
 
-        p = subprocess.Popen([scr],
-                             stdin=subprocess.PIPE,
-                             stdout=subprocess.PIPE)
+        if family == socket.AF_UNIX:
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.connect(address)
+
+        else:
+            sock = socket.create_connection(address)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
-        self.xp = self._construct_transport(p.stdout, p.stdin)
+        self._socket = sock
 
-    def _construct_transport(self, in_, out):
+        return (family, sock.makefile('rb'), sock.makefile('wb'))
+
+    def _construct_transport(self, in_, out, codec=None):
         """Prepare a TacoTransport object for use with this client.
 
         from_obj and to_obj functions are passed to the TacoTransport
@@ -72,6 +186,9 @@ class Taco():
         """
 
         def from_obj(obj):
+            if isinstance(obj, TacoProxy):
+                obj = obj._object
+
             if isinstance(obj, TacoObject):
                 return {'_Taco_Object_': obj.number}
             else:
@@ -83,19 +200,310 @@ class Taco():
             else:
                 return dict_
 
-        return TacoTransport(in_, out, from_obj, to_obj)
+        return self._transport_class(in_, out, from_obj, to_obj, codec)
+
+    def _configure_transport(self, framing=None, codec=None,
+                             shm_threshold=None):
+        """Private method to negotiate transport options with the server.
+
+        Returns True if the server accepted the options.
+        """
+
+        message = self._configure_transport_message(
+            framing, codec, shm_threshold)
+
+        if message is None:
+            return True
+
+        try:
+            self._interact(message)
+        except TacoReceivedError:
+            return False
+
+        self._apply_transport_options(message)
+        return True
+
+    def _configure_transport_message(self, framing, codec, shm_threshold):
+        """Private method to construct a configure_transport message.
+
+        Returns None if the transport already has the given options.
+        """
+
+        message = {'action': 'configure_transport'}
+
+        if framing is not None:
+            if framing not in self.xp.framings:
+                raise ValueError('unknown framing "{0}"'.format(framing))
+
+            if framing != self.xp.framing:
+                message['framing'] = framing
+
+        if codec is not None:
+            if get_codec(codec).name != self.xp.codec.name:
+                message['codec'] = codec
+
+        if shm_threshold is not None:
+            if shm_threshold != self.xp.shm_threshold:
+                message['shm_threshold'] = shm_threshold
+
+        if len(message) == 1:
+            return None
+
+        return message
+
+    def _apply_transport_options(self, message):
+        """Private method to apply options accepted by the server."""
+
+        if 'framing' in message:
+            self.xp.framing = message['framing']
+
+        if 'codec' in message:
+            self.xp.set_codec(message['codec'])
+
+        if 'shm_threshold' in message:
+            self.xp.shm_threshold = message['shm_threshold']
 
     def _interact(self, message):
         """Private general interaction method used to implement other methods.
 
         Writes the given message to the server and reads the response.
+        Any responses to previously submitted actions are read first.
         If this is a result, then its value is returned.  If it is an
         exception, then a TacoError exception is raised.
+
+        If :mod:`taco.metrics` is enabled, statistics for the
+        interaction are recorded.
+        """
+
+        if self._destroyed:
+            self._flush_destroyed()
+
+        if self._stream is not None:
+            self._finish_stream()
+
+        collector = metrics._collector
+
+        if collector is not None:
+            start = perf_counter()
+
+        self._busy = True
+
+        try:
+            self._write(message)
+
+            while self._pending:
+                self._receive()
+
+            response = self.xp.read()
+
+        finally:
+            self._busy = False
+
+        if collector is not None and response is not None:
+            self._record_interaction(
+                collector, message['action'], perf_counter() - start,
+                self.xp.last_encode, self.xp.last_decode)
+
+        return self._handle_response(response)
+
+    def _record_interaction(self, collector, action, elapsed,
+                            last_encode, last_decode):
+        """Private method to record statistics for an interaction.
+
+        The "last_encode" and "last_decode" arguments are the
+        transport's time and size measurements for the messages.
+        """
+
+        (encode_time, request_bytes) = last_encode
+        (decode_time, response_bytes) = last_decode
+
+        collector.record('client', action, {
+            'encode_time': encode_time,
+            'transit_time': elapsed - encode_time - decode_time,
+            'decode_time': decode_time,
+            'request_bytes': request_bytes,
+            'response_bytes': response_bytes,
+        })
+
+    def _submit(self, message):
+        """Private general method to send a message without waiting.
+
+        Writes the given message to the server and returns a
+        :class:`~taco.future.TacoFuture` which will hold the response.
+        """
+
+        if self._destroyed:
+            self._flush_destroyed()
+
+        self._busy = True
+
+        try:
+            while len(self._pending) >= self.max_pending:
+                self._receive()
+
+            size = self._write(message)
+
+        finally:
+            self._busy = False
+
+        future = TacoFuture(self)
+        future._request_bytes = size
+        self._pending.append(future)
+        self._pending_bytes += size
+        return future
+
+    def _write(self, message):
+        """Private method to write a message to the server.
+
+        If the message would take the total size of the messages whose
+        responses have not been read over "max_pending_bytes", responses
+        are read first.  Otherwise the server could be blocked writing
+        a response while this process is blocked writing the message.
+        Returns the size of the message.
+        """
+
+        chunks = self.xp.encode(message)
+        size = sum(len(x) for x in chunks)
+
+        while (self._pending and
+                self._pending_bytes + size > self.max_pending_bytes):
+            self._receive()
+
+        self.xp.write_encoded(chunks)
+
+        return size
+
+    def _receive(self):
+        """Private method to read the response to the oldest pending action.
+        """
+
+        if self._stream is not None:
+            self._finish_stream()
+
+        busy = self._busy
+        self._busy = True
+
+        try:
+            future = self._pending.popleft()
+            self._pending_bytes -= future._request_bytes
+            future._set_response(self.xp.read())
+
+        finally:
+            self._busy = busy
+
+    def _stream_result(self, message):
+        """Private method to perform an action and stream its result.
+
+        Writes the given message to the server and reads the response
+        using the transport's :meth:`~taco.transport.TacoTransport.read_stream`
+        method.  Returns an iterator over the result, which must be a list.
         """
 
-        self.xp.write(message)
+        if self._destroyed:
+            self._flush_destroyed()
+
+        if self._stream is not None:
+            self._finish_stream()
+
+        self._busy = True
+
+        try:
+            self._write(message)
+
+            while self._pending:
+                self._receive()
+
+            (response, items) = self.xp.read_stream('result')
 
-        response = self.xp.read()
+        finally:
+            self._busy = False
+
+        if items is None:
+            result = self._handle_response(response)
+
+            if not isinstance(result, list):
+                raise TacoError('received result is not a list')
+
+            return iter(result)
+
+        if response.get('action') != 'result':
+            response['result'] = list(items)
+            return iter(self._handle_response(response))
+
+        self._stream = _TacoStream(self, items)
+        return self._stream
+
+    def _finish_stream(self):
+        """Private method to read the remainder of a streamed result.
+
+        This is done before reading any other response.  The entries
+        are stored so that iteration over the result can continue.
+        """
+
+        (stream, self._stream) = (self._stream, None)
+
+        busy = self._busy
+        self._busy = True
+
+        try:
+            stream._finish()
+
+        finally:
+            self._busy = busy
+
+    def _flush_destroyed(self):
+        """Private method to send the queued object numbers to the server.
+
+        The first time this is done, the destroy_objects action is
+        attempted and, if the server does not accept it, individual
+        destroy_object actions are used instead from then on.  The responses
+        are not otherwise checked, since errors cannot be reported to the
+        objects' destructors.
+        """
+
+        numbers = self._take_destroyed()
+
+        if self._bulk_destroy is None:
+            try:
+                self._interact(self._destroy_objects_message(numbers))
+                self._bulk_destroy = True
+                return
+            except TacoReceivedError:
+                self._bulk_destroy = False
+
+        if self._bulk_destroy:
+            self._submit(self._destroy_objects_message(numbers))
+        else:
+            for number in numbers:
+                self._submit({
+                    'action': 'destroy_object',
+                    'number': number,
+                })
+
+    def _take_destroyed(self):
+        """Private method to remove and return the queued object numbers."""
+
+        (numbers, self._destroyed) = (self._destroyed, [])
+
+        return numbers
+
+    def _destroy_objects_message(self, numbers):
+        """Private method to construct a destroy_objects message."""
+
+        return {
+            'action': 'destroy_objects',
+            'numbers': numbers,
+        }
+
+    def _handle_response(self, response):
+        """Private method to interpret a response message.
+
+        If this is a result, then its value is returned.  If it is an
+        exception, then a TacoError exception is raised.
+        """
+
+        if response is None:
+            raise TacoError('no response received')
 
         action = response['action']
 
@@ -107,11 +515,11 @@ class Taco():
         else:
             raise TacoUnknownActionError('received unknown action: ' + action)
 
-    def call_class_method(self, class_, name, *args, **kwargs):
-        """Invoke a class method call in the connected server.
+    def _call_message(self, message, args, kwargs):
+        """Private method to add the arguments to a call message.
 
-        The context (void / scalar / list) can be specified as a
-        keyword argument "context" unless the "disable_context" attribute
+        The context (void / scalar / list) is taken from the keyword
+        argument "context" unless the "disable_context" attribute
         has been set.
         """
 
@@ -120,14 +528,107 @@ class Taco():
         else:
             context = None
 
-        return self._interact({
+        message['args'] = args
+        message['kwargs'] = kwargs
+        message['context'] = context
+
+        return message
+
+    def corked(self):
+        """Context manager which holds back messages.
+
+        Actions submitted within the context are sent to the server
+        together when it exits, or earlier if a response needs to
+        be read::
+
+            with taco.corked():
+                futures = [taco.submit_function('math.sqrt', x)
+                           for x in range(100)]
+
+            results = [f.result() for f in futures]
+
+        This uses the transport's :meth:`~taco.transport.TacoTransport.cork`
+        method.
+        """
+
+        return self.xp.corked()
+
+    def batch(self, actions):
+        """Perform a list of actions in a single interaction.
+
+        Each action is given as a message dictionary, in which "args",
+        "kwargs" and "context" may be omitted.  For example, to read
+        six numbers using a Scanner object::
+
+            next_int = {
+                'action': 'call_method',
+                'number': scanner.number,
+                'name': 'nextInt',
+            }
+            numbers = taco.batch([next_int] * 6)
+
+        Returns a list containing the result of each action.  If an
+        action raised an exception, its entry is the corresponding
+        TacoError instance, which is not raised.
+        """
+
+        return self._batch_results(
+            self._interact(self._batch_message(actions)))
+
+    def _batch_message(self, actions):
+        """Private method to construct a batch message."""
+
+        messages = []
+
+        for action in actions:
+            message = {'args': (), 'kwargs': {}, 'context': None}
+            message.update(action)
+            messages.append(message)
+
+        return {
+            'action': 'batch',
+            'actions': messages,
+        }
+
+    def _batch_results(self, responses):
+        """Private method to interpret the responses from a batch action."""
+
+        results = []
+
+        for response in responses:
+            try:
+                results.append(self._handle_response(response))
+            except TacoError as e:
+                results.append(e)
+
+        return results
+
+    def call_class_method(self, class_, name, *args, **kwargs):
+        """Invoke a class method call in the connected server.
+
+        The context (void / scalar / list) can be specified as a
+        keyword argument "context" unless the "disable_context" attribute
+        has been set.
+        """
+
+        return self._interact(self._call_message({
             'action': 'call_class_method',
             'class': class_,
             'name': name,
-            'args': args,
-            'kwargs': kwargs,
-            'context': context,
-        })
+        }, args, kwargs))
+
+    def submit_class_method(self, class_, name, *args, **kwargs):
+        """Submit a class method call without waiting for the result.
+
+        Returns a :class:`~taco.future.TacoFuture`, the "result" method of
+        which gives the value which call_class_method would have returned.
+        """
+
+        return self._submit(self._call_message({
+            'action': 'call_class_method',
+            'class': class_,
+            'name': name,
+        }, args, kwargs))
 
     def call_function(self, name, *args, **kwargs):
         """Invoke a function call in the connected server.
@@ -137,35 +638,86 @@ class Taco():
         has been set.
         """
 
-        if 'context' in kwargs and not self.disable_context:
-            context = kwargs.pop('context')
-        else:
-            context = None
+        return self._interact(self._call_message({
+            'action': 'call_function',
+            'name': name,
+        }, args, kwargs))
 
-        return self._interact({
+    def submit_function(self, name, *args, **kwargs):
+        """Submit a function call without waiting for the result.
+
+        Returns a :class:`~taco.future.TacoFuture`, the "result" method of
+        which gives the value which call_function would have returned.
+        Many calls can be submitted before their responses are read,
+        for example::
+
+            futures = [taco.submit_function('math.sqrt', x)
+                       for x in range(10000)]
+            results = [f.result() for f in futures]
+        """
+
+        return self._submit(self._call_message({
             'action': 'call_function',
             'name': name,
-            'args': args,
-            'kwargs': kwargs,
-            'context': context,
-        })
+        }, args, kwargs))
+
+    def stream_function(self, name, *args, **kwargs):
+        """Invoke a function call and iterate over the list it returns.
+
+        The entries of the list are decoded as they are received, rather
+        than after the whole response has been read, so that they can be
+        processed without waiting for the rest of the list and without
+        holding the whole message in memory::
+
+            for line in taco.stream_function('read_lines', path):
+                process(line)
+
+        If another action is performed before the iteration is
+        complete, the remaining entries are read and stored first.
+        Results are only decoded incrementally when a JSON codec
+        is used and the message is not passed via a file.  Since each
+        entry is decoded separately, a list which fits comfortably in
+        memory is read more quickly by :meth:`call_function`.
+        """
+
+        return self._stream_result(self._call_message({
+            'action': 'call_function',
+            'name': name,
+        }, args, kwargs))
+
+    def _call_handle(self, number, *args, **kwargs):
+        """Private method for TacoObjects to send the call_handle action."""
+
+        return self._interact(self._call_message({
+            'action': 'call_handle',
+            'number': number,
+        }, args, kwargs))
+
+    def _submit_handle(self, number, *args, **kwargs):
+        """Private method for TacoObjects to submit the call_handle action."""
+
+        return self._submit(self._call_message({
+            'action': 'call_handle',
+            'number': number,
+        }, args, kwargs))
 
     def _call_method(self, number, name, *args, **kwargs):
         """Private method for TacoObjects to send the call_method action."""
 
-        if 'context' in kwargs and not self.disable_context:
-            context = kwargs.pop('context')
-        else:
-            context = None
+        return self._interact(self._call_message({
+            'action': 'call_method',
+            'number': number,
+            'name': name,
+        }, args, kwargs))
 
-        return self._interact({
+    def _submit_method(self, number, name, *args, **kwargs):
+        """Private method for TacoObjects to submit the call_method action."""
+
+        return self._submit(self._call_message({
             'action': 'call_method',
             'number': number,
             'name': name,
-            'args': args,
-            'kwargs': kwargs,
-            'context': context,
-        })
+        }, args, kwargs))
 
     def construct_object(self, class_, *args, **kwargs):
         """Invoke an object constructor.
@@ -183,11 +735,13 @@ class Taco():
         })
 
     def _destroy_object(self, number):
-        """Private method for TacoObjects to send the destroy_object action."""
-        self._interact({
-            'action': 'destroy_object',
-            'number': number,
-        })
+        """Private method for TacoObjects to queue the object for destruction.
+        """
+
+        self._destroyed.append(number)
+
+        if len(self._destroyed) >= self.destroy_threshold and not self._busy:
+            self._flush_destroyed()
 
     def _get_attribute(self, number, name):
         """Private method for TacoObjects to send the get_attribute action."""
@@ -221,16 +775,77 @@ class Taco():
         the Taco server implementation.
         """
 
-        self._interact({
+        return self._interact({
             'action': 'import_module',
             'name': name,
             'args': args,
             'kwargs': kwargs,
         })
 
+    def _iterate_object(self, number, size, start=False):
+        """Private method for TacoObjects to send the iterate_object action.
+        """
+
+        return self._interact({
+            'action': 'iterate_object',
+            'number': number,
+            'size': size,
+            'start': start,
+        })
+
+    def _object_iterator(self, obj, size):
+        """Private method giving an iterator over a TacoObject."""
+
+        return obj._iterate(size)
+
+    def map_function(self, name, items, **kwargs):
+        """Call a function for each of a list of sets of arguments.
+
+        Each entry in "items" is a list or tuple of positional arguments
+        for one call, and any keyword arguments are passed to every call.
+        The calls are all made by the server in a single interaction::
+
+            roots = taco.map_function('math.sqrt', [(x,) for x in range(10)])
+
+        Returns a list containing the result of each call.  If a call
+        raised an exception, its entry is the corresponding
+        TacoError instance, which is not raised.
+        """
+
+        return self._batch_results(self._interact(
+            self._map_message(name, items, kwargs)))
+
+    def _map_message(self, name, items, kwargs):
+        """Private method to construct a map_function message."""
+
+        return {
+            'action': 'map_function',
+            'name': name,
+            'items': list(items),
+            'kwargs': kwargs,
+        }
+
+    def resolve_function(self, name):
+        """Look up a function and return a handle for it.
+
+        The server finds the function, or other callable object, in the
+        same way as for call_function, and the result is a
+        :class:`~taco.object.TacoObject` referring to it.  Its
+        :meth:`~taco.object.TacoObject.call` method calls the function
+        without the server having to look up its name again::
+
+            join = taco.resolve_function('os.path.join')
+            path = join.call('a', 'b')
+        """
+
+        return self._interact({
+            'action': 'resolve_function',
+            'name': name,
+        })
+
     def _set_attribute(self, number, name, value):
         """Private method for TacoObjects to send the set_attribute action."""
-        self._interact({
+        return self._interact({
             'action': 'set_attribute',
             'number': number,
             'name': name,
@@ -250,26 +865,44 @@ class Taco():
     def set_value(self, name, value):
         """Set the value of the given variable."""
 
-        self._interact({
+        return self._interact({
             'action': 'set_value',
             'name': name,
             'value': value,
         })
 
-    def function(self, name):
+    def function(self, name, resolve=False):
         """Convience method giving a function which calls call_function.
 
         This example is equivalent to that given for this class::
 
             sleep = taco.function('sleep')
             sleep(5)
+
+        If "resolve" is specified, the function is looked up immediately
+        using resolve_function, and the returned function calls it
+        using its handle.  This avoids sending the function name, and
+        looking it up again, on each call.
         """
 
+        if resolve:
+            return self._handle_function(
+                lambda: self.resolve_function(name))
+
         def func(*args, **kwargs):
             return self.call_function(name, *args, **kwargs)
 
         return func
 
+    def _handle_function(self, resolve):
+        """Private method giving a function which calls a handle.
+
+        The handle is obtained by calling "resolve", which performs
+        the action to look it up.
+        """
+
+        return resolve().call
+
     def constructor(self, class_):
         """Convience method giving a function which calls construct_object.
 
@@ -288,3 +921,59 @@ class Taco():
             return self.construct_object(class_, *args, **kwargs)
 
         return func
+
+
+class _TacoStream():
+    """Iterator over a streamed result.
+
+    Entries are taken from the transport's iterator until
+    the "_finish" method is called, after which the remaining entries
+    are stored in a buffer.  If reading them fails, the exception
+    is raised when the buffer has been exhausted.
+
+    The client is marked as busy while entries are read, so that
+    destroyed objects are not flushed part way through the message.
+    """
+
+    def __init__(self, client, items):
+        self._client = client
+        self._items = items
+        self._buffer = deque()
+        self._error = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._buffer:
+            return self._buffer.popleft()
+
+        if self._items is None:
+            if self._error is not None:
+                (error, self._error) = (self._error, None)
+                raise error
+
+            raise StopIteration
+
+        busy = self._client._busy
+        self._client._busy = True
+
+        try:
+            return next(self._items)
+
+        finally:
+            self._client._busy = busy
+
+    next = __next__
+
+    def _finish(self):
+        """Read and store the remaining entries."""
+
+        if self._items is not None:
+            try:
+                self._buffer.extend(self._items)
+
+            except Exception as e:
+                self._error = e
+
+            self._items = None
@@ -0,0 +1,691 @@
+# Taco Python codec module.
+# Copyright (C) 2014 Graham Bell
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from array import array
+from codecs import getincrementaldecoder, utf_8_decode, utf_8_encode
+from json import JSONDecoder, JSONEncoder
+import re
+import sys
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import rapidjson
+except ImportError:
+    rapidjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+# Marker which must be present in a message for any object to need
+# conversion by the "to_obj" function.
+_marker = b'"_Taco_'
+
+# JSON whitespace, skipped between values by JSONStreamDecoder.
+_whitespace = re.compile(r'[ \t\n\r]*')
+_separator = re.compile(r'[ \t\n\r]*([,\]])[ \t\n\r]*')
+
+# Characters which can follow a complete value.  A value followed by
+# anything else, such as "1" in "1.5", may have been cut off.
+_delimiters = frozenset(' \t\n\r,:]}')
+
+# Characters which can start a number.  Other values end with a character
+# which shows that they are complete.
+_number_start = frozenset('-0123456789')
+
+# MessagePack extension type codes.
+_ext_object = 1
+_ext_integer = 2
+_ext_array = 3
+_ext_ndarray = 4
+
+# Kinds of NumPy dtype which are sent as raw buffers: booleans, integers,
+# floating point and complex numbers.
+_ndarray_kinds = 'biufc'
+
+
+class JSONCodec():
+    """Taco codec class using the standard library json module.
+
+    Codecs convert messages to and from the byte strings which are
+    sent by :class:`~taco.transport.TacoTransport` objects.
+    The "from_obj" and "to_obj" functions are used for the JSON
+    encoder's "default" function and the JSON decoder's
+    "object_hook" parameters respectively.
+    """
+
+    name = 'json'
+    available = True
+    binary = False
+
+    def __init__(self, from_obj=None, to_obj=None):
+        """Construct new codec object."""
+
+        self.from_obj = from_obj
+        self.to_obj = to_obj
+
+        self.encoder = JSONEncoder(default=from_obj)
+        self.decoder = JSONDecoder(object_hook=to_obj)
+
+    def encode(self, message):
+        """Encode a message as a byte string."""
+
+        return utf_8_encode(self.encoder.encode(message))[0]
+
+    def decode(self, data):
+        """Decode a message from a byte string."""
+
+        return self.decoder.decode(utf_8_decode(data)[0])
+
+
+class _FastJSONCodec(JSONCodec):
+    """Base class for codecs using third party JSON modules.
+
+    Subclasses implement the "_dumps" and "_loads" methods.  The results
+    are intended to match those of :class:`JSONCodec`, which is used
+    instead for any message which the third party module cannot handle.
+    If "_loads" does not support an object hook, the "to_obj" function
+    is applied afterwards, to messages which contain Taco objects.
+
+    For the "default" function, tuple subclasses, such as named tuples,
+    are converted to lists as by the standard library.
+    """
+
+    object_hook = False
+
+    def encode(self, message):
+        exported = {}
+
+        def default(obj):
+            if isinstance(obj, tuple):
+                return list(obj)
+
+            return _record(self.from_obj, exported, obj)
+
+        try:
+            return self._dumps(message, default)
+
+        except Exception:
+            pass
+
+        # Repeat the encoding with the standard library, re-using the
+        # results of any "from_obj" calls which have already been made.
+        def replay(obj):
+            return _replay(self.from_obj, exported, obj)
+
+        return utf_8_encode(JSONEncoder(default=replay).encode(message))[0]
+
+    def decode(self, data):
+        try:
+            message = self._loads(data)
+
+        except Exception:
+            return JSONCodec.decode(self, data)
+
+        if (self.to_obj is not None and not self.object_hook and
+                _marker in data):
+            message = _apply_hook(message, self.to_obj)
+
+        return message
+
+
+class OrjsonCodec(_FastJSONCodec):
+    """Taco codec class using the orjson module.
+
+    Note that orjson serializes UUID and enum values itself rather than
+    passing them to the "from_obj" function, writes non-finite
+    numbers as null, and decodes integers which do not fit in 64 bits
+    as floating point numbers.
+    """
+
+    name = 'orjson'
+    available = orjson is not None
+
+    if available:
+        _options = (orjson.OPT_PASSTHROUGH_DATACLASS |
+                    orjson.OPT_PASSTHROUGH_DATETIME |
+                    orjson.OPT_NON_STR_KEYS)
+
+    def _dumps(self, message, default):
+        return orjson.dumps(message, default=default, option=self._options)
+
+    def _loads(self, data):
+        # Memory-mapped messages must be given to orjson as a memoryview.
+        if not isinstance(data, bytes):
+            data = memoryview(data)
+
+        return orjson.loads(data)
+
+
+class RapidjsonCodec(_FastJSONCodec):
+    """Taco codec class using the python-rapidjson module."""
+
+    name = 'rapidjson'
+    available = rapidjson is not None
+    object_hook = True
+
+    def _dumps(self, message, default):
+        return utf_8_encode(rapidjson.dumps(message, default=default))[0]
+
+    def _loads(self, data):
+        return rapidjson.loads(data, object_hook=self.to_obj)
+
+
+class UjsonCodec(_FastJSONCodec):
+    """Taco codec class using the ujson module."""
+
+    name = 'ujson'
+    available = ujson is not None
+
+    def _dumps(self, message, default):
+        return utf_8_encode(ujson.dumps(message, default=default,
+                                        ensure_ascii=False))[0]
+
+    def _loads(self, data):
+        return ujson.loads(data)
+
+
+class MsgpackCodec():
+    """Taco codec class using MessagePack.
+
+    This is a binary format, so messages must be sent using the ``length``
+    framing mode.  Byte strings are sent directly rather than being
+    passed to the "from_obj" function.  Taco object references
+    are sent as an extension type rather than as dictionaries, as are
+    integers which do not fit in 64 bits.
+
+    Typed arrays, i.e. :class:`array.array` objects and, if NumPy is
+    installed, numeric NumPy arrays, are also sent as extension types.
+    These contain the array's type code or dtype, and its byte order or
+    shape, followed by the raw contents of its buffer.  The receiver
+    rebuilds the array from this buffer rather than parsing each element.
+    NumPy arrays of other types, such as dates or structured types,
+    are passed to the "from_obj" function like any other object.
+    """
+
+    name = 'msgpack'
+    available = msgpack is not None
+    binary = True
+
+    def __init__(self, from_obj=None, to_obj=None):
+        """Construct new codec object."""
+
+        self.from_obj = from_obj
+        self.to_obj = to_obj
+
+    def encode(self, message):
+        """Encode a message as a byte string."""
+
+        return msgpack.packb(message, default=self._default, use_bin_type=True)
+
+    def decode(self, data):
+        """Decode a message from a byte string."""
+
+        return msgpack.unpackb(data, raw=False, strict_map_key=False,
+                               ext_hook=self._ext_hook)
+
+    def _default(self, obj):
+        """Convert an object which can not otherwise be encoded.
+
+        This is called for integers which do not fit in 64 bits
+        and for typed arrays, which are converted to extension types.
+        Other objects are passed to the "from_obj" function and the
+        resulting Taco object references converted to an extension type.
+        """
+
+        if isinstance(obj, int):
+            return msgpack.ExtType(_ext_integer, str(obj).encode('ascii'))
+
+        if isinstance(obj, array):
+            return msgpack.ExtType(_ext_array, msgpack.packb(
+                [obj.typecode, sys.byteorder, memoryview(obj)],
+                use_bin_type=True))
+
+        if (numpy is not None and isinstance(obj, numpy.ndarray) and
+                obj.dtype.kind in _ndarray_kinds and
+                obj.dtype.fields is None):
+            shape = obj.shape
+            obj = numpy.ascontiguousarray(obj)
+            return msgpack.ExtType(_ext_ndarray, msgpack.packb(
+                [obj.dtype.str, shape, memoryview(obj).cast('B')],
+                use_bin_type=True))
+
+        if self.from_obj is None:
+            raise TypeError('can not encode object')
+
+        ref = self.from_obj(obj)
+
+        if isinstance(ref, dict) and '_Taco_Object_' in ref:
+            return msgpack.ExtType(_ext_object,
+                                   msgpack.packb(ref['_Taco_Object_']))
+
+        return ref
+
+    def _ext_hook(self, code, data):
+        """Decode an extension type."""
+
+        if code == _ext_object:
+            ref = {'_Taco_Object_': msgpack.unpackb(data)}
+
+            if self.to_obj is None:
+                return ref
+
+            return self.to_obj(ref)
+
+        elif code == _ext_integer:
+            return int(data)
+
+        elif code == _ext_array:
+            (typecode, byteorder, buffer_) = msgpack.unpackb(data, raw=False)
+            result = array(typecode)
+            result.frombytes(buffer_)
+
+            if byteorder != sys.byteorder:
+                result.byteswap()
+
+            return result
+
+        elif code == _ext_ndarray and numpy is not None:
+            (dtype, shape, buffer_) = msgpack.unpackb(data, raw=False)
+            return numpy.frombuffer(buffer_, dtype=dtype).reshape(shape).copy()
+
+        return msgpack.ExtType(code, data)
+
+
+class JSONStreamDecoder():
+    """Incremental JSON decoder.
+
+    Decodes a message from a "read" function, which is called with
+    a size in bytes and returns up to that many bytes of the message,
+    or an empty byte string at the end of the message.  Only part of the
+    text is held in memory at a time: each value is decoded, using the
+    standard library json module, as soon as enough text has been read.
+
+    The :meth:`decode_stream` method allows the entries of a list
+    within the message to be retrieved as they are decoded.
+
+    Since a value may be decoded more than once, if it was cut off at
+    the end of the text read so far, the object hook is applied only
+    once a value has been accepted.
+    """
+
+    chunk_size = 2 ** 16
+
+    def __init__(self, read, object_hook=None):
+        """Construct new streaming decoder object."""
+
+        self._read = read
+        self._decoder = JSONDecoder()
+        self._object_hook = object_hook
+        self._utf_8 = getincrementaldecoder('utf-8')()
+        self._text = ''
+        self._pos = 0
+        self._eof = False
+
+    def decode(self):
+        """Decode the whole message.
+
+        If the message is invalid, the rest of it is read and discarded
+        before the exception is raised.
+        """
+
+        try:
+            value = self._value()
+            self._finish()
+
+        except Exception:
+            self._discard()
+            raise
+
+        return value
+
+    def decode_stream(self, key):
+        """Decode a message, stopping at the start of a list.
+
+        If the message is an object which has a list as the value of
+        the given key, decoding stops at the start of that list.  Returns
+        a dictionary of the object's members decoded so far and
+        an iterator over the entries of the list.  Once the list is
+        exhausted, any remaining members are added to the dictionary.
+        Otherwise the whole message is decoded and returned with an
+        iterator of None.
+
+        The object hook is not applied to the top-level object
+        when decoding stops at a list.  As with :meth:`decode`, the
+        rest of an invalid message is discarded, including when the
+        error is found by the iterator.
+        """
+
+        try:
+            if self._space() != '{':
+                return (self.decode(), None)
+
+            self._pos += 1
+            message = {}
+
+            if self._members(message, key, False):
+                return (message, self._items(message))
+
+            self._finish()
+            return (self._hook(message), None)
+
+        except Exception:
+            self._discard()
+            raise
+
+    def _hook(self, message):
+        """Apply the object hook, if any, to a dictionary."""
+
+        if self._object_hook is None:
+            return message
+
+        return self._object_hook(message)
+
+    def _items(self, message):
+        """Generator which decodes the entries of a list, and then the
+        remaining members of the object containing it."""
+
+        try:
+            if self._space() == ']':
+                self._pos += 1
+
+            else:
+                for value in self._entries():
+                    yield value
+
+            self._members(message, None, True)
+            self._finish()
+
+        except Exception:
+            self._discard()
+            raise
+
+    def _entries(self):
+        """Generator which decodes the entries of a list.
+
+        Entries which lie within the text already read are scanned
+        directly, with the general methods used only at its end.
+        """
+
+        scan_once = self._decoder.scan_once
+        object_hook = self._object_hook
+        separator = _separator.match
+        delimiters = _delimiters
+        number_start = _number_start
+        text = self._text
+        pos = self._pos
+
+        while True:
+            try:
+                (value, end) = scan_once(text, pos)
+            except (StopIteration, ValueError):
+                end = None
+
+            if end is not None and (
+                    text[pos] not in number_start or
+                    (end < len(text) and text[end] in delimiters)):
+                pos = end
+
+                if (object_hook is not None and
+                        isinstance(value, (dict, list))):
+                    value = _apply_hook(value, object_hook)
+
+            else:
+                self._pos = pos
+                value = self._value()
+                text = self._text
+                pos = self._pos
+
+            yield value
+
+            if text.startswith(',', pos):
+                pos += 1
+                continue
+
+            match = separator(text, pos)
+
+            if match is None:
+                self._pos = pos
+                char = self._expect(',]')
+                text = self._text
+                pos = self._pos
+            else:
+                pos = match.end()
+                char = match.group(1)
+
+            if char == ']':
+                break
+
+        self._pos = pos
+
+    def _members(self, message, key, after_value):
+        """Decode the members of an object into a dictionary.
+
+        Returns True if the start of a list which is the value of the
+        given key is reached, or False at the end of the object.
+        """
+
+        while True:
+            if after_value:
+                if self._expect(',}') == '}':
+                    return False
+
+            elif self._space() == '}':
+                self._pos += 1
+                return False
+
+            name = self._value()
+
+            if not isinstance(name, type(u'')):
+                raise ValueError('object key is not a string')
+
+            self._expect(':')
+
+            if name == key and self._space() == '[':
+                self._pos += 1
+                return True
+
+            message[name] = self._value()
+            after_value = True
+
+    def _value(self):
+        """Decode the value at the current position.
+
+        If the value cannot be decoded, more text is read and the
+        attempt repeated.  The amount read is increased each time so that
+        the text of a large value is not decoded many times.  Unless the
+        end of the message has been reached, a number is only accepted
+        if it is followed by a delimiter, since it could be incomplete.
+        """
+
+        self._space()
+        size = self.chunk_size
+
+        while True:
+            try:
+                (value, end) = self._decoder.raw_decode(self._text, self._pos)
+
+                if (self._eof or
+                        self._text[self._pos] not in _number_start or
+                        (end < len(self._text) and
+                         self._text[end] in _delimiters)):
+                    self._pos = end
+
+                    if (self._object_hook is not None and
+                            isinstance(value, (dict, list))):
+                        value = _apply_hook(value, self._object_hook)
+
+                    return value
+
+            except ValueError:
+                if self._eof:
+                    raise
+
+            size = max(size, len(self._text) - self._pos)
+            self._fill(size)
+
+    def _expect(self, chars):
+        """Consume one of the given characters, after any whitespace."""
+
+        char = self._space()
+
+        if not char or char not in chars:
+            raise ValueError('expected one of "{0}" but found "{1}"'.format(
+                chars, char))
+
+        self._pos += 1
+        return char
+
+    def _finish(self):
+        """Check that only whitespace remains in the message."""
+
+        if self._space():
+            raise ValueError('extra data after JSON message')
+
+    def _space(self):
+        """Skip whitespace and return the next character.
+
+        Returns an empty string at the end of the message.
+        """
+
+        while True:
+            self._pos = _whitespace.match(self._text, self._pos).end()
+
+            if self._pos < len(self._text):
+                return self._text[self._pos]
+
+            if self._eof:
+                return ''
+
+            self._fill(self.chunk_size)
+
+    def _discard(self):
+        """Read and discard the rest of the message."""
+
+        while not self._eof:
+            if not self._read(self.chunk_size):
+                self._eof = True
+
+        self._text = ''
+        self._pos = 0
+
+    def _fill(self, size):
+        """Read up to "size" more bytes of the message.
+
+        Text which has already been decoded is discarded.
+        """
+
+        data = self._read(size)
+
+        if data:
+            text = self._utf_8.decode(data)
+        else:
+            text = self._utf_8.decode(b'', True)
+            self._eof = True
+
+        self._text = self._text[self._pos:] + text
+        self._pos = 0
+
+
+_json_codecs = (OrjsonCodec, RapidjsonCodec, UjsonCodec, JSONCodec)
+
+_codecs = _json_codecs + (MsgpackCodec,)
+
+
+def get_codec(name=None):
+    """Find a codec class by name.
+
+    If no name is given, the standard library json codec is returned,
+    since the third party modules do not handle every value in the same
+    way.  A ValueError is raised if the codec is unknown or the module
+    which it requires is not installed.
+    """
+
+    if name is None:
+        return JSONCodec
+
+    for codec in _codecs:
+        if name == codec.name:
+            if codec.available:
+                return codec
+
+            raise ValueError('codec "{0}" is not available'.format(name))
+
+    raise ValueError('unknown codec "{0}"'.format(name))
+
+
+def _record(from_obj, exported, obj):
+    """Call "from_obj" and record the result in the "exported" dictionary.
+    """
+
+    if from_obj is None:
+        raise TypeError('can not encode object')
+
+    result = from_obj(obj)
+    exported.setdefault(id(obj), []).append(result)
+    return result
+
+
+def _replay(from_obj, exported, obj):
+    """Use a result recorded by _record, or call "from_obj" if there is none.
+
+    This allows encoding to be repeated without calling "from_obj"
+    more than once for each occurrence of an object.
+    """
+
+    previous = exported.get(id(obj))
+
+    if previous:
+        return previous.pop()
+
+    return _record(from_obj, exported, obj)
+
+
+def _apply_hook(value, hook):
+    """Apply an object hook function to the dictionaries in a structure.
+
+    The hook is applied to the innermost dictionaries first, as it would be
+    by a JSON decoder.
+    """
+
+    if isinstance(value, dict):
+        for (key, item) in value.items():
+            if isinstance(item, (dict, list)):
+                value[key] = _apply_hook(item, hook)
+
+        return hook(value)
+
+    elif isinstance(value, list):
+        for (i, item) in enumerate(value):
+            if isinstance(item, (dict, list)):
+                value[i] = _apply_hook(item, hook)
+
+    return value
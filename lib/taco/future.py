@@ -0,0 +1,61 @@
+# Taco Python future module.
+# Copyright (C) 2014 Graham Bell
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+class TacoFuture():
+    """Taco future class.
+
+    Represents the response to an action which has been sent to the
+    server but which may not have been read yet.  Instances of this class
+    are returned by the "submit" methods of Taco objects and should
+    not normally be constructed explicitly.
+    """
+
+    def __init__(self, client):
+        """Construct new future object.
+
+        Stores a reference to the Taco client so that responses can be
+        read via it.
+        """
+
+        self.client = client
+        self._done = False
+        self._response = None
+        self._request_bytes = 0
+
+    def _set_response(self, response):
+        """Private method used by the client to store the response."""
+
+        self._response = response
+        self._done = True
+
+    def done(self):
+        """Determine whether the response has been received."""
+
+        return self._done
+
+    def result(self):
+        """Retrieve the result of the action.
+
+        If necessary, responses are read from the server until the
+        response to this action has been received.  If the response is
+        an exception, then a TacoError exception is raised.
+        """
+
+        while not self._done:
+            self.client._receive()
+
+        return self.client._handle_response(self._response)
@@ -0,0 +1,189 @@
+# Taco Python listener module.
+# Copyright (C) 2014 Graham Bell
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import signal
+import socket
+from threading import Thread
+
+from taco.server import TacoServer
+from taco.transport import parse_address
+
+
+class TacoListener():
+    """Taco listener class.
+
+    Listens on a UNIX or TCP socket and, for each connection, starts
+    a thread in which a :class:`~taco.server.TacoServer` handles
+    the connection.  This allows one long-running process to serve
+    many clients.  Each connection has its own server object, and so
+    its own namespace and objects.  Modules can be imported in advance
+    so that they are already loaded when clients import them.
+
+    This is used by the ``taco-python`` script's ``--listen`` option.
+    Clients connect to it by giving the address as the
+    :class:`~taco.client.Taco` constructor's "address" argument.
+    """
+
+    _socket = None
+
+    def __init__(self, address, preload=(), workers=None,
+                 server_class=TacoServer):
+        """Construct new listener and import the "preload" modules.
+
+        The address is either the path of a UNIX socket or of the
+        form ``HOST:PORT``.  If "workers" is given, each server runs
+        in concurrent mode with that many worker threads.  The
+        "server_class" can be used to select a subclass of TacoServer,
+        such as :class:`~taco.aio.AsyncTacoServer`.
+        """
+
+        self.address = address
+        self.workers = workers
+        self.server_class = server_class
+
+        for name in preload:
+            __import__(name, level=0)
+
+    def serve(self):
+        """Accept connections until interrupted.
+
+        A UNIX socket is bound to a temporary name and renamed once it is
+        listening, so that clients do not find it before they can connect.
+        It is removed when the listener exits, which it does
+        normally on receiving SIGTERM.
+        """
+
+        (family, address) = parse_address(self.address)
+
+        sock = self._socket = socket.socket(family, socket.SOCK_STREAM)
+
+        if family == socket.AF_UNIX:
+            tmp_path = '{0}.{1}'.format(address, os.getpid())
+
+            sock.bind(tmp_path)
+            sock.listen(socket.SOMAXCONN)
+            os.rename(tmp_path, address)
+
+        else:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(address)
+            sock.listen(socket.SOMAXCONN)
+
+        signal.signal(signal.SIGTERM, _terminate)
+
+        try:
+            while True:
+                (conn, peer) = sock.accept()
+
+                if family != socket.AF_UNIX:
+                    conn.setsockopt(
+                        socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+                self._handle(conn)
+
+        finally:
+            sock.close()
+
+            if family == socket.AF_UNIX and os.path.exists(address):
+                os.unlink(address)
+
+    def _handle(self, conn):
+        """Handle a connection in a new thread."""
+
+        thread = Thread(target=self._serve_connection, args=(conn,))
+        thread.daemon = True
+        thread.start()
+
+    def _serve_connection(self, conn):
+        """Run a TacoServer for a connection.
+
+        The streams are closed explicitly, rather than when the
+        server is garbage collected, so that the client sees the end
+        of the connection.  TCP connections may be from another host,
+        so the server's transport is marked as not local, preventing
+        the use of files to pass messages.
+        """
+
+        in_ = conn.makefile('rb')
+        out = conn.makefile('wb')
+
+        try:
+            if self.workers:
+                server = self.server_class(in_, out, workers=self.workers)
+            else:
+                server = self.server_class(in_, out)
+
+            if conn.family != socket.AF_UNIX:
+                server.xp.local = False
+
+            server.run()
+
+        finally:
+            out.close()
+            in_.close()
+            conn.close()
+
+
+class TacoForkServer(TacoListener):
+    """Taco fork server class.
+
+    Works like :class:`TacoListener` but, for each connection, forks
+    a child process in which a :class:`~taco.server.TacoServer` handles
+    the connection.
+
+    This is used by the ``taco-python`` script's ``--forkserver`` option.
+    """
+
+    def serve(self):
+        """Accept connections until interrupted.
+
+        Child processes are reaped automatically.
+        """
+
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+        TacoListener.serve(self)
+
+    def _handle(self, conn):
+        """Handle a connection in a child process.
+
+        The child closes its copy of the listening socket, so that
+        the socket is closed once the listener exits.
+        """
+
+        if os.fork() == 0:
+            status = 1
+
+            try:
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+                self._socket.close()
+
+                self._serve_connection(conn)
+                status = 0
+
+            finally:
+                os._exit(status)
+
+        conn.close()
+
+
+def _terminate(signum, frame):
+    """Signal handler which causes the process to exit."""
+
+    raise SystemExit(0)
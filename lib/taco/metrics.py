@@ -0,0 +1,182 @@
+# Taco Python metrics module.
+# Copyright (C) 2014 Graham Bell
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Taco action statistics.
+
+When enabled, the :class:`~taco.client.Taco` client and
+:class:`~taco.server.TacoServer` record the following for each action
+which they perform:
+
+* ``encode_time``: the time taken to encode the outgoing message.
+* ``decode_time``: the time taken to decode the incoming message.
+* ``transit_time`` (client only): the remainder of the time taken by the
+  interaction, including the time spent in the pipes and by the server.
+* ``execution_time`` (server only): the time taken to perform the action.
+* ``request_bytes`` and ``response_bytes``: the sizes of the messages.
+
+Times are in seconds.  For example::
+
+    import taco
+    import taco.metrics
+
+    taco.metrics.enable()
+    ...
+    print(taco.stats())
+
+Statistics for the server can be retrieved by performing these
+calls via the client::
+
+    taco.import_module('taco.metrics')
+    taco.call_function('taco.metrics.enable')
+    ...
+    server_stats = taco.call_function('taco.metrics.stats')
+"""
+
+from bisect import bisect_left
+from threading import Lock
+
+_collector = None
+
+
+class TacoStats():
+    """Taco statistics collector class.
+
+    Keeps counters and histograms of the measurements for each action.
+    The histograms count the times which fall into each of the intervals
+    bounded by the "histogram_bounds" attribute, with a final interval
+    for longer times.
+    """
+
+    histogram_bounds = (1e-5, 1e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0)
+
+    def __init__(self, callback=None):
+        """Construct new statistics collector.
+
+        If a "callback" function is given, it is called with the role
+        ("client" or "server"), action name and a dictionary of
+        measurements for every action recorded.
+        """
+
+        self.callback = callback
+
+        self._lock = Lock()
+        self._actions = {}
+
+    def record(self, role, action, measurements):
+        """Record the measurements for an action."""
+
+        with self._lock:
+            entry = self._actions.get((role, action))
+
+            if entry is None:
+                entry = self._actions[(role, action)] = {'count': 0}
+
+            entry['count'] += 1
+
+            for (name, value) in measurements.items():
+                if name.endswith('_time'):
+                    counter = entry.get(name)
+
+                    if counter is None:
+                        bins = len(self.histogram_bounds) + 1
+                        counter = entry[name] = {
+                            'total': 0.0,
+                            'histogram': [0] * bins,
+                        }
+
+                    counter['total'] += value
+                    counter['histogram'][
+                        bisect_left(self.histogram_bounds, value)] += 1
+
+                else:
+                    entry[name] = entry.get(name, 0) + value
+
+        if self.callback is not None:
+            self.callback(role, action, measurements)
+
+    def summary(self):
+        """Get a summary of the statistics.
+
+        Returns a dictionary containing the histogram bounds and
+        dictionaries of counters for the "client" and "server" roles,
+        indexed by action name.  Each entry gives the number of actions
+        recorded and the total of each measurement, along with
+        a histogram for each time.
+        """
+
+        result = {
+            'histogram_bounds': list(self.histogram_bounds),
+            'client': {},
+            'server': {},
+        }
+
+        with self._lock:
+            for ((role, action), entry) in self._actions.items():
+                summary = {}
+
+                for (name, value) in entry.items():
+                    if isinstance(value, dict):
+                        value = {'total': value['total'],
+                                 'histogram': list(value['histogram'])}
+
+                    summary[name] = value
+
+                result[role][action] = summary
+
+        return result
+
+    def reset(self):
+        """Discard the statistics recorded so far."""
+
+        with self._lock:
+            self._actions = {}
+
+
+def enable(callback=None):
+    """Start recording statistics.
+
+    A new :class:`TacoStats` collector is constructed with the given
+    callback and returned.
+    """
+
+    global _collector
+
+    _collector = TacoStats(callback)
+
+    return _collector
+
+
+def disable():
+    """Stop recording statistics."""
+
+    global _collector
+
+    _collector = None
+
+
+def stats():
+    """Get a summary of the recorded statistics.
+
+    Returns the result of the collector's :meth:`TacoStats.summary` method,
+    or None if statistics are not enabled.
+    """
+
+    collector = _collector
+
+    if collector is None:
+        return None
+
+    return collector.summary()
@@ -0,0 +1,297 @@
+# Taco Python multiplexing client module.
+# Copyright (C) 2014 Graham Bell
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import OrderedDict, deque
+import socket
+from threading import Event, Lock, Thread
+
+try:
+    from time import perf_counter
+except ImportError:
+    from time import time as perf_counter
+
+from taco import metrics
+
+from taco.client import Taco
+from taco.error import TacoError
+from taco.future import TacoFuture
+
+
+class MultiplexTaco(Taco):
+    """Thread-safe Taco client class.
+
+    Allows many threads to share one server.  Each message is tagged
+    with an "id" value, which the server copies to its response, and
+    a background thread reads the responses and passes each to the
+    thread which is waiting for it.  Threads therefore do not have to
+    wait for each other's actions to complete, for example::
+
+        from concurrent.futures import ThreadPoolExecutor
+        from taco.multiplex import MultiplexTaco
+
+        taco = MultiplexTaco(lang='python')
+        taco.import_module('math')
+
+        with ThreadPoolExecutor(8) as executor:
+            roots = list(executor.map(
+                lambda x: taco.call_function('math.sqrt', x), range(100)))
+
+    Responses which do not include an "id" value, for example from
+    servers which do not support this, are assumed to be in the same
+    order as the requests, and are passed to the oldest waiting thread.
+
+    The "max_pending" attribute is not used, since responses are always
+    being read.  As with :class:`~taco.aio.AsyncTaco`, the numbers of
+    destroyed objects are always queued until the next message.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Construct new multiplexing Taco client.
+
+        The arguments are as for :class:`~taco.client.Taco`.
+        """
+
+        self._write_lock = Lock()
+        self._lock = Lock()
+        self._waiting = OrderedDict()
+        self._next_id = 0
+        self._reader = None
+        self._closed = False
+
+        Taco.__init__(self, *args, **kwargs)
+
+        self._destroyed = deque()
+
+    def close(self):
+        """Close the connection to the server.
+
+        Waits for the responses to any actions already sent
+        to be read.
+        """
+
+        with self._write_lock:
+            self.xp.out.close()
+
+            if self._socket is not None:
+                self._socket.shutdown(socket.SHUT_WR)
+
+        if self._reader is not None:
+            self._reader.join()
+
+        self.xp.in_.close()
+        self.xp.remove_files()
+
+    def _interact(self, message):
+        """Private general interaction method used to implement other methods.
+
+        Writes the given message to the server and waits for the
+        background thread to receive the response.  If this is a result,
+        then its value is returned.  If it is an exception, then a
+        TacoError exception is raised.
+
+        If :mod:`taco.metrics` is enabled, statistics for the
+        interaction are recorded.
+        """
+
+        collector = metrics._collector
+
+        if collector is not None:
+            start = perf_counter()
+
+        future = self._send(message)
+        future._event.wait()
+        response = future._response
+
+        if collector is not None and response is not None:
+            self._record_interaction(
+                collector, message['action'], perf_counter() - start,
+                future._last_encode, future._last_decode)
+
+        return self._handle_response(response)
+
+    def _submit(self, message):
+        """Private general method to send a message without waiting.
+
+        Returns a :class:`MultiplexFuture` which will hold the response.
+        """
+
+        return self._send(message)
+
+    def _send(self, message):
+        """Private method to tag a message with an ID and write it.
+
+        Returns a :class:`MultiplexFuture` for the response.  The
+        background thread which reads responses is started when
+        the first message is sent.
+        """
+
+        if self._destroyed:
+            self._flush_destroyed()
+
+        future = MultiplexFuture(self)
+
+        with self._write_lock:
+            with self._lock:
+                if self._closed:
+                    future._set_response(None)
+                    return future
+
+                self._next_id += 1
+                message['id'] = self._next_id
+                self._waiting[self._next_id] = future
+
+            if self._reader is None:
+                self._reader = Thread(target=self._read_responses)
+                self._reader.daemon = True
+                self._reader.start()
+
+            try:
+                self.xp.write(message)
+            except Exception:
+                with self._lock:
+                    self._waiting.pop(message['id'], None)
+                raise
+
+            future._last_encode = self.xp.last_encode
+
+        return future
+
+    def corked(self):
+        """Not supported by this class.
+
+        The transport is shared by all threads, so cannot be corked.
+        """
+
+        raise TacoError('corking is not supported by MultiplexTaco')
+
+    def stream_function(self, name, *args, **kwargs):
+        """Invoke a function call and iterate over the list it returns.
+
+        With this class, the whole response is read by the background
+        thread before iteration begins.
+        """
+
+        return iter(self.call_function(name, *args, **kwargs))
+
+    def _receive(self):
+        """Private method which should not be used with this class.
+
+        Responses are read by the background thread instead.
+        """
+
+        raise TacoError('responses are read by the background thread')
+
+    def _read_responses(self):
+        """Private method run by the thread which reads responses.
+
+        Each response is passed to the future with the matching ID or,
+        if it has no ID, to the oldest one.  When the input stream ends,
+        any remaining futures receive an empty response.
+        """
+
+        try:
+            while True:
+                response = self.xp.read()
+
+                if response is None:
+                    break
+
+                last_decode = self.xp.last_decode
+
+                with self._lock:
+                    id_ = response.pop('id', None)
+
+                    if id_ is not None:
+                        future = self._waiting.pop(id_, None)
+                    elif self._waiting:
+                        future = self._waiting.popitem(last=False)[1]
+                    else:
+                        future = None
+
+                if future is None:
+                    raise TacoError('received unexpected response')
+
+                future._last_decode = last_decode
+                future._set_response(response)
+
+        finally:
+            with self._lock:
+                self._closed = True
+                futures = list(self._waiting.values())
+                self._waiting.clear()
+
+            for future in futures:
+                future._set_response(None)
+
+    def _destroy_object(self, number):
+        """Private method for TacoObjects to queue the object for destruction.
+
+        The queued object numbers are sent before the next message.
+        """
+
+        self._destroyed.append(number)
+
+    def _take_destroyed(self):
+        """Private method to remove and return the queued object numbers.
+
+        Numbers are removed from the queue one at a time so that
+        objects may be destroyed by other threads meanwhile.
+        """
+
+        numbers = []
+
+        try:
+            while True:
+                numbers.append(self._destroyed.popleft())
+        except IndexError:
+            pass
+
+        return numbers
+
+
+class MultiplexFuture(TacoFuture):
+    """Taco future class for use with :class:`MultiplexTaco`.
+
+    The response is set by the client's background thread, and
+    the "result" method waits for it to do so.
+    """
+
+    _last_encode = (0.0, 0)
+    _last_decode = (0.0, 0)
+
+    def __init__(self, client):
+        """Construct new future object."""
+
+        TacoFuture.__init__(self, client)
+        self._event = Event()
+
+    def _set_response(self, response):
+        """Private method used by the client to store the response."""
+
+        TacoFuture._set_response(self, response)
+        self._event.set()
+
+    def result(self):
+        """Retrieve the result of the action.
+
+        Waits until the response to this action has been received.
+        If the response is an exception, then a TacoError exception
+        is raised.
+        """
+
+        self._event.wait()
+
+        return self.client._handle_response(self._response)
@@ -55,6 +55,34 @@ class TacoObject():
 
         return self.client._call_method(self.number, *args, **kwargs)
 
+    def submit_method(self, *args, **kwargs):
+        """Submit a method call without waiting for the result.
+
+        Takes the same arguments as call_method but returns a
+        :class:`~taco.future.TacoFuture`.
+        """
+
+        return self.client._submit_method(self.number, *args, **kwargs)
+
+    def call(self, *args, **kwargs):
+        """Call the object, which should be a function or other callable.
+
+        Handles for functions can be obtained using the client's
+        :meth:`~taco.client.Taco.resolve_function` method.
+        The arguments and "context" are as for call_method.
+        """
+
+        return self.client._call_handle(self.number, *args, **kwargs)
+
+    def submit(self, *args, **kwargs):
+        """Submit a call to the object without waiting for the result.
+
+        Takes the same arguments as call but returns a
+        :class:`~taco.future.TacoFuture`.
+        """
+
+        return self.client._submit_handle(self.number, *args, **kwargs)
+
     def get_attribute(self, *args, **kwargs):
         """Retrieve the value of the given attribute."""
 
@@ -65,7 +93,62 @@ class TacoObject():
 
         return self.client._set_attribute(self.number, *args, **kwargs)
 
-    def method(self, name):
+    def iterate(self, size=None):
+        """Iterate over the object, which should be iterable.
+
+        Returns an iterator which fetches items from the server in lists
+        of "size" items, defaulting to the client's "iterate_size"
+        attribute.  This is also used when the object itself is iterated
+        over, for example::
+
+            for row in taco.call_function('csv.reader', lines):
+                print(row)
+
+        Iterating over the object again restarts the iteration on the
+        server, so only one iterator should be used at a time.
+        A ValueError is raised if "size" is less than one.
+
+        With :class:`~taco.aio.AsyncTaco`, an asynchronous iterator is
+        returned instead, for use with ``async for``.
+        """
+
+        if size is None:
+            size = self.client.iterate_size
+
+        if size < 1:
+            raise ValueError('iterate size must be at least 1')
+
+        return self.client._object_iterator(self, size)
+
+    def _iterate(self, size):
+        """Private generator method used to implement iterate."""
+
+        start = True
+
+        while True:
+            items = self.client._iterate_object(self.number, size, start)
+            start = False
+
+            for item in items:
+                yield item
+
+            if len(items) < size:
+                break
+
+    def __iter__(self):
+        """Iterate over the object using the iterate method."""
+
+        return self.iterate()
+
+    def __aiter__(self):
+        """Iterate asynchronously over the object using the iterate method.
+
+        This is only possible with :class:`~taco.aio.AsyncTaco`.
+        """
+
+        return self.iterate()
+
+    def method(self, name, resolve=False):
         """Convenience method giving a function which calls a method.
 
         Returns a function which can be used to invoke a method on
@@ -73,8 +156,16 @@ class TacoObject():
 
             strftime = afd.method('strftime')
             print(strftime('%Y-%m-%d'))
+
+        If "resolve" is specified, the bound method is fetched immediately
+        using get_attribute, and the returned function calls it using
+        its handle.
         """
 
+        if resolve:
+            return self.client._handle_function(
+                lambda: self.get_attribute(name))
+
         def func(*args, **kwargs):
             return self.call_method(name, *args, **kwargs)
 
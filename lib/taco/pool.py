@@ -0,0 +1,204 @@
+# Taco Python pool module.
+# Copyright (C) 2014 Graham Bell
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import cpu_count
+from threading import RLock
+
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+
+from taco.client import Taco
+
+
+class TacoPoolClient(Taco):
+    """Taco client class for members of a pool.
+
+    Interactions with the server are protected by a lock so that
+    objects belonging to this client can be used from any thread.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Construct new pool member client.
+
+        The arguments are passed to the :class:`~taco.client.Taco`
+        constructor.
+        """
+
+        self._lock = RLock()
+
+        Taco.__init__(self, *args, **kwargs)
+
+    def _interact(self, message):
+        with self._lock:
+            return Taco._interact(self, message)
+
+    def _submit(self, message):
+        with self._lock:
+            return Taco._submit(self, message)
+
+    def _receive(self):
+        with self._lock:
+            Taco._receive(self)
+
+
+class TacoPool():
+    """Taco client pool class.
+
+    Launches a number of servers and distributes actions between them
+    using a thread pool.  Procedural actions are performed by whichever
+    server is idle, so they should not rely on state left by previous
+    actions other than that set up by the import_module and set_value
+    methods, which are applied to every server.
+
+    Objects remain with the server which created them: actions
+    performed via a :class:`~taco.object.TacoObject` are always sent
+    to that server.
+
+    Example::
+
+        from taco.pool import TacoPool
+
+        pool = TacoPool(lang='python', size=4)
+
+        pool.import_module('math')
+        futures = [pool.submit_function('math.factorial', 10000 + x)
+                   for x in range(100)]
+        results = [f.result() for f in futures]
+    """
+
+    def __init__(self, lang=None, script=None, size=None, **kwargs):
+        """Construct new pool by launching "size" servers.
+
+        If the size is not specified, the number of CPUs is used.
+        The "lang" and "script" arguments, and any keyword arguments,
+        are passed to the constructor of each client.
+        """
+
+        if size is None:
+            size = cpu_count()
+
+        self.clients = [self._construct_client(lang, script, **kwargs)
+                        for i in range(size)]
+
+        self._idle = Queue()
+        for client in self.clients:
+            self._idle.put(client)
+
+        self._executor = ThreadPoolExecutor(max_workers=size)
+
+    def _construct_client(self, lang, script, **kwargs):
+        """Construct a client for a member of the pool."""
+
+        return TacoPoolClient(lang=lang, script=script, **kwargs)
+
+    def _dispatch(self, method, *args, **kwargs):
+        """Private method to invoke a client method on an idle client."""
+
+        client = self._idle.get()
+
+        try:
+            return getattr(client, method)(*args, **kwargs)
+        finally:
+            self._idle.put(client)
+
+    def shutdown(self, wait=True):
+        """Shut down the thread pool."""
+
+        self._executor.shutdown(wait=wait)
+
+    def call_class_method(self, *args, **kwargs):
+        """Invoke a class method call in an idle server.
+
+        Takes the same arguments as
+        :meth:`~taco.client.Taco.call_class_method`.
+        """
+
+        return self._dispatch('call_class_method', *args, **kwargs)
+
+    def submit_class_method(self, *args, **kwargs):
+        """Submit a class method call to the thread pool.
+
+        Returns a :class:`concurrent.futures.Future`.
+        """
+
+        return self._executor.submit(
+            self._dispatch, 'call_class_method', *args, **kwargs)
+
+    def call_function(self, *args, **kwargs):
+        """Invoke a function call in an idle server.
+
+        Takes the same arguments as :meth:`~taco.client.Taco.call_function`.
+        """
+
+        return self._dispatch('call_function', *args, **kwargs)
+
+    def submit_function(self, *args, **kwargs):
+        """Submit a function call to the thread pool.
+
+        Returns a :class:`concurrent.futures.Future`.
+        """
+
+        return self._executor.submit(
+            self._dispatch, 'call_function', *args, **kwargs)
+
+    def map_function(self, name, items, **kwargs):
+        """Call a function for each of a list of sets of arguments.
+
+        The items are divided between the servers, which process
+        their share in parallel.  Takes the same arguments as
+        :meth:`~taco.client.Taco.map_function` and returns the results
+        in the same order as the items.
+        """
+
+        items = list(items)
+        size = -(-len(items) // len(self.clients))
+
+        futures = [
+            self._executor.submit(
+                self._dispatch, 'map_function',
+                name, items[i:i + size], **kwargs)
+            for i in range(0, len(items), size or 1)]
+
+        results = []
+
+        for future in futures:
+            results.extend(future.result())
+
+        return results
+
+    def construct_object(self, *args, **kwargs):
+        """Invoke an object constructor in an idle server.
+
+        The returned :class:`~taco.object.TacoObject` remains
+        associated with that server.
+        """
+
+        return self._dispatch('construct_object', *args, **kwargs)
+
+    def import_module(self, *args, **kwargs):
+        """Instruct every server to load the specified module."""
+
+        for client in self.clients:
+            client.import_module(*args, **kwargs)
+
+    def set_value(self, *args, **kwargs):
+        """Set the value of the given variable in every server."""
+
+        for client in self.clients:
+            client.set_value(*args, **kwargs)
@@ -0,0 +1,131 @@
+# Taco Python proxy module.
+# Copyright (C) 2014 Graham Bell
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from taco.object import TacoObject
+
+
+class TacoProxy():
+    """Taco proxy class.
+
+    Wraps a :class:`~taco.object.TacoObject` so that the server object's
+    attributes can be accessed as attributes of the proxy.  Reading an
+    attribute sends a get_attribute action and setting one sends a
+    set_attribute action.  Attribute values which are themselves objects
+    are returned as further proxies, which can be called.  Objects
+    returned by such calls are also wrapped in proxies.  For example::
+
+        from taco.proxy import TacoProxy
+
+        dt = taco.construct_object('datetime.datetime', 2000, 12, 25)
+        dt = TacoProxy(dt, immutable=('year', 'month', 'day'),
+                       methods=('strftime',))
+
+        print(dt.year, dt.month)
+        print(dt.strftime('%Y-%m-%d'))
+
+    The values of attributes named in "immutable" are cached by the proxy.
+    The cache is cleared when an attribute is set via the proxy
+    or a method is called via the proxy.
+
+    Attributes named in "methods" are called using a single call_method
+    action.  Other methods are fetched with get_attribute and then called
+    by handle, which takes an extra round trip and requires the server
+    to support the call_handle action.
+    """
+
+    def __init__(self, object_, immutable=(), methods=(), parent=None):
+        """Construct new proxy for the given object.
+
+        The "parent" is the proxy through which this proxy's object was
+        fetched, if any, whose cache is cleared when this proxy is called.
+        """
+
+        self.__dict__['_object'] = object_
+        self.__dict__['_immutable'] = frozenset(immutable)
+        self.__dict__['_methods'] = frozenset(methods)
+        self.__dict__['_parent'] = parent
+        self.__dict__['_cache'] = {}
+
+    def __getattr__(self, name):
+        """Get an attribute of the server object."""
+
+        if name.startswith('__') and name.endswith('__'):
+            raise AttributeError(name)
+
+        if name in self._methods:
+            return _ProxyMethod(self, name)
+
+        try:
+            return self._cache[name]
+        except KeyError:
+            pass
+
+        value = self._object.get_attribute(name)
+
+        if isinstance(value, TacoObject):
+            value = TacoProxy(value, parent=self)
+
+        if name in self._immutable:
+            self._cache[name] = value
+
+        return value
+
+    def __setattr__(self, name, value):
+        """Set an attribute of the server object."""
+
+        if isinstance(value, TacoProxy):
+            value = value._object
+
+        self._cache.clear()
+        self._object.set_attribute(name, value)
+
+    def __call__(self, *args, **kwargs):
+        """Call the server object.
+
+        For a method, the cache of the proxy for the object to which the
+        method belongs is cleared.
+        """
+
+        if self._parent is not None:
+            self._parent._cache.clear()
+
+        result = self._object.call(*args, **kwargs)
+
+        if isinstance(result, TacoObject):
+            result = TacoProxy(result)
+
+        return result
+
+
+class _ProxyMethod():
+    """Callable which calls a method declared in a proxy's "methods".
+
+    The call is sent as a call_method action on the proxy's object.
+    """
+
+    def __init__(self, proxy, name):
+        self.proxy = proxy
+        self.name = name
+
+    def __call__(self, *args, **kwargs):
+        self.proxy._cache.clear()
+
+        result = self.proxy._object.call_method(self.name, *args, **kwargs)
+
+        if isinstance(result, TacoObject):
+            result = TacoProxy(result)
+
+        return result
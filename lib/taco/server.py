@@ -19,37 +19,100 @@ try:
 except ImportError:
     import __builtin__ as builtins
 
+from collections import deque
+from itertools import islice
 import sys
+from threading import Condition, Lock
+from types import ModuleType
 
+try:
+    from time import perf_counter
+except ImportError:
+    from time import time as perf_counter
+
+from taco import metrics
+from taco.codec import get_codec
 from taco.transport import TacoTransport
 
+# Types of object whose attributes may be looked up via the _find_attr
+# cache.  Only the final attribute of a cached name is checked before
+# the cached result is used, so other attributes are assumed not to be
+# rebound.
+_cacheable_types = (ModuleType, type)
+
+_not_found = object()
+
+# Actions which may be performed by worker threads in concurrent mode.
+# Other actions wait for all outstanding actions to complete.
+_concurrent_actions = frozenset((
+    'call_class_method', 'call_function', 'call_handle', 'call_method',
+    'construct_object', 'get_attribute', 'get_class_attribute', 'get_value',
+    'iterate_object', 'map_function', 'resolve_function',
+))
+
 
 class TacoServer():
     """Taco server class.
 
     This class implements a Taco server for Python.
+
+    If a number of "workers" is given, the server runs in concurrent mode.
+    Messages which include an "id" value, as sent by
+    :class:`~taco.multiplex.MultiplexTaco`, are then performed by a pool
+    of worker threads and their responses written as they complete,
+    so that slow calls, such as those which perform I/O, do not hold up
+    other actions.  Actions involving the same object, as the target of
+    a method call or attribute access or within the arguments, are still
+    performed in the order in which they were received.  Actions which
+    change the
+    server's state, such as import_module and set_value, and messages
+    without an "id", wait for all outstanding actions to complete
+    and are then performed in turn.
     """
 
-    def __init__(self):
+    _transport_class = TacoTransport
+
+    def __init__(self, in_=None, out=None, workers=None):
         """Construct TacoServer object.
 
         This method also calls the _construct_transport method
-        to construct a transport object.
+        to construct a transport object.  If input and output streams
+        are given, the transport uses them rather than standard input
+        and standard output.
+
+        If "workers" is given, the server runs in concurrent mode
+        with that many worker threads.
         """
 
+        self.workers = workers
+
         self.ns = {}
         self.objects = {}
         self.nobject = 0
+        self._object_numbers = {}
+        self._object_refs = {}
+        self._free_numbers = []
+        self._attr_cache = {}
+        self._iterators = {}
+
+        self._write_lock = Lock()
+        self._condition = Condition()
+        self._active = 0
+        self._object_queues = {}
+        self._referenced = None
 
         self._null_result = self._make_result(None)
 
-        self.xp = self._construct_transport()
+        if in_ is None or out is None:
+            self.xp = self._construct_transport()
+        else:
+            self.xp = self._construct_transport(in_, out)
 
-    def _construct_transport(self, in_=None, out=None):
+    def _construct_transport(self, in_=None, out=None, codec=None):
         """Create TacoTransport object.
 
         Constructs a TacoTransport object communicating via standard
-        input and standard output.
+        input and standard output, using the given JSON codec.
 
         sys.stdout is set to sys.stderr to try to avoid text being
         written to standard output, which would corrupt communications
@@ -75,51 +138,303 @@ class TacoServer():
             """Place object in the objects dictionary and return a Taco object
             reference."""
 
-            self.nobject += 1
-            self.objects[self.nobject] = obj
-            return {'_Taco_Object_': self.nobject}
+            return {'_Taco_Object_': self._export_object(obj)}
 
         def to_obj(dict_):
             """If dict_ is a Taco object reference, fetch the corresponding
             object from objects dictionary."""
 
             if '_Taco_Object_' in dict_:
-                return self.objects[dict_['_Taco_Object_']]
+                obj = self.objects[dict_['_Taco_Object_']]
+
+                if self._referenced is not None:
+                    self._referenced.add(id(obj))
+
+                return obj
             else:
                 return dict_
 
-        return TacoTransport(in_, out, from_obj, to_obj)
+        return self._transport_class(in_, out, from_obj, to_obj, codec)
 
     def run(self):
         """Main server function.
 
         Enters a message handling loop.  The loop exits on failure to
         read another message.
+
+        If a message includes an "id" value, it is copied to the
+        response, allowing a multiplexing client to match responses
+        to requests.
+
+        If :mod:`taco.metrics` is enabled, statistics for each
+        action are recorded.
+
+        Once the loop exits, any files written for messages which the
+        client has not read are removed.
         """
 
-        while True:
-            message = self.xp.read()
+        try:
+            if self.workers:
+                self._run_concurrent()
+                return
 
-            if message is None:
-                break
+            while True:
+                message = self.xp.read()
 
-            act = message['action']
+                if message is None:
+                    break
 
-            if hasattr(self, act) and not act.startswith('_'):
-                try:
-                    res = getattr(self, act)(message)
-                except Exception as e:
-                    res = {
-                        'action': 'exception',
-                        'message': 'exception caught: ' + str(e),
-                    }
-            else:
-                res = {
+                self._respond(message, self.xp.last_decode)
+
+        finally:
+            self.xp.remove_files()
+
+    def _run_concurrent(self):
+        """Message handling loop for concurrent mode.
+
+        Waits for outstanding actions, including any queued behind
+        other actions, to complete before returning.
+        """
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+
+        try:
+            while True:
+                self._referenced = set()
+                message = self.xp.read()
+
+                if message is None:
+                    break
+
+                if ('id' in message and
+                        message['action'] in _concurrent_actions):
+                    self._schedule(executor, message, self.xp.last_decode)
+
+                else:
+                    self._wait_idle()
+                    self._respond(message, self.xp.last_decode)
+
+        finally:
+            self._wait_idle()
+            executor.shutdown(wait=True)
+
+    def _wait_idle(self):
+        """Wait until no actions are outstanding in concurrent mode."""
+
+        with self._condition:
+            while self._active:
+                self._condition.wait()
+
+    def _schedule(self, executor, message, last_decode):
+        """Submit a message to the worker threads.
+
+        If an action involving any of the same objects is outstanding,
+        the message is instead queued, to be submitted once it is at the
+        head of the queue for each of its objects.
+        """
+
+        # Entry: message, last_decode, object keys, number of queues
+        # in which the message is waiting behind another.
+        entry = [message, last_decode, self._object_keys(message), 0]
+
+        with self._condition:
+            self._active += 1
+
+            for key in entry[2]:
+                queue = self._object_queues.get(key)
+
+                if queue is None:
+                    self._object_queues[key] = deque((entry,))
+                else:
+                    queue.append(entry)
+                    entry[3] += 1
+
+            if entry[3]:
+                return
+
+        executor.submit(self._perform, executor, entry)
+
+    def _perform(self, executor, entry):
+        """Respond to a message in a worker thread.
+
+        Afterwards any queued messages which were waiting only for this
+        one are submitted.  This happens before the action stops being
+        counted as active, so that the main thread does not shut down
+        the worker threads first.
+        """
+
+        (message, last_decode, keys, waiting) = entry
+        ready = []
+
+        try:
+            self._respond(message, last_decode)
+
+        finally:
+            with self._condition:
+                for key in keys:
+                    queue = self._object_queues[key]
+                    queue.popleft()
+
+                    if queue:
+                        queue[0][3] -= 1
+
+                        if not queue[0][3]:
+                            ready.append(queue[0])
+                    else:
+                        del self._object_queues[key]
+
+            for next_ in ready:
+                executor.submit(self._perform, executor, next_)
+
+            with self._condition:
+                self._active -= 1
+
+                if not self._active:
+                    self._condition.notify_all()
+
+    def _object_keys(self, message):
+        """Find the objects involved in an action, for concurrent mode.
+
+        These are the target object, if any, and any objects referenced
+        in the message, which are recorded by the transport's "to_obj"
+        function while it is decoded.  Returns a set of their identities.
+        The function given to call_handle is not included, since calls
+        to a function need not be ordered, unless it is a method bound
+        to an object.
+        """
+
+        keys = self._referenced
+        number = message.get('number')
+
+        if number is not None:
+            obj = self.objects.get(number)
+
+            if message['action'] == 'call_handle':
+                obj = getattr(obj, '__self__', None)
+
+                if isinstance(obj, _cacheable_types):
+                    obj = None
+
+            if obj is not None:
+                keys.add(id(obj))
+
+        return keys
+
+    def _respond(self, message, last_decode):
+        """Perform the action specified by a message and write the response.
+
+        The "last_decode" argument gives the transport's measurements
+        for the decoding of the message, for :mod:`taco.metrics`.
+        """
+
+        collector = metrics._collector
+
+        if collector is None:
+            response = self._dispatch(message)
+
+        else:
+            start = perf_counter()
+            response = self._dispatch(message)
+            execution_time = perf_counter() - start
+
+        if 'id' in message:
+            response = dict(response, id=message['id'])
+
+        with self._write_lock:
+            self.xp.write(response)
+
+            if collector is not None:
+                self._record_action(
+                    collector, message['action'], execution_time,
+                    last_decode)
+
+    def _record_action(self, collector, action, execution_time,
+                       last_decode):
+        """Record statistics for an action."""
+
+        (decode_time, request_bytes) = last_decode
+        (encode_time, response_bytes) = self.xp.last_encode
+
+        collector.record('server', action, {
+            'decode_time': decode_time,
+            'execution_time': execution_time,
+            'encode_time': encode_time,
+            'request_bytes': request_bytes,
+            'response_bytes': response_bytes,
+        })
+
+    def _dispatch(self, message):
+        """Perform the action specified by a message.
+
+        Returns the response message.  Exceptions raised by the action
+        are converted to exception messages.
+        """
+
+        act = message['action']
+
+        if hasattr(self, act) and not act.startswith('_'):
+            try:
+                return getattr(self, act)(message)
+            except Exception as e:
+                return {
                     'action': 'exception',
-                    'message': 'unknown action: ' + act,
+                    'message': 'exception caught: ' + str(e),
                 }
+        else:
+            return {
+                'action': 'exception',
+                'message': 'unknown action: ' + act,
+            }
+
+    def _export_object(self, obj):
+        """Place an object in the objects dictionary and return its number.
+
+        If the object is already in the dictionary, it keeps the same
+        number and its reference count is incremented.  Otherwise it is
+        given a number from the list of numbers of destroyed objects
+        or, if that is empty, the next unused number.
+        """
+
+        number = self._object_numbers.get(id(obj))
+
+        if number is not None:
+            self._object_refs[number] += 1
+            return number
+
+        if self._free_numbers:
+            number = self._free_numbers.pop()
+        else:
+            self.nobject += 1
+            number = self.nobject
+
+        self.objects[number] = obj
+        self._object_numbers[id(obj)] = number
+        self._object_refs[number] = 1
+
+        return number
 
-            self.xp.write(res)
+    def _release_object(self, number):
+        """Decrement the reference count of an object.
+
+        When it reaches zero, the object is removed from the objects
+        dictionary and its number becomes available for reuse.
+        """
+
+        refs = self._object_refs.pop(number, 1) - 1
+
+        if refs:
+            self._object_refs[number] = refs
+            return
+
+        obj = self.objects.pop(number)
+        self._iterators.pop(number, None)
+
+        if self._object_numbers.get(id(obj)) == number:
+            del self._object_numbers[id(obj)]
+
+        self._free_numbers.append(number)
 
     def _make_result(self, result):
         """Construct Taco result message."""
@@ -138,25 +453,82 @@ class TacoServer():
         remainder of the name are looked up.  An exception is raised
         (explicity) if the root part cannot be found or (implicitly)
         if one of the remaining parts cannot be found.
+
+        The result is cached if the remaining parts are all looked up
+        as attributes of modules or classes.  Cached results are only
+        used while the root part's entry in the "ns" dictionary
+        is unchanged and the final attribute still refers to the same
+        object, so that attributes rebound by other means, such as by
+        a called function or another connection to the same process,
+        are found.  The cache is also cleared by actions which could
+        change such attributes, such as import_module, set_value and
+        set_class_attribute.
         """
 
+        cached = self._attr_cache.get(name)
+
+        if cached is not None:
+            (root, ns_value, parent, last, result) = cached
+
+            if (self.ns.get(root, _not_found) is ns_value and
+                    (parent is None or
+                     getattr(parent, last, _not_found) is result)):
+                return result
+
         parts = name.split('.')
         root = parts.pop(0)
+        ns_value = self.ns.get(root, _not_found)
+        parent = last = None
 
-        if root in self.ns:
-            result = self.ns[root]
+        if ns_value is not _not_found:
+            result = ns_value
         elif root in globals():
             result = globals()[root]
+            (parent, last) = (sys.modules[__name__], root)
         elif hasattr(builtins, root):
             result = getattr(builtins, root)
+            (parent, last) = (builtins, root)
         else:
             raise Exception('cannot find "{0}"'.format(root))
 
+        cacheable = True
+
         for part in parts:
+            if not isinstance(result, _cacheable_types):
+                cacheable = False
+
+            (parent, last) = (result, part)
             result = getattr(result, part)
 
+        if cacheable:
+            self._attr_cache[name] = (root, ns_value, parent, last, result)
+
         return result
 
+    def batch(self, message):
+        """Perform a list of actions.
+
+        Each entry in the message's "actions" list is a message for
+        another action, such as call_function, call_method or
+        get_attribute.  These are performed in order and the result is
+        the list of their response messages.  An exception raised by one
+        action appears as an exception message in its position in the list
+        and does not prevent the remaining actions from being performed.
+        """
+
+        responses = []
+
+        for sub_message in message['actions']:
+            if sub_message['action'] == 'batch':
+                responses.append({
+                    'action': 'exception',
+                    'message': 'batch actions can not be nested',
+                })
+            else:
+                responses.append(self._dispatch(sub_message))
+
+        return self._make_result(responses)
+
     def call_class_method(self, message):
         """Call the class method specified in the message.
 
@@ -180,6 +552,17 @@ class TacoServer():
             *(message['args'] if message['args'] is not None else ()),
             **(message['kwargs'] if message['kwargs'] is not None else {})))
 
+    def call_handle(self, message):
+        """Call an object, typically a function given by resolve_function.
+
+        Works similarly to call_function.
+        """
+
+        func = self.objects[message['number']]
+        return self._make_result(func(
+            *(message['args'] if message['args'] is not None else ()),
+            **(message['kwargs'] if message['kwargs'] is not None else {})))
+
     def call_method(self, message):
         """Call an object method.
 
@@ -191,6 +574,52 @@ class TacoServer():
             *(message['args'] if message['args'] is not None else ()),
             **(message['kwargs'] if message['kwargs'] is not None else {})))
 
+    def configure_transport(self, message):
+        """Configure the transport.
+
+        If "framing" is specified in the message, it selects the framing
+        mode used for subsequent messages, starting with the response to
+        this action.  The transport accepts incoming messages in any
+        framing mode, so the client can switch as soon as it receives
+        the response.
+
+        Similarly "codec" selects the codec used for subsequent messages.
+        Binary codecs name themselves in each message header so that the
+        client can decode the response to this action.
+
+        If "shm_threshold" is specified, subsequent messages of at least
+        this many bytes are passed via temporary files.  This is refused
+        if the connection is not local.
+        """
+
+        framing = message.get('framing')
+        codec = message.get('codec')
+        shm_threshold = message.get('shm_threshold')
+
+        if framing is not None and framing not in self.xp.framings:
+            raise Exception('unknown framing "{0}"'.format(framing))
+
+        if codec is not None:
+            get_codec(codec)
+
+        if shm_threshold is not None:
+            if not isinstance(shm_threshold, int):
+                raise Exception('invalid shm_threshold')
+
+            if not self.xp.local:
+                raise Exception('shm_threshold on non-local connection')
+
+        if framing is not None:
+            self.xp.framing = framing
+
+        if codec is not None:
+            self.xp.set_codec(codec)
+
+        if shm_threshold is not None:
+            self.xp.shm_threshold = shm_threshold
+
+        return self._null_result
+
     def construct_object(self, message):
         """Call an object constructor.
 
@@ -203,9 +632,36 @@ class TacoServer():
             **(message['kwargs'] if message['kwargs'] is not None else {})))
 
     def destroy_object(self, message):
-        """Remove an object from the objects dictionary."""
+        """Release a reference to an object.
+
+        The object is removed from the objects dictionary once every
+        reference to it which has been sent to the client has been released.
+        """
+
+        self._release_object(message['number'])
+        return self._null_result
+
+    def destroy_objects(self, message):
+        """Release references to a list of objects.
+
+        The object numbers are given by the "numbers" list in the message.
+        Each is handled as for destroy_object.  If any of the numbers
+        are unknown, the others are still released before an exception
+        listing them is raised.
+        """
+
+        unknown = []
+
+        for number in message['numbers']:
+            try:
+                self._release_object(number)
+            except KeyError:
+                unknown.append(number)
+
+        if unknown:
+            raise Exception('unknown object numbers: {0}'.format(
+                ', '.join(str(x) for x in unknown)))
 
-        del self.objects[message['number']]
         return self._null_result
 
     def get_attribute(self, message):
@@ -264,13 +720,93 @@ class TacoServer():
             mod = __import__(message['name'], level=0)
             self.ns[mod.__name__] = mod
 
+        self._attr_cache.clear()
+
         return self._null_result
 
+    def iterate_object(self, message):
+        """Get the next items from an iterable object.
+
+        The result is a list of up to "size" items.  An iterator for the
+        object is stored between actions, and replaced by a new iterator
+        if "start" is specified.  Fewer than "size" items are returned
+        once the iterator is exhausted, at which point it is discarded.
+        The "size" must be at least one.
+        """
+
+        number = message['number']
+        size = message['size']
+
+        if not isinstance(size, int) or size < 1:
+            raise Exception('invalid iterate size')
+
+        if message.get('start'):
+            iterator = None
+        else:
+            iterator = self._iterators.get(number)
+
+        if iterator is None:
+            iterator = iter(self.objects[number])
+
+        items = list(islice(iterator, size))
+
+        if len(items) < size:
+            self._iterators.pop(number, None)
+        else:
+            self._iterators[number] = iterator
+
+        return self._make_result(items)
+
+    def map_function(self, message):
+        """Call a function for each entry in the message's "items" list.
+
+        Each item is a list of positional arguments and the "kwargs",
+        if present, are passed to every call.  The result is the list of
+        response messages, as for batch, so that an exception raised for
+        one item appears in its position in the list and does not prevent
+        the remaining items from being processed.
+
+        The context, if present in the message, is ignored.
+        """
+
+        func = self._find_attr(message['name'])
+        kwargs = message.get('kwargs') or {}
+        responses = []
+
+        for args in message['items']:
+            try:
+                responses.append(self._make_result(func(*args, **kwargs)))
+            except Exception as e:
+                responses.append({
+                    'action': 'exception',
+                    'message': 'exception caught: ' + str(e),
+                })
+
+        return self._make_result(responses)
+
+    def resolve_function(self, message):
+        """Look up a function so that it can be called using call_handle.
+
+        The function is found as for call_function and returned as
+        an object reference.
+        """
+
+        func = self._find_attr(message['name'])
+
+        if not callable(func):
+            raise Exception('"{0}" is not callable'.format(message['name']))
+
+        return self._make_result(func)
+
     def set_attribute(self, message):
         """Set an attribute value of an object."""
 
-        setattr(self.objects[message['number']],
-                message['name'], message['value'])
+        obj = self.objects[message['number']]
+        setattr(obj, message['name'], message['value'])
+
+        if isinstance(obj, _cacheable_types):
+            self._attr_cache.clear()
+
         return self._null_result
 
     def set_class_attribute(self, message):
@@ -278,6 +814,7 @@ class TacoServer():
 
         cls = self._find_attr(message['class'])
         setattr(cls, message['name'], message['value'])
+        self._attr_cache.clear()
         return self._null_result
 
     def set_value(self, message):
@@ -299,4 +836,6 @@ class TacoServer():
         except TypeError:
             setattr(base, name, message['value'])
 
+        self._attr_cache.clear()
+
         return self._null_result
@@ -14,56 +14,618 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import atexit
 from codecs import utf_8_decode, utf_8_encode
-from json import JSONDecoder, JSONEncoder
+from contextlib import contextmanager
+import mmap
+import os
+import socket
+import tempfile
+import weakref
+
+try:
+    from time import perf_counter
+except ImportError:
+    from time import time as perf_counter
+
+from taco.codec import JSONStreamDecoder, get_codec
+
+_length_prefix = b'// LENGTH '
+_file_prefix = b'// FILE '
+_end_prefix = b'// END'
+_end_trailer = b'\n// END\n'
+
+# Vectored output function, and the maximum number of buffers which
+# may be passed to it, where available.
+_writev = getattr(os, 'writev', None)
+
+
+def _get_iov_max():
+    """Find the maximum number of buffers which may be passed to writev.
+
+    If the system does not report a limit, or reports that there is no
+    fixed limit, a conservative value is returned.
+    """
+
+    try:
+        iov_max = os.sysconf('SC_IOV_MAX')
+    except (AttributeError, ValueError, OSError):
+        iov_max = -1
+
+    if iov_max <= 0:
+        return 16
+
+    return iov_max
+
+
+_iov_max = _get_iov_max()
+
+# Directory for files used to pass large messages.  Where available,
+# this is a memory-backed file system.
+if os.path.isdir('/dev/shm'):
+    _file_dir = '/dev/shm'
+else:
+    _file_dir = tempfile.gettempdir()
+
+_file_name_prefix = 'taco-'
+
+# Transports which may have written files which have not yet been read.
+_file_transports = weakref.WeakSet()
+
+
+@atexit.register
+def _remove_files():
+    """Remove files left by transports when the process exits."""
+
+    for xp in list(_file_transports):
+        xp.remove_files()
+
+
+def parse_address(address):
+    """Parse a socket address.
+
+    Addresses of the form ``HOST:PORT`` are TCP addresses, where
+    an IPv6 host may be enclosed in square brackets.  Otherwise the
+    address is taken to be the path of a UNIX socket.
+
+    Returns the address family and the address in the form
+    used by the socket module.
+    """
+
+    (host, sep, port) = address.rpartition(':')
+
+    if sep and port.isdigit() and '/' not in address:
+        if host.startswith('[') and host.endswith(']'):
+            return (socket.AF_INET6, (host[1:-1], int(port)))
+
+        return (socket.AF_INET, (host, int(port)))
+
+    return (socket.AF_UNIX, address)
 
 
 class TacoTransport():
     """Taco transport class.
 
     Implements the communication between Taco clients and servers.
+
+    Two framing modes are available for outgoing messages, selected
+    by the "framing" attribute:
+
+    * ``end`` (the default) writes the message text followed by
+      a line reading ``// END``.
+
+    * ``length`` writes a header line of the form ``// LENGTH n``
+      followed by exactly n bytes of message text.
+
+    Incoming messages are accepted in either framing mode.
+
+    Messages are JSON encoded unless a binary codec, such as
+    MessagePack, has been selected.  In that case the ``length`` framing
+    mode is used and the codec name is appended to the header line,
+    for example ``// LENGTH n msgpack``.
+
+    If the "shm_threshold" attribute is set, messages of at least this
+    many bytes are instead written to a temporary file, in shared memory
+    where available, and only a ``// FILE n`` header followed by the
+    n byte file name is written to the output stream.
+    The reader maps the file into memory, decodes the message
+    from it and deletes it.  Since the peer must be able to open the
+    file, this is only possible if the "local" attribute is true.
+    It should be set to False for connections which may be from
+    another host, in which case ``// FILE`` frames are also refused.
+    Files which the peer has not read are removed if a write fails,
+    when :meth:`remove_files` is called, or when the process exits.
+
+    Each message is written in a single operation and the output stream
+    flushed.  Messages of at least "writev_threshold" bytes are written
+    with vectored output, where available, to avoid copying the message
+    into a single buffer.  The :meth:`cork` method can be used to hold
+    messages back, so that a sequence of messages is written in one
+    operation when :meth:`uncork` is called.
+
+    The time taken to encode or decode the most recent message, and
+    its size in bytes, are stored in the "last_encode" and "last_decode"
+    attributes for use by :mod:`taco.metrics`.
     """
 
-    def __init__(self, in_, out, from_obj=None, to_obj=None):
+    framings = ('end', 'length')
+    local = True
+    shm_threshold = None
+    writev_threshold = 2 ** 16
+
+    last_encode = (0.0, 0)
+    last_decode = (0.0, 0)
+
+    def __init__(self, in_, out, from_obj=None, to_obj=None, codec=None):
         """Constructs new TacoTransport object.
 
         Stores the input and output streams.  The "from_obj" and "to_obj"
         functions are used for the JSON encoder's "default" function
         and the JSON decoder's "object_hook" parameters respectively.
+
+        The "codec" argument names the codec to use, as described
+        in :mod:`taco.codec`.  By default the standard library json
+        codec is used.
         """
 
         self.in_ = in_
         self.out = out
 
-        self.encoder = JSONEncoder(default=from_obj)
-        self.decoder = JSONDecoder(object_hook=to_obj)
+        self.from_obj = from_obj
+        self.to_obj = to_obj
+
+        self.framing = 'end'
+
+        self._cork = 0
+        self._corked = []
+        self._files = set()
+
+        self._codecs = {}
+        self.set_codec(codec)
+
+        if self.codec.binary:
+            self._text_codec = self._get_codec(None)
+        else:
+            self._text_codec = self.codec
+
+    def set_codec(self, name=None):
+        """Select the codec used to write messages.
+
+        Raises a ValueError if the codec is not available.
+        """
+
+        self.codec = self._get_codec(name)
+
+    def _get_codec(self, name):
+        """Get a codec object, constructing it if necessary."""
+
+        codec = get_codec(name)
+
+        if codec.name not in self._codecs:
+            self._codecs[codec.name] = codec(self.from_obj, self.to_obj)
+
+        return self._codecs[codec.name]
 
     def read(self):
         """Read a message from the input stream.
 
+        If the first line is a ``// LENGTH`` header, the message body
+        is read in a single operation.  If it is a ``// FILE`` header,
+        the message is read from the named file.  Otherwise lines are
+        read until the ``// END`` marker is found.
+
+        Any messages held back by :meth:`cork` are written first,
+        since the response being read may depend on them.
+
         The decoded message is returned as a data structure, or
         None is returned if nothing was read.
         """
 
-        text = ''
-        while True:
-            line = self.in_.readline()
-            line = utf_8_decode(line)[0]
+        if self._corked:
+            self._flush_corked()
 
-            if line == '' or line.startswith('// END'):
-                break
+        line = self.in_.readline()
+        header = self._frame_header(line)
 
-            text += line
+        if header is not None:
+            (length, codec) = header
+            data = self.in_.read(length)
 
-        if text == '':
-            return None
+            if line.startswith(_file_prefix):
+                return self._read_file(data, codec)
+
+        else:
+            codec = None
+            lines = []
+            while not self._frame_end(line):
+                lines.append(line)
+                line = self.in_.readline()
+
+            data = b''.join(lines)
+
+        return self._decode(data, codec)
+
+    def read_stream(self, key):
+        """Read a message, decoding a list within it incrementally.
+
+        JSON messages are read in chunks and decoded by a
+        :class:`~taco.codec.JSONStreamDecoder`, so that the whole message
+        text is not held in memory.  If the message is a dictionary with
+        a list as the value of the given key, returns the rest of the
+        message and an iterator which reads and decodes the entries
+        of the list.  The iterator must be exhausted before another
+        message is read.  Otherwise returns the message and None,
+        as does a message in a binary codec or ``// FILE`` frame,
+        which is decoded in full.
+
+        Returns (None, None) if nothing was read.
+        """
+
+        if self._corked:
+            self._flush_corked()
+
+        line = self.in_.readline(JSONStreamDecoder.chunk_size)
+
+        # Read the rest of the line if it could be a marker or header.
+        if line.startswith(b'/') and not line.endswith(b'\n'):
+            line += self.in_.readline()
+
+        header = self._frame_header(line)
+
+        if header is not None:
+            (length, codec) = header
+
+            if codec is not None or line.startswith(_file_prefix):
+                data = self.in_.read(length)
+
+                if line.startswith(_file_prefix):
+                    return (self._read_file(data, codec), None)
+
+                return (self._decode(data, codec), None)
+
+            reader = _FrameReader(self.in_, length=length)
+
+        elif self._frame_end(line):
+            return (None, None)
 
-        return self.decoder.decode(text)
+        else:
+            reader = _FrameReader(self.in_, first=line)
+
+        decoder = JSONStreamDecoder(reader.read, self.to_obj)
+
+        return decoder.decode_stream(key)
 
     def write(self, message):
-        """Write a message to the output stream."""
+        """Write a message to the output stream.
+
+        If the transport is corked, the encoded message is held back
+        until it is uncorked.
+        """
+
+        self.write_encoded(self._encode(message))
+
+    def encode(self, message):
+        """Encode a message for writing with :meth:`write_encoded`.
+
+        Returns a list of byte strings.  This allows the size of the
+        message to be found before it is written.
+        """
+
+        return self._encode(message)
+
+    def write_encoded(self, chunks):
+        """Write a message which has been encoded by :meth:`encode`.
+
+        If the transport is corked, the message is held back
+        until it is uncorked.
+        """
+
+        if self._cork:
+            self._corked.extend(chunks)
+        else:
+            self._write_output(chunks)
+
+    def cork(self):
+        """Hold back messages rather than writing them immediately.
+
+        Calls may be nested: messages are written once :meth:`uncork`
+        has been called the same number of times.
+        """
+
+        self._cork += 1
+
+    def uncork(self):
+        """Write any messages held back since :meth:`cork` was called."""
+
+        self._cork -= 1
+
+        if not self._cork and self._corked:
+            self._flush_corked()
+
+    @contextmanager
+    def corked(self):
+        """Context manager which corks the transport for its duration."""
+
+        self.cork()
+
+        try:
+            yield self
+
+        finally:
+            self.uncork()
+
+    def _flush_corked(self):
+        """Write the messages held back by cork."""
+
+        (chunks, self._corked) = (self._corked, [])
+
+        self._write_output(chunks)
+
+    def _write_output(self, chunks):
+        """Write a list of byte strings, removing files if this fails.
+
+        If the output stream can not be written, the peer will not
+        read any of the files written for it.
+        """
+
+        try:
+            self._write_chunks(chunks)
+        except Exception:
+            self.remove_files()
+            raise
+
+    def remove_files(self):
+        """Remove files written for messages which have not been read.
+
+        This should be called once the peer will not read any more
+        messages, for example when the connection has been closed.
+        """
+
+        for name in self._files:
+            try:
+                os.unlink(name)
+            except OSError:
+                pass
+
+        self._files.clear()
+        _file_transports.discard(self)
+
+    def _write_chunks(self, chunks):
+        """Write a list of byte strings to the output stream and flush it.
+
+        Small amounts of data are joined into a single buffer.  Larger
+        amounts are written using vectored output directly to the
+        stream's file descriptor, if it has one.
+        """
+
+        if (_writev is not None and
+                sum(len(x) for x in chunks) >= self.writev_threshold):
+            try:
+                fd = self.out.fileno()
+            except (AttributeError, IOError, ValueError):
+                fd = None
+
+            if fd is not None:
+                self.out.flush()
+                _write_vectored(fd, chunks)
+                return
+
+        if len(chunks) == 1:
+            self.out.write(chunks[0])
+        else:
+            self.out.write(b''.join(chunks))
 
-        message = self.encoder.encode(message)
-        self.out.write(utf_8_encode(message)[0])
-        self.out.write(utf_8_encode('\n// END\n')[0])
         self.out.flush()
+
+    def _frame_header(self, line):
+        """Parse a ``// LENGTH`` or ``// FILE`` header.
+
+        Returns the length of the following data and codec name (or None
+        if not specified), or None if the line is not such a header.
+        """
+
+        for prefix in (_length_prefix, _file_prefix):
+            if line.startswith(prefix):
+                break
+        else:
+            return None
+
+        parts = line[len(prefix):].split()
+
+        if len(parts) > 1:
+            return (int(parts[0]), parts[1].decode('ascii'))
+
+        return (int(parts[0]), None)
+
+    def _frame_end(self, line):
+        """Determine whether a line ends a message in ``// END`` framing.
+
+        This is the case for the ``// END`` marker itself and for
+        an empty line, indicating the end of the input stream.
+        """
+
+        return not line or line.startswith(_end_prefix)
+
+    def _decode(self, data, codec=None):
+        """Decode the body of a message using the named codec.
+
+        If no codec is named, the message is decoded as JSON.
+        Returns None if the data is empty.
+        """
+
+        if not data:
+            return None
+
+        start = perf_counter()
+
+        if codec is None:
+            message = self._text_codec.decode(data)
+        else:
+            message = self._get_codec(codec).decode(data)
+
+        self.last_decode = (perf_counter() - start, len(data))
+
+        return message
+
+    def _read_file(self, name, codec=None):
+        """Decode a message from the file named in a ``// FILE`` frame.
+
+        The file is deleted once it has been opened.  Only files created by
+        _write_file are accepted: a ValueError is raised for other names,
+        or for any file if the transport is not local.
+        """
+
+        if not self.local:
+            raise ValueError('message file on non-local connection')
+
+        name = utf_8_decode(name)[0]
+
+        if (os.path.dirname(name) != _file_dir or
+                not os.path.basename(name).startswith(_file_name_prefix)):
+            raise ValueError('invalid message file "{0}"'.format(name))
+
+        with open(name, 'rb') as f:
+            os.unlink(name)
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            return self._decode(data, codec)
+        finally:
+            data.close()
+
+    def _write_file(self, data):
+        """Write a message to a new temporary file and return its name.
+
+        The name is recorded so that the file can be removed by
+        :meth:`remove_files`.  Names of files which the peer has
+        already read and deleted are discarded first.
+        """
+
+        self._files.difference_update(
+            [x for x in self._files if not os.path.exists(x)])
+
+        (fd, name) = tempfile.mkstemp(prefix=_file_name_prefix, dir=_file_dir)
+
+        self._files.add(name)
+        _file_transports.add(self)
+
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+
+        except Exception:
+            self._files.discard(name)
+            os.unlink(name)
+            raise
+
+        return utf_8_encode(name)[0]
+
+    def _encode(self, message):
+        """Encode a message.
+
+        Returns a list of byte strings to be written to the output
+        stream in the current framing mode.  The message body is kept
+        as a separate entry to avoid copying it.
+        """
+
+        start = perf_counter()
+        data = self.codec.encode(message)
+        self.last_encode = (perf_counter() - start, len(data))
+
+        if self.shm_threshold is not None and len(data) >= self.shm_threshold:
+            name = self._write_file(data)
+
+            if self.codec.binary:
+                header = '{0} {1}\n'.format(len(name), self.codec.name)
+            else:
+                header = '{0}\n'.format(len(name))
+
+            return [_file_prefix + utf_8_encode(header)[0] + name]
+
+        if self.codec.binary:
+            return [_length_prefix +
+                    utf_8_encode('{0} {1}\n'.format(
+                        len(data), self.codec.name))[0],
+                    data]
+
+        if self.framing == 'length':
+            return [_length_prefix +
+                    utf_8_encode('{0}\n'.format(len(data)))[0],
+                    data]
+
+        return [data, _end_trailer]
+
+
+class _FrameReader():
+    """Reads the body of a message in chunks.
+
+    If a "length" is given, exactly that many bytes are read.  Otherwise
+    lines are read, starting with "first", until the ``// END`` marker.
+    """
+
+    def __init__(self, in_, first=b'', length=None):
+        self.in_ = in_
+        self.first = first
+        self.length = length
+        self.line_start = True
+        self.done = False
+
+    def read(self, size):
+        """Read up to "size" bytes of the message body.
+
+        Returns an empty byte string at the end of the message.
+        """
+
+        if self.first:
+            (data, self.first) = (self.first, b'')
+
+        elif self.length is not None:
+            data = self.in_.read(min(size, self.length))
+            self.length -= len(data)
+            return data
+
+        elif self.done:
+            return b''
+
+        else:
+            if self.line_start:
+                size = max(size, len(_end_prefix))
+
+            data = self.in_.readline(size)
+
+            if self.line_start and (not data or data.startswith(_end_prefix)):
+                if data and not data.endswith(b'\n'):
+                    self.in_.readline()
+
+                self.done = True
+                return b''
+
+        self.line_start = data.endswith(b'\n')
+        return data
+
+
+def _write_vectored(fd, chunks):
+    """Write a list of byte strings to a file descriptor using writev.
+
+    Continues after partial writes until all of the data has been written.
+    An IOError is raised if no data could be written.
+    """
+
+    chunks = [memoryview(x) for x in chunks if len(x)]
+    i = 0
+
+    while i < len(chunks):
+        n = _writev(fd, chunks[i:i + _iov_max])
+
+        if not n:
+            raise IOError('writev wrote no data')
+
+        while n:
+            size = len(chunks[i])
+
+            if n >= size:
+                n -= size
+                i += 1
+            else:
+                chunks[i] = chunks[i][n:]
+                n = 0
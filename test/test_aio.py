@@ -0,0 +1,283 @@
+import asyncio
+from codecs import utf_8_decode, utf_8_encode
+from io import BytesIO
+import json
+from unittest import TestCase
+
+from taco.aio import AsyncTaco, AsyncTacoServer, AsyncTacoTransport
+from taco.error import TacoError
+from taco.object import TacoObject
+
+class TacoAsyncTransportTestCase(TestCase):
+    def test_transport(self):
+        async def run():
+            in_ = asyncio.StreamReader()
+            in_.feed_data(utf_8_encode(
+                '{"test_input":1}\n// END\n// LENGTH 16\n{"test_input":2}')[0])
+            in_.feed_eof()
+            out = DummyWriter()
+
+            xp = AsyncTacoTransport(in_, out)
+
+            await xp.write({'test_output': 3})
+
+            self.assertEqual(utf_8_decode(out.getvalue())[0],
+                             "{\"test_output\": 3}\n// END\n")
+
+            self.assertEqual(await xp.read(), {'test_input': 1})
+            self.assertEqual(await xp.read(), {'test_input': 2})
+            self.assertIsNone(await xp.read())
+
+        asyncio.run(run())
+
+class TacoAsyncClientTestCase(TestCase):
+    def test_interaction(self):
+        async def run():
+            t = DummyClient()
+            t._reader = asyncio.ensure_future(t._read_responses())
+
+            f1 = asyncio.ensure_future(t.call_function('f1'))
+            f2 = asyncio.ensure_future(t.call_function('f2'))
+            await asyncio.sleep(0)
+
+            t.in_.feed_data(utf_8_encode(
+                '{"action": "result", "result": 5}\n// END\n'
+                '{"action": "exception", "message": "test_exc"}\n'
+                '// END\n')[0])
+
+            (r1, r2) = await asyncio.gather(f1, f2, return_exceptions=True)
+
+            self.assertEqual(r1, 5)
+            self.assertIsInstance(r2, Exception)
+
+            t._destroy_object(8)
+            f3 = asyncio.ensure_future(t.construct_object('c'))
+            await asyncio.sleep(0)
+
+            t.in_.feed_data(utf_8_encode(
+                '{"action": "result", "result": null}\n// END\n')[0])
+            for i in range(3):
+                await asyncio.sleep(0)
+
+            t.in_.feed_data(utf_8_encode(
+                '{"action": "result", "result": {"_Taco_Object_": 9}}\n'
+                '// END\n')[0])
+
+            r = await f3
+            self.assertIsInstance(r, TacoObject)
+            self.assertEqual(r.number, 9)
+
+            self.assertEqual(utf_8_decode(t.out.getvalue())[0],
+                '{"action": "call_function", "name": "f1", "args": [], '
+                '"kwargs": {}, "context": null}\n// END\n'
+                '{"action": "call_function", "name": "f2", "args": [], '
+                '"kwargs": {}, "context": null}\n// END\n'
+                '{"action": "destroy_objects", "numbers": [8]}\n// END\n'
+                '{"action": "construct_object", "class": "c", "args": [], '
+                '"kwargs": {}}\n// END\n')
+
+            t.in_.feed_eof()
+            await t._reader
+
+            with self.assertRaisesRegex(Exception, 'no response'):
+                await t.get_value('v')
+
+        asyncio.run(run())
+
+    def test_interaction_errors(self):
+        async def run():
+            t = DummyClient()
+            t._reader = asyncio.ensure_future(t._read_responses())
+
+            with self.assertRaises(ValueError):
+                await t.call_function('abs', object())
+            self.assertEqual(len(t._pending), 0)
+
+            f1 = asyncio.ensure_future(t.call_function('abs', -1))
+            await asyncio.sleep(0)
+
+            t.in_.feed_data(utf_8_encode(
+                '{"action": "result", "result": 1}\n// END\n')[0])
+            self.assertEqual(await f1, 1)
+
+            # Cancelled actions should be skipped at the end of input.
+            f2 = asyncio.ensure_future(t.call_function('f2'))
+            await asyncio.sleep(0)
+            f2.cancel()
+            await asyncio.sleep(0)
+
+            t.in_.feed_eof()
+            await t._reader
+            self.assertTrue(f2.cancelled())
+
+        asyncio.run(run())
+
+    def test_iterate(self):
+        async def run():
+            t = DummyClient()
+            t.iterate_size = 2
+            t._reader = asyncio.ensure_future(t._read_responses())
+
+            obj = TacoObject(t, 7)
+
+            with self.assertRaisesRegex(TacoError, 'async for'):
+                list(obj)
+
+            async def collect():
+                return [x async for x in obj]
+
+            f = asyncio.ensure_future(collect())
+            await asyncio.sleep(0)
+            t.in_.feed_data(utf_8_encode(
+                '{"action": "result", "result": [1, 2]}\n// END\n')[0])
+            for i in range(3):
+                await asyncio.sleep(0)
+            t.in_.feed_data(utf_8_encode(
+                '{"action": "result", "result": [3]}\n// END\n')[0])
+
+            self.assertEqual(await f, [1, 2, 3])
+
+            self.assertEqual(utf_8_decode(t.out.getvalue())[0],
+                '{"action": "iterate_object", "number": 7, "size": 2, '
+                '"start": true}\n// END\n'
+                '{"action": "iterate_object", "number": 7, "size": 2, '
+                '"start": false}\n// END\n')
+
+            del obj
+            t.in_.feed_eof()
+            await t._reader
+
+        asyncio.run(run())
+
+    def test_function_resolve(self):
+        async def run():
+            t = DummyClient()
+            t._reader = asyncio.ensure_future(t._read_responses())
+
+            func = t.function('f', resolve=True)
+            self.assertEqual(t.out.getvalue(), b'')
+
+            f1 = asyncio.ensure_future(func(1))
+            await asyncio.sleep(0)
+
+            t.in_.feed_data(utf_8_encode(
+                '{"action": "result", "result": {"_Taco_Object_": 3}}\n'
+                '// END\n')[0])
+            for i in range(3):
+                await asyncio.sleep(0)
+
+            t.in_.feed_data(utf_8_encode(
+                '{"action": "result", "result": 5}\n// END\n')[0])
+            self.assertEqual(await f1, 5)
+
+            f2 = asyncio.ensure_future(func(2))
+            await asyncio.sleep(0)
+
+            t.in_.feed_data(utf_8_encode(
+                '{"action": "result", "result": 6}\n// END\n')[0])
+            self.assertEqual(await f2, 6)
+
+            self.assertEqual(utf_8_decode(t.out.getvalue())[0],
+                '{"action": "resolve_function", "name": "f"}\n// END\n'
+                '{"action": "call_handle", "number": 3, "args": [1], '
+                '"kwargs": {}, "context": null}\n// END\n'
+                '{"action": "call_handle", "number": 3, "args": [2], '
+                '"kwargs": {}, "context": null}\n// END\n')
+
+            t.in_.feed_eof()
+            await t._reader
+
+        asyncio.run(run())
+
+class TacoAsyncServerTestCase(TestCase):
+    def test_serve(self):
+        async def slow(x, delay):
+            await asyncio.sleep(delay)
+            return x
+
+        async def fail():
+            raise Exception('test_exc')
+
+        async def run():
+            in_ = asyncio.StreamReader()
+            out = DummyWriter()
+            ts = AsyncTacoServer(in_, out)
+            ts.ns['slow'] = slow
+            ts.ns['fail'] = fail
+            ts.ns['x'] = []
+
+            in_.feed_data(utf_8_encode(
+                '{"action": "call_function", "name": "slow", '
+                '"args": [1, 0.05], "kwargs": {}, "id": 1}\n// END\n'
+                '{"action": "call_function", "name": "slow", '
+                '"args": [2, 0], "kwargs": {}, "id": 2}\n// END\n'
+                '{"action": "call_function", "name": "fail", '
+                '"args": [], "kwargs": {}}\n// END\n'
+                '{"action": "map_function", "name": "slow", '
+                '"items": [[3, 0.01], [4, 0]], "id": 3}\n// END\n')[0])
+            in_.feed_eof()
+
+            await ts.serve()
+
+            return utf_8_decode(out.getvalue())[0]
+
+        responses = [json.loads(x)
+                     for x in asyncio.run(run()).split('\n// END\n')[:-1]]
+
+        self.assertEqual(responses, [
+            {'action': 'result', 'result': 2, 'id': 2},
+            {'action': 'result', 'result': 1, 'id': 1},
+            {'action': 'exception', 'message': 'exception caught: test_exc'},
+            {'action': 'result', 'id': 3, 'result': [
+                {'action': 'result', 'result': 3},
+                {'action': 'result', 'result': 4}]},
+        ])
+
+    def test_serve_ordering(self):
+        items = []
+
+        async def add(target, item, delay):
+            await asyncio.sleep(delay)
+            (target if target is items else target[0]).append(item)
+
+        async def run():
+            in_ = asyncio.StreamReader()
+            out = DummyWriter()
+            ts = AsyncTacoServer(in_, out)
+            ts.ns['add'] = add
+            ref = json.dumps({'_Taco_Object_': ts._export_object(items)})
+
+            in_.feed_data(utf_8_encode(
+                '{"action": "call_function", "name": "add", '
+                '"args": [' + ref + ', 1, 0.05], "kwargs": {}, "id": 1}'
+                '\n// END\n'
+                '{"action": "call_function", "name": "add", '
+                '"args": [[' + ref + '], 2, 0], "kwargs": {}, "id": 2}'
+                '\n// END\n')[0])
+            in_.feed_eof()
+
+            await ts.serve()
+
+            return ts
+
+        ts = asyncio.run(run())
+        self.assertEqual(items, [1, 2])
+        self.assertEqual(ts._object_tasks, {})
+
+class DummyWriter(BytesIO):
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+class DummyClient(AsyncTaco):
+    def __init__(self):
+        AsyncTaco.__init__(self, script='dummy')
+        self.in_ = asyncio.StreamReader()
+        self.out = DummyWriter()
+
+        self.xp = self._construct_transport(self.in_, self.out)
@@ -0,0 +1,25 @@
+from unittest import TestCase
+
+from taco.bench import _percentile, _summary, bench_in_process
+
+class TacoBenchTestCase(TestCase):
+    def test_summary(self):
+        times = [float(x) for x in range(101, 0, -1)]
+
+        self.assertEqual(_percentile(sorted(times), 90), 91.0)
+
+        self.assertEqual(_summary(times), {
+            'count': 101,
+            'mean': 51.0,
+            'min': 1.0,
+            'max': 101.0,
+            'p50': 51.0,
+            'p90': 91.0,
+            'p99': 100.0,
+        })
+
+    def test_in_process(self):
+        results = bench_in_process('json', 'length', [10, 1000], 3)
+
+        self.assertEqual([r['size'] for r in results], [10, 1000])
+        self.assertEqual([r['count'] for r in results], [3, 3])
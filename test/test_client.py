@@ -1,7 +1,13 @@
+from collections import deque
 from io import BytesIO
 from unittest import TestCase
+try:
+    from unittest.mock import Mock, patch
+except ImportError:
+    from mock import Mock, patch
 
 from taco import Taco
+from taco.codec import JSONStreamDecoder
 from taco.object import TacoObject
 
 from . import DummyBase
@@ -9,6 +15,8 @@ from . import DummyBase
 # This assert method was renamed in Python 3.2.
 if not hasattr(TestCase, 'assertRaisesRegex'):
     TestCase.assertRaisesRegex = TestCase.assertRaisesRegexp
+if not hasattr(TestCase, 'assertRegex'):
+    TestCase.assertRegex = TestCase.assertRegexpMatches
 
 class TacoClientMethodTestCase(TestCase):
     def test_interaction(self):
@@ -44,9 +52,200 @@ class TacoClientMethodTestCase(TestCase):
         self.assertIsInstance(r, TacoObject)
         self.assertEqual(r.number, 78)
 
+    def test_pipelining(self):
+        t = DummyClient()
+
+        t.prepare_input('{"action": "result", "result": 1}\n// END\n'
+                        '{"action": "exception", "message": "test_exc"}\n'
+                        '// END\n'
+                        '{"action": "result", "result": 3}')
+
+        f1 = t.submit_function('f1')
+        f2 = t.submit_function('f2')
+        self.assertFalse(f1.done())
+        self.assertFalse(f2.done())
+
+        self.assertEqual(t._interact({'action': 'test'}), 3)
+        self.assertTrue(f1.done())
+        self.assertTrue(f2.done())
+        self.assertEqual(f1.result(), 1)
+
+        with self.assertRaisesRegex(Exception, 'test_exc'):
+            f2.result()
+
+        t.prepare_input('{"action": "result", "result": 4}\n// END\n'
+                        '{"action": "result", "result": 5}')
+
+        t.max_pending = 1
+        f4 = t.submit_function('f4')
+        f5 = t.submit_function('f5')
+        self.assertTrue(f4.done())
+        self.assertFalse(f5.done())
+        self.assertEqual(f5.result(), 5)
+        self.assertEqual(f4.result(), 4)
+
+        t.prepare_input('{"action": "result", "result": 6}\n// END\n'
+                        '{"action": "result", "result": 7}\n// END\n'
+                        '{"action": "result", "result": 8}\n// END\n'
+                        '{"action": "result", "result": 9}')
+
+        t.max_pending = 100
+        t.max_pending_bytes = 400
+        f6 = t.submit_function('f6', 'x' * 100)
+        f7 = t.submit_function('f7', 'x')
+        self.assertFalse(f6.done())
+        f8 = t.submit_function('f8', 'x' * 100)
+        self.assertTrue(f6.done())
+        self.assertFalse(f7.done())
+        self.assertEqual(t._interact({'action': 'test', 'x': 'x' * 200}), 9)
+        self.assertEqual([f.result() for f in (f6, f7, f8)], [6, 7, 8])
+        self.assertEqual(t._pending_bytes, 0)
+
+    def test_corked(self):
+        t = DummyClient()
+
+        t.prepare_input('{"action": "result", "result": 1}\n// END\n'
+                        '{"action": "result", "result": 2}')
+
+        with t.corked():
+            f1 = t.submit_function('f1')
+            f2 = t.submit_function('f2')
+            self.assertEqual(t.out.getvalue(), b'')
+
+        self.assertEqual(t.get_output(),
+            '{"action": "call_function", "name": "f1", "args": [], '
+            '"kwargs": {}, "context": null}\n// END\n'
+            '{"action": "call_function", "name": "f2", "args": [], '
+            '"kwargs": {}, "context": null}')
+
+        self.assertEqual(f1.result(), 1)
+        self.assertEqual(f2.result(), 2)
+
+    def test_stream_function(self):
+        t = DummyClient()
+
+        t.prepare_input('{"action": "result", "result": [1, 2, 3]}\n// END\n'
+                        '{"action": "result", "result": 4}')
+
+        r = t.stream_function('f1')
+        self.assertEqual(next(r), 1)
+        self.assertEqual(t._interact({'action': 'test'}), 4)
+        self.assertEqual(list(r), [2, 3])
+
+        t.prepare_input('{"action": "exception", "message": "test_exc"}')
+
+        with self.assertRaisesRegex(Exception, 'test_exc'):
+            t.stream_function('f2')
+
+        t.prepare_input('{"action": "result", "result": 5}')
+
+        with self.assertRaisesRegex(Exception, 'not a list'):
+            t.stream_function('f3')
+
+        t.prepare_input('{"action": "result", "result": [1, 2.5, x]}\n// END\n'
+                        '{"action": "result", "result": 6}')
+
+        r = t.stream_function('f4')
+        self.assertEqual(next(r), 1)
+        self.assertEqual(t._interact({'action': 'test'}), 6)
+        self.assertEqual(next(r), 2.5)
+        with self.assertRaises(ValueError):
+            next(r)
+        self.assertEqual(list(r), [])
+
+        # Destroyed objects should not be flushed part way through
+        # reading a streamed result.
+        t.destroy_threshold = 1
+        t._flush_destroyed = Mock()
+
+        t.prepare_input('{"action": "result", "result": [1, 2, 3, 4]}')
+
+        with patch.object(JSONStreamDecoder, 'chunk_size', 4):
+            r = t.stream_function('f5')
+            readline = t.in_.readline
+
+            def readline_destroying(*args):
+                Taco._destroy_object(t, 99)
+                return readline(*args)
+
+            t.in_.readline = readline_destroying
+            self.assertEqual(next(r), 1)
+            self.assertEqual(next(r), 2)
+            t._finish_stream()
+            self.assertEqual(list(r), [3, 4])
+
+        t._flush_destroyed.assert_not_called()
+
+    def test_batch(self):
+        t = DummyClient()
+
+        t.prepare_input('{"action": "result", "result": ['
+                        '{"action": "result", "result": 1}, '
+                        '{"action": "exception", "message": "test_exc"}]}')
+
+        r = t.batch([
+            {'action': 'call_function', 'name': 'f1'},
+            {'action': 'get_attribute', 'number': 5, 'name': 'a2'},
+        ])
+
+        self.assertEqual(t.get_output(),
+            '{"action": "batch", "actions": ['
+            '{"args": [], "kwargs": {}, "context": null, '
+            '"action": "call_function", "name": "f1"}, '
+            '{"args": [], "kwargs": {}, "context": null, '
+            '"action": "get_attribute", "number": 5, "name": "a2"}]}')
+
+        self.assertEqual(r[0], 1)
+        self.assertIsInstance(r[1], Exception)
+        self.assertRegex(str(r[1]), 'test_exc')
+
+    def test_destroy_fallback(self):
+        t = DummyClient()
+
+        t.prepare_input('{"action": "exception", "message": "unknown action"}')
+        t._destroyed = [1, 2]
+        t._flush_destroyed()
+        self.assertFalse(t._bulk_destroy)
+        self.assertEqual(t.get_output(),
+            '{"action": "destroy_objects", "numbers": [1, 2]}\n// END\n'
+            '{"action": "destroy_object", "number": 1}\n// END\n'
+            '{"action": "destroy_object", "number": 2}')
+        self.assertEqual(len(t._pending), 2)
+
+    def test_configure_transport(self):
+        t = DummyClient()
+
+        t.prepare_input('{"action": "result", "result": null}')
+        self.assertTrue(t._configure_transport('length'))
+        self.assertEqual(t.get_output(),
+            '{"action": "configure_transport", "framing": "length"}')
+        self.assertEqual(t.xp.framing, 'length')
+
+        t = DummyClient()
+
+        t.prepare_input('{"action": "exception", "message": "unknown action"}')
+        self.assertFalse(t._configure_transport('length'))
+        self.assertEqual(t.xp.framing, 'end')
+        t.get_output()
+
+        with self.assertRaises(ValueError):
+            t._configure_transport('non-existent framing')
+
+        with self.assertRaises(ValueError):
+            t._configure_transport(codec='non-existent codec')
+
+        self.assertTrue(t._configure_transport('end', 'json'))
+        self.assertEqual(t.out.getvalue(), b'')
+
+    def test_shm_threshold_address(self):
+        with self.assertRaises(ValueError):
+            Taco(address='localhost:1', shm_threshold=1000)
+
 class DummyClient(Taco, DummyBase):
     def __init__(self):
         self.disable_context = False
+        self._pending = deque()
+        self._destroyed = []
         self.in_ = BytesIO()
         self.out = BytesIO()
 
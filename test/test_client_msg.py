@@ -40,6 +40,27 @@ class TacoClientActionTestCase(TestCase):
             'context': None,
         })
 
+    def test_call_handle(self):
+        t = DummyClient()
+        o = TacoObject(t, 4455)
+        o.call(1, two=2, context='scalar')
+        self.assertEqual(t.msg, {
+            'action': 'call_handle',
+            'number': 4455,
+            'args': (1,),
+            'kwargs': {'two': 2},
+            'context': 'scalar',
+        })
+
+        o.submit(3)
+        self.assertEqual(t.msg, {
+            'action': 'call_handle',
+            'number': 4455,
+            'args': (3,),
+            'kwargs': {},
+            'context': None,
+        })
+
     def test_construct_object(self):
         t = DummyClient()
         t.construct_object('tc', 5, 6, 7, 8, x=111, y=222)
@@ -54,10 +75,23 @@ class TacoClientActionTestCase(TestCase):
         t = DummyClient()
         o = TacoObject(t, 55555)
         del o
+        self.assertIsNone(t.msg)
+        self.assertEqual(t._destroyed, [55555])
+        t._flush_destroyed()
+        self.assertEqual(t.msg, {
+            'action': 'destroy_objects',
+            'numbers': [55555],
+        })
+        self.assertEqual(t._destroyed, [])
+
+        t._bulk_destroy = False
+        for number in range(t.destroy_threshold):
+            TacoObject(t, number)
         self.assertEqual(t.msg, {
             'action': 'destroy_object',
-            'number': 55555,
+            'number': t.destroy_threshold - 1,
         })
+        self.assertEqual(t._destroyed, [])
 
     def test_get_attribute(self):
         t = DummyClient()
@@ -96,6 +130,35 @@ class TacoClientActionTestCase(TestCase):
             'kwargs': {},
         })
 
+    def test_iterate_object(self):
+        t = DummyClient()
+        t._iterate_object(4141, 10, True)
+        self.assertEqual(t.msg, {
+            'action': 'iterate_object',
+            'number': 4141,
+            'size': 10,
+            'start': True,
+        })
+
+    def test_map_function(self):
+        t = DummyClient()
+        t._batch_results = lambda x: x
+        t.map_function('mf', ((x,) for x in range(3)), y=1)
+        self.assertEqual(t.msg, {
+            'action': 'map_function',
+            'name': 'mf',
+            'items': [(0,), (1,), (2,)],
+            'kwargs': {'y': 1},
+        })
+
+    def test_resolve_function(self):
+        t = DummyClient()
+        t.resolve_function('os.path.join')
+        self.assertEqual(t.msg, {
+            'action': 'resolve_function',
+            'name': 'os.path.join',
+        })
+
     def test_set_attrbute(self):
         t = DummyClient()
         o = TacoObject(t, 7777777)
@@ -139,6 +202,38 @@ class TacoClientConvenienceTestCase(TestCase):
             'context': None,
         })
 
+    def test_submit(self):
+        t = DummyClient()
+        t.submit_function('subfunc', 1, 2, x=3, context='list')
+        self.assertEqual(t.msg, {
+            'action': 'call_function',
+            'name': 'subfunc',
+            'args': (1, 2),
+            'kwargs': {'x': 3},
+            'context': 'list',
+        })
+
+        t.submit_class_method('subclass', 'submeth', 4)
+        self.assertEqual(t.msg, {
+            'action': 'call_class_method',
+            'class': 'subclass',
+            'name': 'submeth',
+            'args': (4,),
+            'kwargs': {},
+            'context': None,
+        })
+
+        o = TacoObject(t, 4545)
+        o.submit_method('objmeth', 5)
+        self.assertEqual(t.msg, {
+            'action': 'call_method',
+            'number': 4545,
+            'name': 'objmeth',
+            'args': (5,),
+            'kwargs': {},
+            'context': None,
+        })
+
     def test_constructor(self):
         t = DummyClient()
         c = t.constructor('convclass')
@@ -153,6 +248,11 @@ class TacoClientConvenienceTestCase(TestCase):
 class DummyClient(Taco):
     def __init__(self):
         self.msg = None
+        self.disable_context = False
+        self._destroyed = []
 
     def _interact(self, msg):
         self.msg = msg
+
+    def _submit(self, msg):
+        self.msg = msg
@@ -0,0 +1,268 @@
+from array import array
+from codecs import utf_8_encode
+from collections import namedtuple
+from datetime import date
+import json
+from unittest import TestCase, skipIf
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
+
+from taco.codec import JSONCodec, JSONStreamDecoder, MsgpackCodec, \
+    _json_codecs, get_codec
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+TT = namedtuple('TT', ['x', 'y'])
+
+class TacoCodecTestCase(TestCase):
+    def test_get_codec(self):
+        self.assertIs(get_codec('json'), JSONCodec)
+        self.assertIs(get_codec(), JSONCodec)
+
+        with self.assertRaises(ValueError):
+            get_codec('non-existent codec')
+
+        for codec in _json_codecs:
+            if not codec.available:
+                with self.assertRaises(ValueError):
+                    get_codec(codec.name)
+
+    def test_codecs(self):
+        for codec in _json_codecs:
+            if codec.available:
+                self._test_codec(codec)
+
+    def _test_codec(self, codec):
+        exported = []
+
+        def from_obj(obj):
+            exported.append(obj)
+            return {'_Taco_Object_': len(exported)}
+
+        def to_obj(dict_):
+            if '_Taco_Object_' in dict_:
+                return exported[dict_['_Taco_Object_'] - 1]
+            return dict_
+
+        c = codec(from_obj, to_obj)
+        d = date(2000, 4, 1)
+
+        message = {
+            'action': 'result',
+            'result': [1, 2.5, 'é', None, True, TT(3, 4), {'d': d}, (d,)],
+        }
+
+        self.assertEqual(c.decode(c.encode(message)), {
+            'action': 'result',
+            'result': [1, 2.5, 'é', None, True, [3, 4], {'d': d}, [d]],
+        }, codec.name)
+        self.assertEqual(len(exported), 2)
+
+        # Values which not all JSON modules can handle.
+        message = [d, 2 ** 70, d, -2 ** 70]
+        data = c.encode(message)
+        self.assertEqual(len(exported), 4, codec.name)
+        if codec.name != 'orjson':
+            self.assertEqual(c.decode(data), message, codec.name)
+
+        nan = c.decode(b'[NaN]')[0]
+        self.assertNotEqual(nan, nan)
+
+        with self.assertRaises(TypeError):
+            codec().encode([d])
+
+    def test_stream_decoder(self):
+        def reader(text, size=3):
+            data = [utf_8_encode(text)[0]]
+
+            def read(n):
+                (result, data[0]) = (data[0][:min(n, size)],
+                                     data[0][min(n, size):])
+                return result
+
+            return read
+
+        def to_obj(dict_):
+            if 'o' in dict_:
+                return ('object', dict_['o'])
+            return dict_
+
+        text = ('{"action": "result", "result": [12345, "caf\u00e9 \u00e9", '
+                '{"o": 1}, [1, [2]], {"a": {"o": 22}}, true, null, -0.5e3], '
+                '"id": 678}\n')
+
+        d = JSONStreamDecoder(reader(text), to_obj)
+        (message, items) = d.decode_stream('result')
+
+        self.assertEqual(message, {'action': 'result'})
+        self.assertEqual(next(items), 12345)
+        self.assertEqual(list(items), [
+            'caf\u00e9 \u00e9', ('object', 1), [1, [2]],
+            {'a': ('object', 22)}, True, None, -500.0])
+        self.assertEqual(message, {'action': 'result', 'id': 678})
+
+        self.assertEqual(
+            JSONStreamDecoder(reader(text), to_obj).decode(),
+            json.loads(text, object_hook=to_obj))
+
+        for (text, expected) in [
+                ('{"action": "result", "result": 12}',
+                 {'action': 'result', 'result': 12}),
+                ('{"action": "exception", "message": "x"}',
+                 {'action': 'exception', 'message': 'x'}),
+                ('{"o": 5}', ('object', 5)),
+                ('{}', {}),
+                ('[1, 2]', [1, 2]),
+                ('  1234567 ', 1234567)]:
+            self.assertEqual(
+                JSONStreamDecoder(reader(text), to_obj).decode_stream(
+                    'result'),
+                (expected, None))
+
+        (message, items) = JSONStreamDecoder(
+            reader('{"result": []}')).decode_stream('result')
+        self.assertEqual(list(items), [])
+
+        for text in ['{"result": [1, 2}', '{"result": 1} 2', '{"a" 1}',
+                     '[1, 2', '', '{1: 2}']:
+            with self.assertRaises(ValueError):
+                d = JSONStreamDecoder(reader(text))
+                (message, items) = d.decode_stream('result')
+                if items is not None:
+                    list(items)
+
+        # Large values should be decoded without excessive repetition.
+        text = '[' + ', '.join(['"' + 'x' * 10000 + '"'] * 10) + ']'
+        read = Mock(side_effect=reader(text, len(text)))
+        d = JSONStreamDecoder(read)
+        d.chunk_size = 100
+        self.assertEqual(d.decode(), ['x' * 10000] * 10)
+        self.assertLess(read.call_count, 100)
+
+        # Numbers cut off at the end of a chunk should not be accepted.
+        numbers = [1.5, -0.25, 12345.678, 1.5e-07, -2e+30, 7, 1e100, 0.0]
+        text = json.dumps({'result': numbers * 3, 'x': 1.25e5})
+
+        for size in range(1, 14):
+            d = JSONStreamDecoder(reader(text, size))
+            d.chunk_size = size
+            (message, items) = d.decode_stream('result')
+            self.assertEqual(list(items), numbers * 3)
+            self.assertEqual(message, {'x': 1.25e5})
+
+        # The object hook should be called once per object, however
+        # the text is divided into chunks.
+        entries = [{'n': i, 'p': [{'o': -i}]} for i in range(20)]
+        text = json.dumps({'result': entries, 'x': {'o': 99}})
+
+        for size in range(1, len(text) + 1):
+            hook = Mock(side_effect=to_obj)
+            d = JSONStreamDecoder(reader(text, size), hook)
+            d.chunk_size = size
+            (message, items) = d.decode_stream('result')
+            self.assertEqual(
+                list(items),
+                [{'n': i, 'p': [('object', -i)]} for i in range(20)])
+            self.assertEqual(message, {'x': ('object', 99)})
+            self.assertEqual(hook.call_count, 41)
+
+            hook = Mock(side_effect=to_obj)
+            d = JSONStreamDecoder(reader(text, size), hook)
+            d.chunk_size = size
+            d.decode()
+            self.assertEqual(hook.call_count, 42)
+
+        for text in ['{"result": 1.', '{"result": [2.5e', '[1.5e-']:
+            with self.assertRaises(ValueError):
+                d = JSONStreamDecoder(reader(text, 2))
+                (message, items) = d.decode_stream('result')
+                if items is not None:
+                    list(items)
+
+        # Members before the list should be decoded without reading
+        # the whole message, and an invalid message should be discarded.
+        text = '{"a": 1, "b": "c", "result": [1, 2, x, 3]}'
+        read = Mock(side_effect=reader(text, 10))
+        d = JSONStreamDecoder(read)
+        d.chunk_size = 10
+        (message, items) = d.decode_stream('result')
+        self.assertEqual(message, {'a': 1, 'b': 'c'})
+        self.assertLess(read.call_count, 4)
+        self.assertEqual([next(items), next(items)], [1, 2])
+        with self.assertRaises(ValueError):
+            next(items)
+        self.assertEqual(read(10), b'')
+
+    @skipIf(not MsgpackCodec.available, 'msgpack not installed')
+    def test_msgpack(self):
+        exported = []
+
+        def from_obj(obj):
+            exported.append(obj)
+            return {'_Taco_Object_': len(exported)}
+
+        def to_obj(dict_):
+            return exported[dict_['_Taco_Object_'] - 1]
+
+        c = MsgpackCodec(from_obj, to_obj)
+        d = date(2000, 4, 1)
+
+        message = {
+            'action': 'result',
+            'result': [1, 2.5, 'é', b'\xff', TT(3, 4), {1: d}, 2 ** 70],
+        }
+
+        self.assertEqual(c.decode(c.encode(message)), {
+            'action': 'result',
+            'result': [1, 2.5, 'é', b'\xff', [3, 4], {1: d}, 2 ** 70],
+        })
+        self.assertEqual(len(exported), 1)
+
+    @skipIf(not MsgpackCodec.available, 'msgpack not installed')
+    def test_msgpack_array(self):
+        c = MsgpackCodec()
+
+        a = array('d', [1.5, -2.0, 1e100])
+        result = c.decode(c.encode({'args': [a, array('b')]}))['args']
+
+        self.assertIsInstance(result[0], array)
+        self.assertEqual(result[0].typecode, 'd')
+        self.assertEqual(result[0], a)
+        self.assertEqual(result[1], array('b'))
+
+    @skipIf(not MsgpackCodec.available or numpy is None,
+            'msgpack or numpy not installed')
+    def test_msgpack_ndarray(self):
+        c = MsgpackCodec()
+
+        a = numpy.arange(12, dtype='>i4').reshape((3, 4))
+        result = c.decode(c.encode([a.T]))[0]
+
+        self.assertEqual(result.dtype, a.dtype)
+        self.assertEqual(result.shape, (4, 3))
+        self.assertTrue((result == a.T).all())
+        self.assertTrue(result.flags.writeable)
+
+        for a in [numpy.array(2.5), numpy.array([True, False]),
+                  numpy.arange(4, dtype=complex)]:
+            result = c.decode(c.encode(a))
+            self.assertEqual(result.dtype, a.dtype)
+            self.assertEqual(result.shape, a.shape)
+            self.assertTrue((result == a).all())
+
+        # Other dtypes should be passed to from_obj.
+        from_obj = Mock(return_value={'_Taco_Object_': 5})
+        c = MsgpackCodec(from_obj)
+
+        for a in [numpy.array(['2000-01-02'], dtype='datetime64[D]'),
+                  numpy.array([1], dtype='timedelta64[s]'),
+                  numpy.zeros(2, dtype=[('x', 'i4'), ('y', 'f8')]),
+                  numpy.array(['x'])]:
+            from_obj.reset_mock()
+            self.assertEqual(c.decode(c.encode(a)), {'_Taco_Object_': 5})
+            from_obj.assert_called_once_with(a)
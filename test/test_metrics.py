@@ -0,0 +1,79 @@
+from unittest import TestCase
+
+import taco
+from taco import metrics
+from taco.metrics import TacoStats
+
+from .test_client import DummyClient
+from .test_server import DummyServer
+
+class TacoMetricsTestCase(TestCase):
+    def tearDown(self):
+        metrics.disable()
+
+    def test_stats(self):
+        records = []
+        s = TacoStats(callback=lambda *args: records.append(args))
+
+        s.record('client', 'call_function', {
+            'encode_time': 0.5e-5,
+            'request_bytes': 10,
+        })
+        s.record('client', 'call_function', {
+            'encode_time': 0.5,
+            'request_bytes': 20,
+        })
+
+        self.assertEqual(s.summary(), {
+            'histogram_bounds': [1e-5, 1e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0],
+            'client': {
+                'call_function': {
+                    'count': 2,
+                    'encode_time': {
+                        'total': 0.500005,
+                        'histogram': [1, 0, 0, 0, 0, 1, 0, 0],
+                    },
+                    'request_bytes': 30,
+                },
+            },
+            'server': {},
+        })
+
+        self.assertEqual(records[0], ('client', 'call_function', {
+            'encode_time': 0.5e-5,
+            'request_bytes': 10,
+        }))
+
+        s.reset()
+        self.assertEqual(s.summary()['client'], {})
+
+    def test_enable(self):
+        self.assertIsNone(taco.stats())
+
+        metrics.enable()
+
+        t = DummyClient()
+        t.prepare_input('{"action": "result", "result": 46}')
+        t._interact({'action': 'test'})
+
+        ts = DummyServer()
+        ts.prepare_input('{"action": "get_value", "name": "x"}')
+        ts.ns['x'] = 'abc'
+        ts.run()
+
+        stats = taco.stats()
+
+        self.assertEqual(stats['client']['test']['count'], 1)
+        self.assertEqual(stats['client']['test']['request_bytes'], 18)
+        self.assertEqual(stats['client']['test']['response_bytes'], 35)
+        self.assertEqual(set(stats['client']['test']),
+                         set(('count', 'encode_time', 'transit_time',
+                              'decode_time', 'request_bytes',
+                              'response_bytes')))
+
+        self.assertEqual(stats['server']['get_value']['count'], 1)
+        self.assertEqual(stats['server']['get_value']['response_bytes'], 37)
+        self.assertIn('execution_time', stats['server']['get_value'])
+
+        metrics.disable()
+        self.assertIsNone(taco.stats())
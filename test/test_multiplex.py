@@ -0,0 +1,92 @@
+from codecs import utf_8_decode, utf_8_encode
+from collections import OrderedDict, deque
+from io import BytesIO
+import json
+import os
+from threading import Lock
+from unittest import TestCase
+
+from taco.error import TacoError
+from taco.multiplex import MultiplexTaco
+
+# This assert method was renamed in Python 3.2.
+if not hasattr(TestCase, 'assertRaisesRegex'):
+    TestCase.assertRaisesRegex = TestCase.assertRaisesRegexp
+
+class TacoMultiplexClientTestCase(TestCase):
+    def test_interaction(self):
+        t = DummyClient()
+
+        f1 = t.submit_function('f1')
+        f2 = t.submit_function('f2')
+        f3 = t.submit_function('f3')
+
+        self.assertEqual(
+            [json.loads(x)['id'] for x in t.get_messages()], [1, 2, 3])
+
+        t.respond('{"action": "result", "result": 2, "id": 2}')
+        self.assertEqual(f2.result(), 2)
+        self.assertFalse(f1.done())
+
+        t.respond('{"action": "result", "result": 1}')
+        self.assertEqual(f1.result(), 1)
+        self.assertFalse(f3.done())
+
+        t._bulk_destroy = True
+        t._destroy_object(8)
+        f4 = t.submit_function('f4')
+
+        messages = [json.loads(x) for x in t.get_messages()]
+        self.assertEqual(messages[0]['action'], 'destroy_objects')
+        self.assertEqual(messages[0]['numbers'], [8])
+        self.assertEqual(messages[0]['id'], 4)
+        self.assertEqual(messages[1]['id'], 5)
+
+        t.respond('{"action": "result", "result": null, "id": 4}')
+        t.respond('{"action": "exception", "message": "test_exc", "id": 3}')
+
+        with self.assertRaises(TacoError):
+            f3.result()
+
+        t.close_input()
+
+        with self.assertRaisesRegex(TacoError, 'no response'):
+            f4.result()
+
+        with self.assertRaisesRegex(TacoError, 'no response'):
+            t.call_function('f5')
+
+class DummyClient(MultiplexTaco):
+    def __init__(self):
+        self.disable_context = False
+        self._write_lock = Lock()
+        self._lock = Lock()
+        self._waiting = OrderedDict()
+        self._next_id = 0
+        self._reader = None
+        self._closed = False
+        self._destroyed = deque()
+
+        (r, w) = os.pipe()
+        self.in_ = os.fdopen(r, 'rb')
+        self.in_write = os.fdopen(w, 'wb')
+        self.out = BytesIO()
+
+        self.xp = self._construct_transport(self.in_, self.out)
+
+    def respond(self, string):
+        self.in_write.write(utf_8_encode(string + '\n// END\n')[0])
+        self.in_write.flush()
+
+    def close_input(self):
+        self.in_write.close()
+        self._reader.join()
+        self.in_.close()
+
+    def get_messages(self):
+        with self._write_lock:
+            r = utf_8_decode(self.out.getvalue())[0]
+            self.out.seek(0)
+            self.out.truncate()
+
+        return r.split('\n// END\n')[:-1]
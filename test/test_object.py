@@ -4,6 +4,7 @@ try:
 except ImportError:
     from mock import Mock
 
+from taco.client import Taco
 from taco.object import TacoObject
 
 class TacoObjectTestCase(TestCase):
@@ -27,6 +28,16 @@ class TacoObjectTestCase(TestCase):
         client._call_method.assert_called_with(
             84, 'test_method', 1, 2, three=3, four=4)
 
+        obj.submit_method('test_method', 5, six=6)
+        client._submit_method.assert_called_with(
+            84, 'test_method', 5, six=6)
+
+        obj.call(7, eight=8)
+        client._call_handle.assert_called_with(84, 7, eight=8)
+
+        obj.submit(9)
+        client._submit_handle.assert_called_with(84, 9)
+
         obj.set_attribute('test_attribute', 4444)
         client._set_attribute.assert_called_with(
             84, 'test_attribute', 4444)
@@ -46,3 +57,35 @@ class TacoObjectTestCase(TestCase):
         conv(5, 6, 7, 8)
 
         client._call_method.assert_called_with(333, 'conv', 5, 6, 7, 8)
+
+        handle = TacoObject(client, 334)
+        client._get_attribute = Mock(return_value=handle)
+        client._handle_function = lambda resolve: Taco._handle_function(
+            client, resolve)
+
+        conv = obj.method('conv', resolve=True)
+        client._get_attribute.assert_called_with(333, 'conv')
+
+        conv(9)
+        client._call_handle.assert_called_with(334, 9)
+
+    def test_iterate(self):
+        client = Mock()
+        client.iterate_size = 2
+        client._iterate_object = Mock(side_effect=[[1, 2], [3]])
+        client._object_iterator = lambda obj, size: Taco._object_iterator(
+            client, obj, size)
+
+        obj = TacoObject(client, 55)
+
+        self.assertEqual(list(obj), [1, 2, 3])
+        self.assertEqual([c[0] for c in client._iterate_object.call_args_list],
+                         [(55, 2, True), (55, 2, False)])
+
+        client._iterate_object = Mock(side_effect=[[4, 5, 6], []])
+        self.assertEqual(list(obj.iterate(3)), [4, 5, 6])
+        self.assertEqual(client._iterate_object.call_count, 2)
+
+        with self.assertRaises(ValueError):
+            obj.iterate(0)
+        self.assertEqual(client._iterate_object.call_count, 2)
@@ -0,0 +1,74 @@
+from threading import Lock
+from unittest import TestCase
+
+from taco.pool import TacoPool, TacoPoolClient
+from taco.object import TacoObject
+
+class TacoPoolTestCase(TestCase):
+    def test_pool(self):
+        p = DummyPool(size=3)
+
+        self.assertEqual(len(p.clients), 3)
+
+        p.import_module('mod', 'name')
+
+        for client in p.clients:
+            self.assertEqual(client.msgs, [{
+                'action': 'import_module',
+                'name': 'mod',
+                'args': ('name',),
+                'kwargs': {},
+            }])
+            client.msgs = []
+
+        futures = [p.submit_function('func', x) for x in range(30)]
+        self.assertEqual(sorted(f.result() for f in futures), list(range(30)))
+
+        self.assertEqual(
+            sum(len(client.msgs) for client in p.clients), 30)
+
+        for client in p.clients:
+            client.msgs = []
+
+        self.assertEqual(p.map_function('func', [(x,) for x in range(10)]),
+                         list(range(10)))
+        self.assertEqual([len(client.msgs[0]['items'])
+                          for client in p.clients
+                          if client.msgs], [4, 4, 2])
+        self.assertEqual(p.map_function('func', []), [])
+
+        o = p.construct_object('cls')
+        self.assertIsInstance(o, TacoObject)
+        self.assertIn(o.client, p.clients)
+
+        o.call_method('meth')
+        self.assertEqual(o.client.msgs[-1]['action'], 'call_method')
+
+        p.shutdown()
+
+class DummyPool(TacoPool):
+    def _construct_client(self, lang, script, **kwargs):
+        return DummyClient()
+
+class DummyClient(TacoPoolClient):
+    def __init__(self):
+        self._lock = Lock()
+        self.disable_context = False
+        self.msgs = []
+
+    def _interact(self, msg):
+        with self._lock:
+            self.msgs.append(msg)
+
+            if msg['action'] == 'construct_object':
+                return TacoObject(self, 1)
+
+            if msg['action'] == 'map_function':
+                return [{'action': 'result', 'result': args[0]}
+                        for args in msg['items']]
+
+            if msg['args']:
+                return msg['args'][0]
+
+    def _destroy_object(self, number):
+        pass
@@ -0,0 +1,72 @@
+from unittest import TestCase
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
+
+from taco.object import TacoObject
+from taco.proxy import TacoProxy
+
+class TacoProxyTestCase(TestCase):
+    def test_attributes(self):
+        client = Mock()
+        client._get_attribute = Mock(return_value=2000)
+
+        p = TacoProxy(TacoObject(client, 12), immutable=('year',))
+
+        self.assertEqual(p.year, 2000)
+        self.assertEqual(p.year, 2000)
+        self.assertEqual(p.month, 2000)
+        self.assertEqual(p.month, 2000)
+        self.assertEqual(client._get_attribute.call_count, 3)
+
+        p.month = 6
+        client._set_attribute.assert_called_with(12, 'month', 6)
+
+        self.assertEqual(p.year, 2000)
+        self.assertEqual(client._get_attribute.call_count, 4)
+
+        with self.assertRaises(AttributeError):
+            p.__html__
+
+    def test_call(self):
+        client = Mock()
+        client._get_attribute = Mock(side_effect=[
+            TacoObject(client, 13), 2000, 2000, TacoObject(client, 13), 1999])
+        client._call_handle = Mock(return_value=TacoObject(client, 14))
+
+        p = TacoProxy(TacoObject(client, 12), immutable=('year',))
+
+        m = p.method
+        self.assertIsInstance(m, TacoProxy)
+        self.assertEqual(p.year, 2000)
+
+        r = m(1, two=2)
+        client._call_handle.assert_called_with(13, 1, two=2)
+        self.assertIsInstance(r, TacoProxy)
+        self.assertEqual(r._object.number, 14)
+
+        self.assertEqual(p.year, 2000)
+        self.assertEqual(client._get_attribute.call_count, 3)
+
+        self.assertEqual(p.method.year, 1999)
+        client._get_attribute.assert_called_with(13, 'year')
+
+    def test_methods(self):
+        client = Mock()
+        client._get_attribute = Mock(return_value=2000)
+        client._call_method = Mock(return_value=TacoObject(client, 14))
+
+        p = TacoProxy(TacoObject(client, 12), immutable=('year',),
+                      methods=('method',))
+
+        self.assertEqual(p.year, 2000)
+
+        r = p.method(1, two=2)
+        client._call_method.assert_called_with(12, 'method', 1, two=2)
+        self.assertIsInstance(r, TacoProxy)
+        self.assertEqual(r._object.number, 14)
+
+        self.assertEqual(p.year, 2000)
+        self.assertEqual(client._get_attribute.call_count, 2)
+        client._call_handle.assert_not_called()
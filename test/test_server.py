@@ -1,14 +1,21 @@
+from codecs import utf_8_encode
 from collections import namedtuple
 from datetime import date, datetime
 from io import BytesIO
+import json
 from unittest import TestCase
 from sys import version, version_info
+from time import sleep
 
 from taco.server import TacoServer
 from taco.object import TacoObject
 
 from . import DummyBase
 
+# This assert method was renamed in Python 3.2.
+if not hasattr(TestCase, 'assertRaisesRegex'):
+    TestCase.assertRaisesRegex = TestCase.assertRaisesRegexp
+
 class TacoServerMethodTestCase(TestCase):
     def test_server_construction(self):
         ts = DummyServer()
@@ -16,6 +23,100 @@ class TacoServerMethodTestCase(TestCase):
         self.assertEqual(ts._null_result,
             {'action': 'result', 'result': None})
 
+    def test_run_id(self):
+        ts = DummyServer()
+
+        ts.prepare_input('{"action": "get_value", "name": "x", "id": 7}')
+        ts.ns['x'] = 3
+        ts.run()
+
+        self.assertEqual(ts.get_output(),
+                         '{"action": "result", "result": 3, "id": 7}')
+
+    def test_run_concurrent(self):
+        ts = DummyServer()
+        ts.workers = 4
+
+        obj = SlowList()
+        number = ts._export_object(obj)
+        ts.ns['sleep'] = sleep
+
+        messages = [
+            {'action': 'call_method', 'number': number, 'name': 'add',
+             'args': [1, 0.05], 'kwargs': {}, 'id': 1},
+            {'action': 'call_method', 'number': number, 'name': 'add',
+             'args': [2, 0], 'kwargs': {}, 'id': 2},
+            {'action': 'call_function', 'name': 'sleep',
+             'args': [0.01], 'kwargs': {}, 'id': 3},
+            {'action': 'get_attribute', 'number': number, 'name': 'items'},
+        ]
+
+        ts.in_.write(b''.join(
+            utf_8_encode(json.dumps(x) + '\n// END\n')[0]
+            for x in messages))
+        ts.in_.seek(0)
+        ts.run()
+
+        responses = [json.loads(x) for x in
+                     ts.get_output().split('\n// END\n')]
+
+        self.assertEqual(
+            sorted(x['id'] for x in responses[:3]), [1, 2, 3])
+        self.assertEqual(
+            [x['id'] for x in responses if x.get('id') in (1, 2)], [1, 2])
+        self.assertEqual(responses[3], {'action': 'result', 'result': [1, 2]})
+        self.assertEqual(ts._active, 0)
+        self.assertEqual(ts._object_queues, {})
+
+    def test_run_concurrent_ordering(self):
+        ts = DummyServer()
+        ts.workers = 4
+
+        obj = SlowList()
+        number = ts._export_object(obj)
+        ref = {'_Taco_Object_': number}
+
+        # Queued actions must still be answered when the input ends.
+        messages = [
+            {'action': 'call_method', 'number': number, 'name': 'add',
+             'args': [1, 0.05], 'kwargs': {}, 'id': 1},
+            {'action': 'call_method', 'number': number, 'name': 'add',
+             'args': [2, 0], 'kwargs': {}, 'id': 2},
+            {'action': 'call_function', 'name': 'add_to',
+             'args': [ref, 3], 'kwargs': {}, 'id': 3},
+            {'action': 'call_function', 'name': 'add_to',
+             'args': [], 'kwargs': {'list_': [[ref]], 'item': 4}, 'id': 4},
+        ]
+
+        ts.in_.write(b''.join(
+            utf_8_encode(json.dumps(x) + '\n// END\n')[0]
+            for x in messages))
+        ts.in_.seek(0)
+        ts.ns['add_to'] = lambda list_, item: (
+            list_ if isinstance(list_, SlowList) else list_[0][0]).add(item, 0)
+        ts.run()
+
+        responses = [json.loads(x) for x in
+                     ts.get_output().split('\n// END\n')]
+
+        self.assertEqual([x['id'] for x in responses], [1, 2, 3, 4])
+        self.assertEqual(obj.items, [1, 2, 3, 4])
+        self.assertEqual(ts._active, 0)
+        self.assertEqual(ts._object_queues, {})
+
+        # Calls to a function handle are not ordered, unless it is
+        # a bound method.
+        handle = ts._export_object(sleep)
+        ts._referenced = set()
+        self.assertEqual(ts._object_keys(
+            {'action': 'call_handle', 'number': handle, 'args': [0.01]}),
+            set())
+        handle = ts._export_object(obj.add)
+        ts._referenced = set()
+        self.assertEqual(ts._object_keys(
+            {'action': 'call_handle', 'number': handle, 'args': [5, 0]}),
+            {id(obj)})
+
     def test_find_attr(self):
         ts = DummyServer()
 
@@ -30,6 +131,48 @@ class TacoServerMethodTestCase(TestCase):
         self.assertEqual(ts._find_attr('sys.version_info.minor'),
                          version_info.minor)
 
+    def test_find_attr_cache(self):
+        ts = DummyServer()
+
+        ts.import_module({'name': 'datetime', 'args': []})
+        self.assertIs(ts._find_attr('datetime.date'), date)
+        self.assertIn('datetime.date', ts._attr_cache)
+
+        # Attributes of instances are not cached.
+        ts.ns['test_var'] = NumberObject(5)
+        self.assertEqual(ts._find_attr('test_var.number'), 5)
+        self.assertNotIn('test_var.number', ts._attr_cache)
+
+        # Changes to the ns dictionary are detected.
+        ts.ns['datetime'] = NumberObject(6)
+        with self.assertRaises(AttributeError):
+            ts._find_attr('datetime.date')
+
+        ts.ns['datetime'] = namedtuple('TestModule', ['date'])(date)
+        self.assertIs(ts._find_attr('datetime.date'), date)
+
+        ts.set_value({'name': 'test_var', 'value': 7})
+        self.assertEqual(ts._attr_cache, {})
+
+        ts.import_module({'name': 'datetime', 'args': ['datetime']})
+        self.assertIs(ts._find_attr('datetime'), datetime)
+        self.assertIn('datetime', ts._attr_cache)
+
+        ts.ns['NumberObject'] = NumberObject
+        ts.set_class_attribute({
+            'class': 'NumberObject', 'name': 'static_attr', 'value': 5678})
+        self.assertEqual(ts._attr_cache, {})
+
+        # Attributes rebound other than by actions on this server
+        # are detected.
+        self.assertEqual(ts._find_attr('NumberObject.static_attr'), 5678)
+        self.assertIn('NumberObject.static_attr', ts._attr_cache)
+        NumberObject.static_attr = 1234
+        try:
+            self.assertEqual(ts._find_attr('NumberObject.static_attr'), 1234)
+        finally:
+            NumberObject.static_attr = 5678
+
     def test_object_handling(self):
         ts = DummyServer()
 
@@ -48,7 +191,121 @@ class TacoServerMethodTestCase(TestCase):
 
         self.assertIs(r['object'], d)
 
+    def test_object_registry(self):
+        ts = DummyServer()
+
+        d1 = date(2000, 4, 1)
+        d2 = date(2000, 4, 2)
+        d3 = date(2000, 4, 3)
+
+        ts.xp.write([d1, d2, d1])
+        self.assertEqual(ts.get_output(),
+            '[{"_Taco_Object_": 1}, {"_Taco_Object_": 2}, '
+            '{"_Taco_Object_": 1}]')
+
+        ts.destroy_object({'number': 1})
+        self.assertIs(ts.objects[1], d1)
+
+        ts.destroy_objects({'numbers': [1, 2]})
+        self.assertEqual(ts.objects, {})
+
+        ts.xp.write([d3, d1])
+        self.assertEqual(ts.get_output(),
+            '[{"_Taco_Object_": 2}, {"_Taco_Object_": 1}]')
+        self.assertEqual(ts.nobject, 2)
+
+        with self.assertRaises(KeyError):
+            ts.destroy_object({'number': 3})
+
 class TacoServerActionTestCase(TestCase):
+    def test_batch(self):
+        ts = DummyServer()
+        ts.objects[1] = NumberObject(42)
+        self.assertEqual(ts.batch({'actions': [
+            {
+                'action': 'call_function',
+                'name': 'divmod',
+                'args': [67, 8],
+                'kwargs': {},
+            },
+            {
+                'action': 'call_function',
+                'name': 'divmod',
+                'args': [1, 0],
+                'kwargs': {},
+            },
+            {
+                'action': 'get_attribute',
+                'number': 1,
+                'name': 'number',
+            },
+            {
+                'action': 'batch',
+                'actions': [],
+            },
+        ]})['result'], [
+            {'action': 'result', 'result': (8, 3)},
+            {'action': 'exception',
+             'message':
+                'exception caught: integer division or modulo by zero'},
+            {'action': 'result', 'result': 42},
+            {'action': 'exception',
+             'message': 'batch actions can not be nested'},
+        ])
+
+    def test_iterate_object(self):
+        ts = DummyServer()
+        ts.objects[1] = 'abcde'
+        ts._object_refs[1] = 1
+
+        def iterate(start=False):
+            return ts.iterate_object({
+                'number': 1, 'size': 2, 'start': start})['result']
+
+        self.assertEqual(iterate(True), ['a', 'b'])
+        self.assertEqual(iterate(), ['c', 'd'])
+        self.assertEqual(iterate(True), ['a', 'b'])
+        self.assertIn(1, ts._iterators)
+
+        ts.objects[1] = (x for x in range(4))
+        self.assertEqual(iterate(True), [0, 1])
+        self.assertEqual(iterate(), [2, 3])
+        self.assertEqual(iterate(), [])
+        self.assertNotIn(1, ts._iterators)
+
+        self.assertEqual(iterate(True), [])
+
+        ts.objects[1] = 'xyz'
+        iterate(True)
+        ts.destroy_object({'number': 1})
+        self.assertEqual(ts._iterators, {})
+
+        with self.assertRaisesRegex(Exception, 'invalid iterate size'):
+            ts.iterate_object({'number': 1, 'size': 0, 'start': True})
+
+    def test_map_function(self):
+        ts = DummyServer()
+        self.assertEqual(ts.map_function({
+            'name': 'int',
+            'items': [['10'], ['x'], ['11', 2]],
+            'kwargs': None,
+        })['result'], [
+            {'action': 'result', 'result': 10},
+            {'action': 'exception',
+             'message': 'exception caught: '
+                        'invalid literal for int() with base 10: \'x\''},
+            {'action': 'result', 'result': 3},
+        ])
+
+        self.assertEqual(ts.map_function({
+            'name': 'sorted',
+            'items': [[[2, 1]], [[]]],
+            'kwargs': {'reverse': True},
+        })['result'], [
+            {'action': 'result', 'result': [2, 1]},
+            {'action': 'result', 'result': []},
+        ])
+
     def test_call_class_method(self):
         ts = DummyServer()
         ts.import_module({
@@ -70,6 +327,23 @@ class TacoServerActionTestCase(TestCase):
             'kwargs': {},
         })['result'], (8, 3))
 
+    def test_call_handle(self):
+        ts = DummyServer()
+        ts.import_module({'name': 'os.path', 'args': []})
+        ts.xp.write(ts.resolve_function({'name': 'os.path.join'}))
+        self.assertEqual(
+            ts.get_output(),
+            '{"action": "result", "result": {"_Taco_Object_": 1}}')
+
+        self.assertEqual(ts.call_handle({
+            'number': 1,
+            'args': ['a', 'b'],
+            'kwargs': None,
+        })['result'], 'a/b')
+
+        with self.assertRaises(Exception):
+            ts.resolve_function({'name': 'os.sep'})
+
     def test_call_method(self):
         ts = DummyServer()
         ts.objects[1] = datetime(2020, 2, 20)
@@ -80,6 +354,34 @@ class TacoServerActionTestCase(TestCase):
             'kwargs': {},
         })['result'], '02/20/2020')
 
+    def test_configure_transport(self):
+        ts = DummyServer()
+        self.assertEqual(ts.xp.framing, 'end')
+        self.assertEqual(ts.configure_transport({
+            'framing': 'length',
+        })['result'], None)
+        self.assertEqual(ts.xp.framing, 'length')
+
+        with self.assertRaises(Exception):
+            ts.configure_transport({'framing': 'non-existent framing'})
+
+        with self.assertRaises(Exception):
+            ts.configure_transport({'framing': 'end',
+                                    'codec': 'non-existent codec'})
+        self.assertEqual(ts.xp.framing, 'length')
+
+        with self.assertRaises(Exception):
+            ts.configure_transport({'shm_threshold': 'large'})
+        self.assertIsNone(ts.xp.shm_threshold)
+
+        ts.configure_transport({'shm_threshold': 100000})
+        self.assertEqual(ts.xp.shm_threshold, 100000)
+
+        ts.xp.local = False
+        with self.assertRaises(Exception):
+            ts.configure_transport({'shm_threshold': 1000})
+        self.assertEqual(ts.xp.shm_threshold, 100000)
+
     def test_construct_object(self):
         ts = DummyServer()
         ts.import_module({
@@ -98,6 +400,20 @@ class TacoServerActionTestCase(TestCase):
         self.assertEqual(ts.destroy_object({'number': 1})['result'], None)
         self.assertNotIn(1, ts.objects)
 
+    def test_destroy_objects(self):
+        ts = DummyServer()
+        ts.objects[1] = [1]
+        ts.objects[2] = [2]
+        ts.objects[3] = [3]
+        self.assertEqual(ts.destroy_objects({'numbers': [1, 3]})['result'],
+                         None)
+        self.assertEqual(list(ts.objects.keys()), [2])
+
+        ts.objects[4] = [4]
+        with self.assertRaisesRegex(Exception, 'numbers: 1, 5'):
+            ts.destroy_objects({'numbers': [1, 2, 5, 4]})
+        self.assertEqual(ts.objects, {})
+
     def test_get_attribute(self):
         ts = DummyServer()
         TT = namedtuple('TT', ['xyz'])
@@ -167,7 +483,16 @@ class DummyServer(TacoServer, DummyBase):
         self.in_ = BytesIO()
         self.out = BytesIO()
 
-        return TacoServer._construct_transport(self, self.in_, self.out)
+        return TacoServer._construct_transport(self, self.in_, self.out,
+                                              'json')
+
+class SlowList():
+    def __init__(self):
+        self.items = []
+
+    def add(self, item, delay):
+        sleep(delay)
+        self.items.append(item)
 
 class NumberObject():
     static_attr = 5678
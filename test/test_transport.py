@@ -1,8 +1,21 @@
 from codecs import utf_8_decode, utf_8_encode
 from io import BytesIO
-from unittest import TestCase
+import os
+import socket
+from unittest import TestCase, skipIf
+from uuid import uuid4
+try:
+    from unittest.mock import Mock, patch
+except ImportError:
+    from mock import Mock, patch
 
-from taco.transport import TacoTransport
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from taco.transport import TacoTransport, _get_iov_max, _write_vectored, \
+    parse_address
 
 class TacoTransportTestCase(TestCase):
     def test_transport(self):
@@ -20,3 +33,279 @@ class TacoTransportTestCase(TestCase):
         r = xp.read()
 
         self.assertEqual(r, {'test_input': 1})
+
+    def test_default_codec(self):
+        in_ = BytesIO()
+        out = BytesIO()
+
+        exported = []
+
+        def from_obj(obj):
+            exported.append(obj)
+            return {'_Taco_Object_': len(exported)}
+
+        def to_obj(dict_):
+            if '_Taco_Object_' in dict_:
+                return exported[dict_['_Taco_Object_'] - 1]
+            return dict_
+
+        xp = TacoTransport(in_, out, from_obj, to_obj)
+
+        u = uuid4()
+        message = [float('inf'), float('-inf'), 2 ** 64, -2 ** 70, u]
+
+        xp.write(message)
+        xp.write([float('nan')])
+
+        in_.write(out.getvalue())
+        in_.seek(0)
+
+        r = xp.read()
+        self.assertEqual(r, message)
+        self.assertIsInstance(r[2], int)
+        self.assertIs(r[4], u)
+
+        nan = xp.read()[0]
+        self.assertNotEqual(nan, nan)
+
+    def test_length_framing(self):
+        in_ = BytesIO(utf_8_encode(
+            '// LENGTH 17\n{"test_input":\n3}'
+            '{"test_input":4}\n// END\n')[0])
+        out = BytesIO()
+
+        xp = TacoTransport(in_, out)
+        xp.framing = 'length'
+
+        xp.write({'test_output': 'é'})
+
+        r = utf_8_decode(out.getvalue())[0]
+
+        self.assertEqual(r, '// LENGTH 25\n{"test_output": "\\u00e9"}')
+
+        self.assertEqual(xp.read(), {'test_input': 3})
+        self.assertEqual(xp.read(), {'test_input': 4})
+        self.assertIsNone(xp.read())
+
+    def test_cork(self):
+        in_ = BytesIO(utf_8_encode('{"test_input":1}\n// END\n')[0])
+        out = BytesIO()
+
+        xp = TacoTransport(in_, out)
+
+        with xp.corked():
+            xp.write({'test_output': 1})
+
+            xp.cork()
+            xp.write({'test_output': 2})
+            xp.uncork()
+
+            self.assertEqual(out.getvalue(), b'')
+
+        self.assertEqual(utf_8_decode(out.getvalue())[0],
+                         '{"test_output": 1}\n// END\n'
+                         '{"test_output": 2}\n// END\n')
+
+        xp.cork()
+        xp.write({'test_output': 3})
+        self.assertEqual(xp.read(), {'test_input': 1})
+        self.assertTrue(
+            out.getvalue().endswith(b'{"test_output": 3}\n// END\n'))
+        xp.uncork()
+
+    @skipIf(not hasattr(os, 'writev'), 'writev not available')
+    def test_writev(self):
+        (r, w) = os.pipe()
+
+        # Write at most 7 bytes per call to test partial writes.
+        writev = Mock(side_effect=lambda fd, chunks: os.write(
+            fd, b''.join(bytes(x) for x in chunks)[:7]))
+
+        with os.fdopen(r, 'rb') as in_, os.fdopen(w, 'wb') as out, \
+                patch('taco.transport._writev', writev):
+            xp = TacoTransport(in_, out)
+            xp.writev_threshold = 100
+            xp.framing = 'length'
+
+            xp.write({'test_output': 'x' * 40})
+            xp.write({'test_output': 'y' * 200})
+
+            xp.cork()
+            for i in range(3):
+                xp.write({'test_output': i})
+            xp.uncork()
+
+            self.assertEqual(xp.read(), {'test_output': 'x' * 40})
+            self.assertEqual(xp.read(), {'test_output': 'y' * 200})
+            self.assertEqual([xp.read() for i in range(3)],
+                             [{'test_output': i} for i in range(3)])
+
+        self.assertGreater(writev.call_count, 30)
+
+        with patch('os.sysconf', Mock(return_value=-1)):
+            self.assertEqual(_get_iov_max(), 16)
+
+        with patch('os.sysconf', Mock(return_value=1024)):
+            self.assertEqual(_get_iov_max(), 1024)
+
+        with patch('taco.transport._writev', Mock(return_value=0)):
+            with self.assertRaises(IOError):
+                _write_vectored(1, [b'x'])
+
+    def test_codec_header(self):
+        in_ = BytesIO(utf_8_encode(
+            '// LENGTH 16 json\n{"test_input":5}')[0])
+        out = BytesIO()
+
+        xp = TacoTransport(in_, out)
+
+        self.assertEqual(xp.read(), {'test_input': 5})
+
+        with self.assertRaises(ValueError):
+            xp.set_codec('non-existent codec')
+
+    def test_file(self):
+        in_ = BytesIO()
+        out = BytesIO()
+
+        xp = TacoTransport(in_, out)
+        xp.shm_threshold = 20
+
+        xp.write({'test_output': 1})
+        xp.write({'test_output': 'x' * 20})
+
+        (small, end, header, name) = out.getvalue().split(b'\n')
+        self.assertEqual(small, b'{"test_output": 1}')
+        self.assertEqual(header, utf_8_encode(
+            '// FILE {0}'.format(len(name)))[0])
+        self.assertTrue(os.path.exists(name))
+
+        in_.write(header + b'\n' + name)
+        in_.seek(0)
+
+        self.assertEqual(xp.read(), {'test_output': 'x' * 20})
+        self.assertFalse(os.path.exists(name))
+
+        with self.assertRaises(ValueError):
+            xp._read_file(b'/etc/passwd')
+
+        # Files which are not read are removed on request.
+        xp.write({'test_output': 'y' * 20})
+        name = out.getvalue().split(b'\n')[-1]
+        self.assertTrue(os.path.exists(name))
+        xp.remove_files()
+        self.assertFalse(os.path.exists(name))
+
+        # Or if writing the message fails.
+        xp.out = Mock()
+        xp.out.write.side_effect = IOError('broken pipe')
+        names = []
+        write_file = xp._write_file
+
+        def record_file(data):
+            names.append(write_file(data))
+            return names[-1]
+
+        xp._write_file = record_file
+        with self.assertRaises(IOError):
+            xp.write({'test_output': 'z' * 20})
+        self.assertEqual(len(names), 1)
+        self.assertFalse(os.path.exists(names[0]))
+
+        # Files are refused on connections which are not local.
+        xp.local = False
+        with self.assertRaises(ValueError):
+            xp._read_file(names[0])
+
+    @skipIf(msgpack is None, 'msgpack not installed')
+    def test_msgpack(self):
+        in_ = BytesIO()
+        out = BytesIO()
+
+        xp = TacoTransport(in_, out, codec='msgpack')
+
+        xp.write({'test_output': b'\n\x00'})
+
+        data = msgpack.packb({'test_output': b'\n\x00'}, use_bin_type=True)
+        self.assertEqual(out.getvalue(), utf_8_encode(
+            '// LENGTH {0} msgpack\n'.format(len(data)))[0] + data)
+
+        in_.write(out.getvalue())
+        in_.seek(0)
+
+        self.assertEqual(xp.read(), {'test_output': b'\n\x00'})
+
+    def test_read_stream(self):
+        in_ = BytesIO(utf_8_encode(
+            '{"action": "result", "result": [1, "a\\n// END", [2]],\n'
+            ' "extra": true}\n// END\n'
+            '// LENGTH 33\n{"result": [3, 4], "action": "x"}'
+            '{"result": 5}\n// END\n'
+            '{"test_input": 6}\n// END\n')[0])
+        out = BytesIO()
+
+        xp = TacoTransport(in_, out)
+
+        with patch('taco.codec.JSONStreamDecoder.chunk_size', 4):
+            (message, items) = xp.read_stream('result')
+            self.assertEqual(message, {'action': 'result'})
+            self.assertEqual(list(items), [1, 'a\n// END', [2]])
+            self.assertEqual(message, {'action': 'result', 'extra': True})
+
+            (message, items) = xp.read_stream('result')
+            self.assertEqual(message, {})
+            self.assertEqual(list(items), [3, 4])
+            self.assertEqual(message, {'action': 'x'})
+
+            self.assertEqual(xp.read_stream('result'), ({'result': 5}, None))
+
+        self.assertEqual(xp.read(), {'test_input': 6})
+        self.assertEqual(xp.read_stream('result'), (None, None))
+
+        # An invalid message should be read in full.
+        in_ = BytesIO(utf_8_encode(
+            '{"result": [1.5e-7, 2.' + '5' * 20 + ', x,\n"y"]}\n// END\n'
+            '// LENGTH 13\n{"result": 7.'
+            '{"test_input": 8}\n// END\n')[0])
+
+        xp = TacoTransport(in_, out)
+
+        with patch('taco.codec.JSONStreamDecoder.chunk_size', 8):
+            (message, items) = xp.read_stream('result')
+            self.assertEqual(next(items), 1.5e-7)
+            self.assertEqual(next(items), float('2.' + '5' * 20))
+            with self.assertRaises(ValueError):
+                next(items)
+
+            with self.assertRaises(ValueError):
+                xp.read_stream('result')
+
+        self.assertEqual(xp.read(), {'test_input': 8})
+
+    @skipIf(msgpack is None, 'msgpack not installed')
+    def test_read_stream_msgpack(self):
+        in_ = BytesIO()
+        out = BytesIO()
+
+        xp = TacoTransport(in_, out, codec='msgpack')
+
+        xp.write({'result': [1, 2]})
+
+        in_.write(out.getvalue())
+        in_.seek(0)
+
+        self.assertEqual(xp.read_stream('result'), ({'result': [1, 2]}, None))
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address('127.0.0.1:9000'),
+                         (socket.AF_INET, ('127.0.0.1', 9000)))
+        self.assertEqual(parse_address('localhost:80'),
+                         (socket.AF_INET, ('localhost', 80)))
+        self.assertEqual(parse_address('[::1]:9000'),
+                         (socket.AF_INET6, ('::1', 9000)))
+        self.assertEqual(parse_address('/tmp/taco.sock'),
+                         (socket.AF_UNIX, '/tmp/taco.sock'))
+        self.assertEqual(parse_address('taco.sock'),
+                         (socket.AF_UNIX, 'taco.sock'))
+        self.assertEqual(parse_address('/tmp/taco:9000'),
+                         (socket.AF_UNIX, '/tmp/taco:9000'))
@@ -0,0 +1,55 @@
+import asyncio
+from unittest import TestCase
+
+from taco.aio import AsyncTaco
+from taco.object import TacoObject
+
+class PythonAsyncTestCase(TestCase):
+    def test_async(self):
+        async def run():
+            async with AsyncTaco(script='scripts/taco-python',
+                                 framing='length') as taco:
+                self.assertEqual(taco.xp.framing, 'length')
+
+                await taco.import_module('math')
+                await taco.import_module('datetime')
+
+                results = await asyncio.gather(*[
+                    taco.call_function('math.sqrt', x * x)
+                    for x in range(100)])
+
+                self.assertEqual(results, [float(x) for x in range(100)])
+
+                dt = await taco.construct_object(
+                    'datetime.datetime', 2000, 12, 25)
+
+                self.assertIsInstance(dt, TacoObject)
+                self.assertEqual(await dt.get_attribute('year'), 2000)
+                self.assertEqual(
+                    await dt.call_method('strftime', '%Y-%m-%d'),
+                    '2000-12-25')
+
+                strftime = dt.method('strftime', resolve=True)
+                self.assertEqual(await strftime('%Y'), '2000')
+
+                sqrt = taco.function('math.sqrt', resolve=True)
+                self.assertEqual(await sqrt(16), 4.0)
+                self.assertEqual(await sqrt(25), 5.0)
+
+                del dt, strftime
+
+                self.assertEqual(
+                    [x async for x in
+                     await taco.call_function('iter', [1, 2, 3])],
+                    [1, 2, 3])
+
+                self.assertEqual(
+                    await taco.batch([
+                        {'action': 'call_function', 'name': 'abs',
+                         'args': [-5]}]),
+                    [5])
+
+                with self.assertRaises(Exception):
+                    await taco.call_function('math.sqrt', -1)
+
+        asyncio.run(run())
@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from unittest import TestCase
+
+from taco import Taco
+from taco.multiplex import MultiplexTaco
+
+class PythonAsyncioServerTestCase(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'taco.sock')
+
+        self.process = subprocess.Popen([
+            'scripts/taco-python', '--listen', self.path, '--asyncio'])
+
+        for i in range(100):
+            if os.path.exists(self.path):
+                break
+
+            time.sleep(0.05)
+
+    def tearDown(self):
+        self.process.terminate()
+        self.process.wait()
+
+        shutil.rmtree(self.dir)
+
+    def test_await(self):
+        taco = Taco(address=self.path, framing='length')
+        taco.import_module('asyncio')
+
+        self.assertEqual(
+            taco.call_function('asyncio.sleep', 0, result=5), 5)
+
+        self.assertEqual(
+            taco.map_function('asyncio.sleep', [(0, x) for x in range(5)]),
+            list(range(5)))
+
+    def test_concurrent(self):
+        taco = MultiplexTaco(address=self.path)
+        taco.import_module('asyncio')
+
+        start = time.time()
+
+        with ThreadPoolExecutor(20) as executor:
+            results = list(executor.map(
+                lambda x: taco.call_function('asyncio.sleep', 0.5, x),
+                range(20)))
+
+        self.assertEqual(results, list(range(20)))
+        self.assertLess(time.time() - start, 2.0)
+
+        futures = [taco.submit_function('asyncio.sleep', 0.5, x)
+                   for x in range(100)]
+        self.assertEqual([f.result() for f in futures], list(range(100)))
+
+        taco.close()
+
+class PythonAsyncioPipeTestCase(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.script = os.path.join(self.dir, 'taco-python-asyncio')
+
+        with open(self.script, 'w') as f:
+            f.write('#!/bin/sh\nexec {0} --asyncio\n'.format(
+                os.path.abspath('scripts/taco-python')))
+
+        os.chmod(self.script, 0o755)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_pipes(self):
+        taco = MultiplexTaco(script=self.script)
+        taco.import_module('asyncio')
+
+        start = time.time()
+
+        futures = [taco.submit_function('asyncio.sleep', 0.5, x)
+                   for x in range(10)]
+        self.assertEqual([f.result() for f in futures], list(range(10)))
+
+        self.assertLess(time.time() - start, 2.0)
+
+        taco.close()
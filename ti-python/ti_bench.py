@@ -0,0 +1,12 @@
+from unittest import TestCase
+
+from taco.bench import run
+
+class PythonBenchTestCase(TestCase):
+    def test_bench(self):
+        results = run(script='scripts/taco-python', repeat=5, sizes=[10, 1000])
+
+        self.assertEqual(results['round_trip']['count'], 5)
+        self.assertEqual(results['objects']['count'], 5)
+        self.assertEqual([r['size'] for r in results['payload']], [10, 1000])
+        self.assertEqual(len(results['in_process']), 2)
@@ -2,12 +2,34 @@ from unittest import TestCase
 
 from taco import Taco
 from taco.object import TacoObject
+from taco.proxy import TacoProxy
 
 # This assert method was renamed in Python 3.2.
 if not hasattr(TestCase, 'assertRegex'):
     TestCase.assertRegex = TestCase.assertRegexpMatches
 
 class PythonDatetimeTestCase(TestCase):
+    def test_proxy(self):
+        taco = Taco(script='scripts/taco-python')
+
+        taco.import_module('datetime')
+
+        dt = TacoProxy(
+            taco.construct_object('datetime.datetime', 2000, 12, 25),
+            immutable=('year', 'month', 'strftime'))
+
+        self.assertEqual((dt.year, dt.month, dt.day), (2000, 12, 25))
+        self.assertEqual(dt.strftime('%Y-%m-%d'), '2000-12-25')
+
+        d = dt.date()
+        self.assertIsInstance(d, TacoProxy)
+        self.assertEqual(d.isoformat(), '2000-12-25')
+        self.assertEqual(dt.replace(year=1999).year, 1999)
+
+        dt = TacoProxy(dt._object, methods=('strftime', 'date'))
+        self.assertEqual(dt.strftime('%Y-%m-%d'), '2000-12-25')
+        self.assertEqual(dt.date().isoformat(), '2000-12-25')
+
     def test_datetime(self):
         taco = Taco(script='scripts/taco-python')
 
@@ -64,3 +86,19 @@ class PythonDatetimeTestCase(TestCase):
         self.assertRegex(
             taco.call_function('repr', dt_c2),
             '^datetime\.datetime\(2010')
+
+    def test_many_objects(self):
+        taco = Taco(script='scripts/taco-python')
+
+        taco.import_module('datetime')
+
+        dates = [taco.construct_object('datetime.date', 2000, 1, 1)
+                 for x in range(2500)]
+
+        self.assertEqual(taco.call_function('repr', dates[-1]),
+                         'datetime.date(2000, 1, 1)')
+
+        del dates
+
+        self.assertTrue(taco._bulk_destroy)
+        self.assertEqual(taco.call_function('abs', -1), 1)
@@ -0,0 +1,100 @@
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from unittest import TestCase
+
+from taco import Taco
+from taco.aio import AsyncTaco
+
+class PythonForkServerTestCase(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'taco.sock')
+
+        self.process = subprocess.Popen([
+            'scripts/taco-python', '--forkserver', self.path,
+            '--preload', 'fractions'])
+
+        for i in range(100):
+            if os.path.exists(self.path):
+                break
+
+            time.sleep(0.05)
+
+    def tearDown(self):
+        self.process.terminate()
+        self.process.wait()
+
+        self.assertFalse(os.path.exists(self.path))
+
+        shutil.rmtree(self.dir)
+
+    def test_forkserver(self):
+        taco = Taco(address=self.path)
+        taco.import_module('sys')
+        taco.import_module('os')
+
+        self.assertIn('fractions',
+                      taco.call_function('sys.modules.keys'))
+
+        taco.import_module('fractions')
+        self.assertEqual(
+            taco.call_function('str',
+                taco.construct_object('fractions.Fraction', 3, 6)),
+            '1/2')
+
+        taco_2 = Taco(address=self.path, framing='length')
+        taco_2.import_module('os')
+
+        pids = set((taco.call_function('os.getpid'),
+                    taco_2.call_function('os.getpid')))
+        self.assertEqual(len(pids), 2)
+        self.assertNotIn(self.process.pid, pids)
+
+    def test_forkserver_aio(self):
+        async def run():
+            async with AsyncTaco(address=self.path) as taco:
+                await taco.import_module('math')
+                return await taco.call_function('math.sqrt', 4)
+
+        self.assertEqual(asyncio.run(run()), 2.0)
+
+    def test_forkserver_tcp(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+
+        address = '127.0.0.1:{0}'.format(port)
+        process = subprocess.Popen([
+            'scripts/taco-python', '--forkserver', address])
+
+        try:
+            for i in range(100):
+                try:
+                    taco = Taco(address=address)
+                    break
+                except (IOError, OSError):
+                    time.sleep(0.05)
+            else:
+                self.fail('could not connect to server')
+
+            taco.import_module('os')
+            self.assertNotEqual(taco.call_function('os.getpid'), process.pid)
+
+        finally:
+            process.terminate()
+            process.wait()
+
+        # The child process should not keep the port in use.
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(('127.0.0.1', port))
+        sock.listen(1)
+        sock.close()
+
+        self.assertEqual(taco.call_function('abs', -1), 1)
@@ -0,0 +1,90 @@
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from unittest import TestCase
+
+from taco import Taco
+from taco.aio import AsyncTaco
+
+class PythonListenTestCase(TestCase):
+    def _start(self, address):
+        self.process = subprocess.Popen([
+            'scripts/taco-python', '--listen', address,
+            '--preload', 'fractions'])
+
+        for i in range(100):
+            try:
+                return Taco(address=address)
+            except (IOError, OSError):
+                time.sleep(0.05)
+
+        self.fail('could not connect to server')
+
+    def tearDown(self):
+        self.process.terminate()
+        self.process.wait()
+
+    def _check_shared(self, address, taco):
+        taco.import_module('sys')
+        taco.import_module('os')
+
+        self.assertIn('fractions',
+                      taco.call_function('sys.modules.keys'))
+
+        taco.set_value('x', 1)
+
+        taco_2 = Taco(address=address, framing='length')
+        taco_2.import_module('os')
+        taco_2.set_value('x', 2)
+
+        pids = set((taco.call_function('os.getpid'),
+                    taco_2.call_function('os.getpid')))
+        self.assertEqual(pids, set((self.process.pid,)))
+
+        self.assertEqual(taco.get_value('x'), 1)
+        self.assertEqual(taco_2.get_value('x'), 2)
+
+        # Modules are shared, so a function replaced by one connection
+        # should be seen by the other.
+        taco.import_module('fractions')
+        taco_2.import_module('fractions')
+        self.assertEqual(
+            taco.call_function('fractions.Fraction', 1, 2).call_method(
+                '__str__'), '1/2')
+        taco_2.set_value('fractions.Fraction', taco_2.resolve_function('str'))
+        self.assertEqual(taco.call_function('fractions.Fraction', 3), '3')
+
+    def test_unix(self):
+        dir_ = tempfile.mkdtemp()
+
+        try:
+            path = os.path.join(dir_, 'taco.sock')
+            taco = self._start(path)
+            self._check_shared(path, taco)
+
+            self.process.terminate()
+            self.process.wait()
+            self.assertFalse(os.path.exists(path))
+
+        finally:
+            shutil.rmtree(dir_)
+
+    def test_tcp(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(('127.0.0.1', 0))
+        address = '127.0.0.1:{0}'.format(sock.getsockname()[1])
+        sock.close()
+
+        taco = self._start(address)
+        self._check_shared(address, taco)
+
+        async def run():
+            async with AsyncTaco(address=address) as taco:
+                await taco.import_module('math')
+                return await taco.call_function('math.sqrt', 4)
+
+        self.assertEqual(asyncio.run(run()), 2.0)
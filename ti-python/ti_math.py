@@ -12,3 +12,82 @@ class PythonMathTestCase(TestCase):
         self.assertAlmostEqual(
             taco.call_function('math.sin', math.pi),
             0.0)
+
+    def test_math_resolved(self):
+        taco = Taco(script='scripts/taco-python')
+
+        taco.import_module('math')
+
+        sqrt = taco.function('math.sqrt', resolve=True)
+
+        self.assertEqual([sqrt(x * x) for x in range(100)],
+                         [float(x) for x in range(100)])
+
+        hypot = taco.resolve_function('math.hypot')
+        futures = [hypot.submit(3, x) for x in (4, 0)]
+        self.assertEqual([f.result() for f in futures], [5.0, 3.0])
+
+        with self.assertRaises(Exception):
+            taco.function('math.pi', resolve=True)
+
+    def test_math_map(self):
+        taco = Taco(script='scripts/taco-python')
+
+        taco.import_module('math')
+
+        r = taco.map_function('math.sqrt', [(x * x,) for x in range(1000)])
+
+        self.assertEqual(r, [float(x) for x in range(1000)])
+
+        r = taco.map_function('math.log', [(8, 2), (-1,), (1,)])
+
+        self.assertEqual(r[0], 3.0)
+        self.assertIsInstance(r[1], Exception)
+        self.assertEqual(r[2], 0.0)
+
+    def test_math_iterate(self):
+        taco = Taco(script='scripts/taco-python')
+
+        taco.import_module('math')
+
+        r = taco.call_function('range', 250)
+
+        self.assertEqual(list(r), list(range(250)))
+        self.assertEqual(list(r.iterate(50)), list(range(250)))
+
+        m = taco.call_function('map', taco.resolve_function('math.sqrt'),
+                               [x * x for x in range(200)])
+
+        self.assertEqual(list(m), [float(x) for x in range(200)])
+        self.assertEqual(list(m), [])
+
+    def test_math_pipelined(self):
+        taco = Taco(script='scripts/taco-python')
+
+        taco.import_module('math')
+
+        futures = [taco.submit_function('math.sqrt', x * x)
+                   for x in range(1000)]
+
+        self.assertEqual(taco.call_function('math.floor', 2.5), 2)
+
+        self.assertEqual([f.result() for f in futures],
+                         [float(x) for x in range(1000)])
+
+        f = taco.submit_function('math.sqrt', -1)
+
+        with self.assertRaises(Exception):
+            f.result()
+
+    def test_math_batch(self):
+        taco = Taco(script='scripts/taco-python')
+
+        taco.import_module('math')
+
+        r = taco.batch([
+            {'action': 'call_function', 'name': 'math.sqrt', 'args': [x]}
+            for x in (4, -1, 9)])
+
+        self.assertEqual(r[0], 2.0)
+        self.assertIsInstance(r[1], Exception)
+        self.assertEqual(r[2], 3.0)
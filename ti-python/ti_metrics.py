@@ -0,0 +1,29 @@
+from unittest import TestCase
+
+import taco
+from taco import Taco, metrics
+
+class PythonMetricsTestCase(TestCase):
+    def test_metrics(self):
+        t = Taco(script='scripts/taco-python')
+
+        t.import_module('taco.metrics')
+        t.call_function('taco.metrics.enable')
+
+        metrics.enable()
+
+        try:
+            for i in range(10):
+                t.call_function('abs', -i)
+
+            client_stats = taco.stats()['client']['call_function']
+
+        finally:
+            metrics.disable()
+
+        server_stats = t.call_function('taco.metrics.stats')['server']
+
+        self.assertEqual(client_stats['count'], 10)
+        self.assertEqual(sum(client_stats['transit_time']['histogram']), 10)
+
+        self.assertEqual(server_stats['call_function']['count'], 10)
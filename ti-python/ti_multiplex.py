@@ -0,0 +1,31 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from taco.multiplex import MultiplexTaco
+
+class PythonMultiplexTestCase(TestCase):
+    def test_threads(self):
+        taco = MultiplexTaco(script='scripts/taco-python', framing='length')
+
+        taco.import_module('math')
+        taco.import_module('datetime')
+
+        def work(x):
+            d = taco.construct_object('datetime.date', 2000, 1, x % 28 + 1)
+            return (taco.call_function('math.sqrt', x * x),
+                    d.call_method('isoformat'))
+
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(work, range(500)))
+
+        self.assertEqual(results, [
+            (float(x), '2000-01-{0:02d}'.format(x % 28 + 1))
+            for x in range(500)])
+
+        futures = [taco.submit_function('math.sqrt', x * x)
+                   for x in range(100)]
+
+        self.assertEqual([f.result() for f in futures],
+                         [float(x) for x in range(100)])
+
+        taco.close()
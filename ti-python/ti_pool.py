@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from taco.pool import TacoPool
+
+class PythonPoolTestCase(TestCase):
+    def test_pool(self):
+        pool = TacoPool(script='scripts/taco-python', size=3)
+
+        pool.import_module('math')
+        pool.import_module('os')
+
+        futures = [pool.submit_function('math.sqrt', x * x)
+                   for x in range(100)]
+
+        self.assertEqual([f.result() for f in futures],
+                         [float(x) for x in range(100)])
+
+        self.assertEqual(
+            pool.map_function('math.sqrt', [(x * x,) for x in range(100)]),
+            [float(x) for x in range(100)])
+
+        pids = set(f.result() for f in
+                   [pool.submit_function('os.getpid') for x in range(30)])
+        self.assertTrue(1 <= len(pids) <= 3)
+
+        pool.import_module('datetime')
+
+        objects = [pool.construct_object('datetime.date', 2000, 1, x + 1)
+                   for x in range(10)]
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(o.call_method, 'isoformat')
+                       for o in objects]
+            self.assertEqual(
+                [f.result() for f in futures],
+                ['2000-01-{0:02d}'.format(x + 1) for x in range(10)])
+
+        pool.shutdown()
@@ -0,0 +1,141 @@
+from array import array
+from unittest import TestCase, skipIf
+
+from taco import Taco
+from taco.codec import MsgpackCodec
+from taco.object import TacoObject
+
+class PythonTransportTestCase(TestCase):
+    def test_default_codec(self):
+        taco = Taco(script='scripts/taco-python')
+
+        taco.import_module('uuid')
+
+        self.assertEqual(taco.xp.codec.name, 'json')
+
+        nan = taco.call_function('float', 'nan')
+        self.assertNotEqual(nan, nan)
+        self.assertEqual(taco.call_function('float', 'inf'), float('inf'))
+        self.assertEqual(taco.call_function('float', float('-inf')),
+                         float('-inf'))
+
+        big = taco.call_function('pow', 2, 70)
+        self.assertIsInstance(big, int)
+        self.assertEqual(big, 2 ** 70)
+        self.assertEqual(taco.call_function('int', -2 ** 64), -2 ** 64)
+
+        u = taco.call_function('uuid.uuid4')
+        self.assertIsInstance(u, TacoObject)
+        self.assertEqual(len(u.get_attribute('hex')), 32)
+
+    def test_length_framing(self):
+        taco = Taco(script='scripts/taco-python', framing='length')
+
+        self.assertEqual(taco.xp.framing, 'length')
+
+        taco.import_module('os.path')
+
+        self.assertEqual(
+            taco.call_function('os.path.join', 'a\nb', 'c'),
+            'a\nb/c')
+
+        big = 'x\n' * 100000
+        self.assertEqual(taco.call_function('str.upper', big), big.upper())
+
+    def test_corked(self):
+        taco = Taco(script='scripts/taco-python')
+
+        taco.import_module('math')
+
+        with taco.corked():
+            futures = [taco.submit_function('math.sqrt', x * x)
+                       for x in range(1000)]
+
+            self.assertEqual(taco.call_function('math.sqrt', 4), 2.0)
+
+            futures.extend(taco.submit_function('math.sqrt', x * x)
+                           for x in range(1000))
+
+        self.assertEqual([f.result() for f in futures],
+                         [float(x) for x in range(1000)] * 2)
+
+    def test_stream_function(self):
+        for framing in ('end', 'length'):
+            taco = Taco(script='scripts/taco-python', framing=framing)
+
+            taco.import_module('datetime')
+
+            words = taco.stream_function('str.split', 'x\n// END\n' * 100000)
+            self.assertEqual(next(words), 'x')
+
+            d = taco.construct_object('datetime.date', 2000, 1, 2)
+            self.assertIsInstance(d, TacoObject)
+            self.assertEqual(d.call_method('isoformat'), '2000-01-02')
+
+            self.assertEqual(sum(1 for word in words), 299999)
+
+            xs = [i / 7.0 for i in range(50000)] + [1.5e-300, -2.5e300]
+            self.assertEqual(list(taco.stream_function('list', xs)), xs)
+
+            # Each streamed object should refer to a distinct live object.
+            numbers = taco.call_function(
+                'map', taco.resolve_function('complex'),
+                taco.call_function('range', 20000))
+            objects = list(taco.stream_function('list', numbers))
+            self.assertEqual(
+                [x.get_attribute('real') for x in objects],
+                [float(i) for i in range(20000)])
+
+    def test_large_pipelined(self):
+        taco = Taco(script='scripts/taco-python')
+
+        big = 'x' * 2 ** 20
+        futures = [taco.submit_function('str', big) for i in range(3)]
+
+        self.assertEqual(taco.call_function('str.upper', big), big.upper())
+        self.assertEqual([f.result() for f in futures], [big] * 3)
+
+    def test_shm_threshold(self):
+        taco = Taco(script='scripts/taco-python', shm_threshold=100000)
+
+        self.assertEqual(taco.xp.shm_threshold, 100000)
+
+        big = 'x\n' * 100000
+        self.assertEqual(taco.call_function('str.upper', big), big.upper())
+        self.assertEqual(taco.call_function('len', big), 200000)
+        self.assertEqual(len(taco.call_function('str.join', '', [big] * 3)),
+                         600000)
+
+    @skipIf(not MsgpackCodec.available, 'msgpack not installed')
+    def test_msgpack(self):
+        taco = Taco(script='scripts/taco-python', codec='msgpack')
+
+        self.assertEqual(taco.xp.codec.name, 'msgpack')
+        self.assertEqual(taco.xp.framing, 'end')
+
+        taco.import_module('datetime')
+        taco.import_module('hashlib')
+
+        data = bytes(range(256)) * 100
+        self.assertEqual(taco.call_function('bytes', data), data)
+
+        h = taco.call_function('hashlib.sha256', data)
+        self.assertIsInstance(h, TacoObject)
+        self.assertEqual(len(h.call_method('digest')), 32)
+
+        self.assertEqual(taco.call_function('pow', 2, 100), 2 ** 100)
+        self.assertEqual(taco.call_function('dict', [(1, 2.5)]), {1: 2.5})
+
+    @skipIf(not MsgpackCodec.available, 'msgpack not installed')
+    def test_msgpack_array(self):
+        taco = Taco(script='scripts/taco-python', codec='msgpack')
+
+        taco.import_module('array')
+
+        a = array('d', range(100000))
+        self.assertEqual(taco.call_function('sum', a), sum(a))
+
+        result = taco.call_function('array.array', 'f', a)
+        self.assertIsInstance(result, array)
+        self.assertEqual(result.typecode, 'f')
+        self.assertEqual(result, a)
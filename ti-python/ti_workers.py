@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from unittest import TestCase
+
+from taco.multiplex import MultiplexTaco
+
+class PythonWorkersTestCase(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'taco.sock')
+
+        self.process = subprocess.Popen([
+            'scripts/taco-python', '--listen', self.path, '--workers', '4'])
+
+        for i in range(100):
+            if os.path.exists(self.path):
+                break
+
+            time.sleep(0.05)
+
+    def tearDown(self):
+        self.process.terminate()
+        self.process.wait()
+
+        shutil.rmtree(self.dir)
+
+    def test_workers(self):
+        taco = MultiplexTaco(address=self.path)
+        taco.import_module('time')
+
+        start = time.time()
+
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(
+                lambda x: taco.call_function('time.sleep', 0.5), range(4)))
+
+        self.assertLess(time.time() - start, 1.5)
+
+        taco.import_module('collections')
+        queue = taco.construct_object('collections.deque')
+
+        futures = [queue.submit_method('append', x) for x in range(100)]
+        for future in futures:
+            future.result()
+
+        self.assertEqual(taco.call_function('list', queue), list(range(100)))
+
+        taco.close()